@@ -1,22 +1,133 @@
-from typing import Any, Dict, Optional
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, Dict, List, Literal, Optional
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Response as HTTPResponse
+from fastapi.responses import JSONResponse
+from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+from prometheus_client import CONTENT_TYPE_LATEST
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
 
-from model.model import TaxCodeAssistant
+from backend.scheduler import FairScheduler, QueueFullError
+from model.metrics import (
+    STARTUP_PHASE,
+    configure_tracing,
+    latest_metrics,
+    mark_worker_dead,
+    stage,
+)
+
+if TYPE_CHECKING:
+    from model.model import TaxCodeAssistant
+
+# Вікно історії, яке клієнт може передати в одному запиті
+MAX_HISTORY_MESSAGES = 20
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Порт відкривається одразу, а важкі компоненти вантажаться у фоні
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    yield
+    mark_worker_dead()
 
-app = FastAPI()
-assistant = TaxCodeAssistant(
-    model_name="mistralai/Mixtral-8x7B-Instruct-v0.1", persist_directory="/app/db"
+
+configure_tracing()
+app = FastAPI(lifespan=lifespan)
+FastAPIInstrumentor.instrument_app(app, excluded_urls="metrics,healthz,readyz")
+assistant: Optional["TaxCodeAssistant"] = None
+
+# Смуга черги для резюме історії всіх користувачів
+SUMMARY_LANE = "summary"
+
+# Генерації LLM виконуються через справедливу чергу, а привітання, системні
+# та нерелевантні питання відповідаються одразу повз неї
+scheduler = FairScheduler(
+    max_concurrency=int(os.getenv("LLM_CONCURRENCY", "4")),
+    per_user_concurrency=int(os.getenv("LLM_PER_USER_CONCURRENCY", "1")),
+    max_queued_per_user=int(os.getenv("LLM_MAX_QUEUED_PER_USER", "32")),
 )
+
+# Стан фонового прогріву: тривалості фаз та помилка, якщо вона сталася
+startup_phases: Dict[str, float] = {}
+startup_error: Optional[str] = None
 # mistralai/Mistral-7B-Instruct-v0.3
 # mistralai/Mixtral-8x7B-Instruct-v0.1
 # mistralai/Mistral-Small-24B-Instruct-2501
 # Xwin-LM/Xwin-LM-70B-V0.1
 
 
+def _phase(name: str, start: float) -> float:
+    elapsed = time.perf_counter() - start
+    startup_phases[name] = round(elapsed, 3)
+    STARTUP_PHASE.labels(phase=name).set(elapsed)
+    logger.info(f"Startup phase {name} took {elapsed:.2f}s")
+    return time.perf_counter()
+
+
+def warm_up() -> None:
+    """
+    Фонове завантаження асистента: імпорт langchain/torch, модель
+    ембедінгів, FAISS індекс та пробний запит, що прогріває кеші
+    """
+    global assistant, startup_error
+    try:
+        start = time.perf_counter()
+        from model.model import TaxCodeAssistant
+
+        start = _phase("imports", start)
+        instance = TaxCodeAssistant(
+            model_name="mistralai/Mixtral-8x7B-Instruct-v0.1",
+            persist_directory="/app/db",
+            # Класифікатор за ембедінгами можна вимкнути, якщо він помиляється
+            # на реальних запитах, і повернутися до ключових слів
+            use_intent_classifier=os.getenv("USE_INTENT_CLASSIFIER", "1") == "1",
+        )
+        start = _phase("assistant_init", start)
+
+        instance.get_context("Яка ставка податку на доходи фізичних осіб?")
+        _phase("warmup_query", start)
+
+        assistant = instance
+        logger.info(f"Backend ready in {sum(startup_phases.values()):.2f}s")
+    except Exception as e:
+        startup_error = str(e)
+        logger.exception(f"Backend warm-up failed: {e}")
+
+
+def get_assistant() -> "TaxCodeAssistant":
+    # Бенчмарки підставляють власний асистент до першого запиту
+    if assistant is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Асистент ще завантажується",
+            headers={"Retry-After": "5"},
+        )
+    return assistant
+
+
+class Turn(BaseModel):
+    role: Literal["user", "assistant"]
+    content: str
+
+
 class Query(BaseModel):
     text: str
+    chat_id: Optional[int] = None
+    user_id: Optional[int] = None
+    history: List[Turn] = Field(default_factory=list, max_length=MAX_HISTORY_MESSAGES)
+    # Резюме старіших ходів, що не входять до history (див. /summarize)
+    summary: Optional[str] = None
+    shards: Optional[List[str]] = None
+    # Вибір шардів за полями shard.json: {"family": ["tax_code"], "year": 2024}
+    shard_filter: Optional[Dict[str, Any]] = None
+    filters: Optional[Dict[str, Any]] = None
     metadata: Optional[Dict[str, Any]] = None
 
 
@@ -26,15 +137,113 @@ class Response(BaseModel):
     metadata: Optional[Dict[str, Any]] = None
 
 
+class SummaryRequest(BaseModel):
+    summary: str = ""
+    turns: List[Turn] = Field(default_factory=list, max_length=MAX_HISTORY_MESSAGES)
+    chat_id: Optional[int] = None
+    user_id: Optional[int] = None
+
+
+class SummaryResponse(BaseModel):
+    summary: str
+
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    body = {
+        "ready": assistant is not None,
+        "phases": startup_phases,
+        "error": startup_error,
+    }
+    if assistant is None:
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+
+@app.get("/metrics")
+async def metrics():
+    return HTTPResponse(latest_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
+def _scheduler_key(query: Query) -> str:
+    if query.user_id is not None:
+        return f"user:{query.user_id}"
+    if query.chat_id is not None:
+        return f"chat:{query.chat_id}"
+    # Анонімні запити ділять одну смугу: без ідентифікатора їх не розрізнити,
+    # а окремий ключ на кожен запит дав би анонімному потоку витіснити решту
+    return "anonymous"
+
+
 @app.post("/query", response_model=Response)
 async def process_query(query: Query):
+    current = get_assistant()
+
+    if query.filters:
+        from embeddings.metadata_filter import validate_filters
+
+        try:
+            validate_filters(query.filters)
+        except (ValueError, TypeError) as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
     try:
-        response = assistant.process_query(query.text)
+        with stage("query_request"):
+            analysis = await run_in_threadpool(current.query_handler.route, query.text)
+            response = current.query_handler.instant_response(analysis)
+            if response is None:
+                response = await scheduler.submit(
+                    _scheduler_key(query),
+                    current.process_query,
+                    query.text,
+                    history=[turn.model_dump() for turn in query.history],
+                    shards=query.shards,
+                    shard_filter=query.shard_filter,
+                    filters=query.filters,
+                    analysis=analysis,
+                    summary=query.summary,
+                )
 
         return {
             "answer": response,
             "sources": [],
             "metadata": query.metadata,
         }
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=429, detail=str(e), headers={"Retry-After": "10"}
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/summarize", response_model=SummaryResponse)
+async def summarize_history(request: SummaryRequest):
+    """
+    Згортає ходи, що не вміщаються в бюджет історії, у резюме чату. Клієнт
+    викликає його лише тоді, коли історія перевищує бюджет, і зберігає
+    результат.
+    """
+    current = get_assistant()
+
+    try:
+        # Окрема смуга: фонове резюме не займає місце користувача в його
+        # смузі і не затримує його наступну відповідь
+        summary = await scheduler.submit(
+            SUMMARY_LANE,
+            current.summarize_history,
+            request.summary,
+            [turn.model_dump() for turn in request.turns],
+        )
+        return {"summary": summary}
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=429, detail=str(e), headers={"Retry-After": "10"}
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,148 @@
+import asyncio
+import itertools
+import time
+from collections import defaultdict, deque
+from functools import partial
+from typing import Any, Callable, Deque, Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from model.metrics import SCHEDULER_QUEUED, SCHEDULER_REJECTED, SCHEDULER_WAIT
+
+
+class QueueFullError(Exception):
+    """Користувач вичерпав ліміт запитів, що очікують у черзі."""
+
+
+class _Job:
+    __slots__ = ("tag", "seq", "future", "enqueued_at")
+
+    def __init__(self, tag: float, seq: int, future: asyncio.Future):
+        self.tag = tag
+        self.seq = seq
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+class FairScheduler:
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        per_user_concurrency: int = 1,
+        max_queued_per_user: int = 32,
+        weights: Optional[Dict[str, float]] = None,
+    ):
+        """
+        Черга LLM запитів зі справедливим розподілом між користувачами
+
+        Зважена справедлива черга (start-time fair queuing): кожен запит
+        отримує віртуальну мітку max(віртуальний час, мітка попереднього
+        запиту користувача) + 1 / вага, і першим виконується запит з
+        найменшою міткою. Користувач з десятком запитів у черзі не
+        відсуває запит того, хто питає рідко.
+
+        Стан черги живе в пам'яті процесу: кожен воркер uvicorn має власні
+        черги та ліміти, тож з N воркерами користувач отримує до N
+        одночасних генерацій. Тому бекенд запускається з одним воркером
+        (BACKEND_WORKERS=1 у docker-compose).
+
+        Args:
+            max_concurrency (int): Одночасних генерацій на процес
+            per_user_concurrency (int): Одночасних генерацій одного користувача
+            max_queued_per_user (int): Запитів користувача в черзі, понад які
+                новий запит відхиляється з QueueFullError
+            weights (Dict[str, float]): Ваги окремих користувачів, типово 1
+        """
+        self.max_concurrency = max_concurrency
+        self.per_user_concurrency = per_user_concurrency
+        self.max_queued_per_user = max_queued_per_user
+        self.weights = weights or {}
+
+        self._queues: Dict[str, Deque[_Job]] = defaultdict(deque)
+        self._active: Dict[str, int] = defaultdict(int)
+        self._last_tag: Dict[str, float] = {}
+        self._virtual_time = 0.0
+        self._running = 0
+        self._seq = itertools.count()
+
+    @property
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    def _enqueue(self, user: str) -> _Job:
+        queue = self._queues[user]
+        if len(queue) >= self.max_queued_per_user:
+            SCHEDULER_REJECTED.inc()
+            raise QueueFullError(f"Too many queued requests for {user}")
+
+        tag = max(self._virtual_time, self._last_tag.get(user, 0.0))
+        tag += 1.0 / self.weights.get(user, 1.0)
+        self._last_tag[user] = tag
+
+        job = _Job(tag, next(self._seq), asyncio.get_running_loop().create_future())
+        queue.append(job)
+        SCHEDULER_QUEUED.inc()
+        return job
+
+    def _dispatch(self) -> None:
+        while self._running < self.max_concurrency:
+            eligible = [
+                (queue[0].tag, queue[0].seq, user)
+                for user, queue in self._queues.items()
+                if queue and self._active[user] < self.per_user_concurrency
+            ]
+            if not eligible:
+                return
+
+            _, _, user = min(eligible)
+            job = self._queues[user].popleft()
+            if not self._queues[user]:
+                del self._queues[user]
+            SCHEDULER_QUEUED.dec()
+
+            if job.future.cancelled():
+                continue
+
+            self._virtual_time = max(self._virtual_time, job.tag)
+            self._active[user] += 1
+            self._running += 1
+            SCHEDULER_WAIT.observe(time.perf_counter() - job.enqueued_at)
+            job.future.set_result(None)
+
+        # Без черги і активних запитів віртуальний час можна не зберігати
+        if not self._running and not self._queues:
+            self._last_tag.clear()
+
+    def _release(self, user: str) -> None:
+        self._running -= 1
+        self._active[user] -= 1
+        if not self._active[user]:
+            del self._active[user]
+            # Мітки вже обслужених запитів не більші за віртуальний час, тож
+            # користувача без черги можна забути (анонімні ключі одноразові)
+            if user not in self._queues:
+                self._last_tag.pop(user, None)
+        self._dispatch()
+
+    async def submit(self, user: str, func: Callable, *args, **kwargs) -> Any:
+        """
+        Виконує func у пулі потоків, коли до користувача дійде черга
+        """
+        job = self._enqueue(user)
+        self._dispatch()
+        try:
+            await job.future
+        except asyncio.CancelledError:
+            # Клієнт пішов: запит або ще в черзі, або вже отримав слот
+            if job.future.done() and not job.future.cancelled():
+                self._release(user)
+            raise
+
+        try:
+            return await run_in_threadpool(partial(func, *args, **kwargs))
+        finally:
+            self._release(user)
@@ -0,0 +1,94 @@
+import hashlib
+import random
+import re
+from typing import Dict, List, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+PAGE_FOOTER = 'Газета "Все про бухгалтерський облік" {page} gazeta.vobu.ua'
+
+COMMON_WORDS = (
+    "платник податку зобов'язаний сплатити суму податкового зобов'язання "
+    "протягом строку визначеного цим кодексом для доходу отриманого фізичною "
+    "особою підприємцем у звітному періоді крім випадків передбачених законом "
+    "контролюючий орган здійснює перевірку декларації та нараховує штрафні "
+    "санкції у разі порушення порядку обліку та подання звітності"
+).split()
+
+SYLLABLES = "ба ве гі да ле мо ні ра со ту фі ха це чу ша ко ли пе ру ди".split()
+
+
+def _topic_word(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(4))
+
+
+def generate_corpus(
+    num_articles: int = 200,
+    sentences_per_article: int = 12,
+    words_per_page: int = 400,
+    seed: int = 13,
+) -> Tuple[List[str], List[Dict]]:
+    """
+    Генерує синтетичний "кодекс": сторінки тексту зі статтями та пунктами
+    і набір запитів з відомою правильною статтею.
+
+    Кожна стаття має власні "тематичні" слова, тож запит з кількох таких
+    слів однозначно відповідає своїй статті.
+    """
+    rng = random.Random(seed)
+    words: List[str] = []
+    queries = []
+
+    for article in range(1, num_articles + 1):
+        topic = [_topic_word(rng) for _ in range(6)]
+        words.extend(f"Стаття {article}. Порядок оподаткування {topic[0]}.".split())
+
+        for sentence in range(1, sentences_per_article + 1):
+            body = rng.sample(COMMON_WORDS, 10) + rng.sample(topic, 2)
+            rng.shuffle(body)
+            words.extend(f"{article}.{sentence}. {' '.join(body)}.".split())
+
+        queries.append(
+            {
+                "question": f"Як застосовується {' '.join(rng.sample(topic, 3))}?",
+                "article": article,
+            }
+        )
+
+    pages = []
+    for page, start in enumerate(range(0, len(words), words_per_page), 1):
+        text = " ".join(words[start : start + words_per_page])
+        pages.append(f"{text}\n{PAGE_FOOTER.format(page=page)}")
+
+    return pages, queries
+
+
+def article_hit(content: str, article: int) -> bool:
+    return re.search(rf"Стаття {article}\b", content) is not None or (
+        re.search(rf"(?<![\d.]){article}\.\d+\.", content) is not None
+    )
+
+
+class HashingEmbeddings(Embeddings):
+    """Детерміновані ембедінги "мішок слів" для офлайн-бенчмарків без моделі."""
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest, "little")
+            vector[bucket % self.dimension] += 1.0 if bucket & 1 << 63 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
@@ -0,0 +1,161 @@
+"""
+Порівняння бекендів ембедінгів: PyTorch проти ONNX Runtime (int8).
+
+Перевіряє паритет (косинусна схожість векторів ONNX з векторами PyTorch
+для тих самих текстів та збіг найближчих сусідів) і вимірює затримку
+одиночного запиту та пропускну здатність пакетного кодування.
+
+    python -m benchmarks.embedding_backends --dataset /app/dataset/tax_code300.json \
+        --threads 1 4
+
+Без --dataset використовується синтетичний корпус з benchmarks.corpus.
+"""
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.index_footprint import neighbor_recall
+from benchmarks.retrieval_eval import DEFAULT_QUESTIONS, load_questions, print_table
+from benchmarks.run import latency_summary
+from data.dataset import Dataset
+
+
+def cosine_agreement(reference: np.ndarray, candidate: np.ndarray) -> np.ndarray:
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    candidate = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    return (reference * candidate).sum(axis=1)
+
+
+def nearest_neighbors(documents: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    documents = documents / np.linalg.norm(documents, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    return np.argsort(-queries @ documents.T, axis=1)[:, :k]
+
+
+def evaluate_backend(
+    name: str,
+    embeddings,
+    texts: List[str],
+    questions: List[str],
+    reference: Optional[Dict[str, np.ndarray]],
+    top_k: int,
+    repeat: int,
+) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    # Прогрів: перший виклик включає ініціалізацію сесії та алокації
+    embeddings.embed_query(questions[0])
+
+    samples = []
+    for question in questions[:repeat]:
+        start = time.perf_counter()
+        embeddings.embed_query(question)
+        samples.append(time.perf_counter() - start)
+    latency = latency_summary(samples)
+
+    start = time.perf_counter()
+    documents = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    bulk_seconds = time.perf_counter() - start
+    queries = np.asarray(embeddings.embed_documents(questions), dtype=np.float32)
+
+    row = {
+        "backend": name,
+        "query_p50_ms": latency["p50_ms"],
+        "query_p95_ms": latency["p95_ms"],
+        "bulk_texts_per_s": round(len(texts) / bulk_seconds, 1),
+        "cosine_mean": 1.0,
+        "cosine_min": 1.0,
+        f"neighbor_recall@{top_k}": 1.0,
+    }
+    if reference is not None:
+        cosine = cosine_agreement(reference["documents"], documents)
+        row["cosine_mean"] = float(cosine.mean())
+        row["cosine_min"] = float(cosine.min())
+        row[f"neighbor_recall@{top_k}"] = neighbor_recall(
+            nearest_neighbors(reference["documents"], reference["queries"], top_k),
+            nearest_neighbors(documents, queries, top_k),
+        )
+    return row, {"documents": documents, "queries": queries}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Embedding backend comparison")
+    parser.add_argument("--dataset", help="JSON датасет, збережений Dataset")
+    parser.add_argument("--questions", default=DEFAULT_QUESTIONS)
+    parser.add_argument(
+        "--model",
+        default="sentence-transformers/paraphrase-multilingual-mpnet-base-v2",
+    )
+    parser.add_argument(
+        "--threads",
+        nargs="+",
+        type=int,
+        default=[1, os.cpu_count() or 1],
+        help="Кількість потоків intra-op для ONNX конфігурацій",
+    )
+    parser.add_argument("--no-fp32", action="store_true", help="Без ONNX fp32")
+    parser.add_argument("--limit", type=int, default=1000, help="Кількість текстів")
+    parser.add_argument("--repeat", type=int, default=50, help="Запитів для затримки")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--output", default="embedding_backends.json")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.dataset:
+        texts = [item["text"] for item in Dataset.load_dataset(args.dataset, "json")]
+        questions = [item["question"] for item in load_questions(args.questions)]
+    else:
+        pages, queries = generate_corpus(num_articles=300)
+        with tempfile.TemporaryDirectory() as workdir:
+            pdf_path = os.path.join(workdir, "synthetic_tax_code.pdf")
+            open(pdf_path, "wb").close()
+            processor = Dataset(pdf_path)
+            dataset = processor.chunk_documents(
+                [processor._build_document(pdf_path, pages)], chunk_size=250, overlap=50
+            )
+        texts = [item["text"] for item in dataset]
+        questions = [query["question"] for query in queries]
+    texts = texts[: args.limit]
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    from embeddings.onnx_embeddings import OnnxEmbeddings
+
+    backends = [("torch", lambda: HuggingFaceEmbeddings(model_name=args.model))]
+    for threads in args.threads:
+        backends.append(
+            (
+                f"onnx-int8/{threads}t",
+                lambda threads=threads: OnnxEmbeddings(args.model, num_threads=threads),
+            )
+        )
+    if not args.no_fp32:
+        backends.append(
+            ("onnx-fp32", lambda: OnnxEmbeddings(args.model, quantize=False))
+        )
+
+    rows = []
+    reference = None
+    for name, factory in backends:
+        row, vectors = evaluate_backend(
+            name, factory(), texts, questions, reference, args.top_k, args.repeat
+        )
+        # Першим іде PyTorch: його вектори - еталон для паритету
+        reference = reference or vectors
+        rows.append(row)
+
+    print(f"{len(texts)} texts, {len(questions)} questions")
+    print_table(rows)
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(rows, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Порівняння форматів зберігання векторів: пам'ять індексу та втрата recall.
+
+Для кожної конфігурації (float32, float16, sq8, з PCA або без) індекс
+будується з тих самих ембедінгів, а його top-k порівнюється з точним
+пошуком у float32 Flat індексі.
+
+    python -m benchmarks.index_footprint --dataset /app/dataset/tax_code1000.json \
+        --configs float32 float16 sq8 sq8:256
+
+Без --dataset використовується синтетичний корпус з benchmarks.corpus.
+"""
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from benchmarks.corpus import HashingEmbeddings, generate_corpus
+from benchmarks.retrieval_eval import DEFAULT_QUESTIONS, load_questions, print_table
+from data.dataset import Dataset
+from embeddings.embeddings_faiss import EmbeddingsManager
+
+
+def parse_config(spec: str) -> Tuple[str, Optional[int]]:
+    storage, _, pca_dim = spec.partition(":")
+    return storage, int(pca_dim) if pca_dim else None
+
+
+def neighbor_recall(baseline: np.ndarray, candidate: np.ndarray) -> float:
+    k = baseline.shape[1]
+    overlaps = [
+        len(set(expected) & set(found)) / k
+        for expected, found in zip(baseline, candidate)
+    ]
+    return float(np.mean(overlaps))
+
+
+def evaluate_config(
+    spec: str,
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    baseline: np.ndarray,
+    baseline_bytes: int,
+    embeddings,
+    workdir: str,
+) -> Dict:
+    storage, pca_dim = parse_config(spec)
+    manager = EmbeddingsManager(
+        persist_directory=os.path.join(workdir, spec.replace(":", "_")),
+        embeddings=embeddings,
+        storage=storage,
+        pca_dim=pca_dim,
+    )
+
+    start = time.perf_counter()
+    index = manager.build_index(vectors)
+    build_seconds = time.perf_counter() - start
+
+    latencies = []
+    found = []
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], baseline.shape[1])
+        latencies.append(time.perf_counter() - start)
+        found.append(ids[0])
+
+    index_bytes = len(faiss.serialize_index(index))
+    k = baseline.shape[1]
+    return {
+        "config": spec,
+        "index_factory": manager.index_factory or "Flat",
+        "index_bytes": index_bytes,
+        "bytes_per_vector": round(index_bytes / len(vectors), 1),
+        "memory_ratio": round(index_bytes / baseline_bytes, 3),
+        f"neighbor_recall@{k}": neighbor_recall(baseline, np.asarray(found)),
+        "build_seconds": round(build_seconds, 3),
+        "query_p50_ms": float(np.percentile(np.asarray(latencies) * 1000, 50)),
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Index memory footprint report")
+    parser.add_argument("--dataset", help="JSON датасет, збережений Dataset")
+    parser.add_argument("--questions", default=DEFAULT_QUESTIONS)
+    parser.add_argument(
+        "--configs",
+        nargs="+",
+        default=["float32", "float16", "sq8", "float16:256", "sq8:256"],
+        help="Формат зберігання з необов'язковою розмірністю PCA: sq8:256",
+    )
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument(
+        "--embeddings-model",
+        default="sentence-transformers/paraphrase-multilingual-mpnet-base-v2",
+    )
+    parser.add_argument("--output", default="index_footprint.json")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.dataset:
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        texts = [item["text"] for item in Dataset.load_dataset(args.dataset, "json")]
+        questions = [item["question"] for item in load_questions(args.questions)]
+        embeddings = HuggingFaceEmbeddings(model_name=args.embeddings_model)
+    else:
+        pages, queries = generate_corpus(num_articles=1000)
+        with tempfile.TemporaryDirectory() as workdir:
+            pdf_path = os.path.join(workdir, "synthetic_tax_code.pdf")
+            open(pdf_path, "wb").close()
+            processor = Dataset(pdf_path)
+            dataset = processor.chunk_documents(
+                [processor._build_document(pdf_path, pages)], chunk_size=250, overlap=50
+            )
+        texts = [item["text"] for item in dataset]
+        questions = [query["question"] for query in queries]
+        embeddings = HashingEmbeddings()
+
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    query_vectors = np.asarray(embeddings.embed_documents(questions), dtype=np.float32)
+
+    # Точний float32 пошук - еталон, відносно якого рахується втрата recall
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, baseline = exact.search(query_vectors, args.top_k)
+    baseline_bytes = len(faiss.serialize_index(exact))
+
+    with tempfile.TemporaryDirectory() as workdir:
+        rows = [
+            evaluate_config(
+                spec,
+                vectors,
+                query_vectors,
+                baseline,
+                baseline_bytes,
+                embeddings,
+                workdir,
+            )
+            for spec in args.configs
+        ]
+
+    print(f"{len(vectors)} vectors, dimension {vectors.shape[1]}")
+    print_table(rows)
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(rows, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Оцінка якості пошуку на розміченому наборі питань.
+
+Перебирає конфігурації нарізки (chunk_size, overlap) та типи FAISS індексу,
+будує кожен індекс через Dataset та EmbeddingsManager і звітує recall@k,
+MRR, розмір індексу, час побудови та затримку запиту.
+
+    python -m benchmarks.retrieval_eval --pdf /app/code/tax_code.pdf \
+        --chunk-sizes 250 500 1000 --overlaps 50 200 --index-types Flat HNSW32
+
+Без --pdf оцінка виконується на синтетичному корпусі з benchmarks.corpus.
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import tempfile
+import time
+from itertools import product
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from benchmarks.corpus import HashingEmbeddings, article_hit, generate_corpus
+from data.dataset import Dataset
+from embeddings.embeddings_faiss import EmbeddingsManager
+
+DEFAULT_QUESTIONS = os.path.join(os.path.dirname(__file__), "questions_tax_code.jsonl")
+
+
+class CachingEmbeddings(Embeddings):
+    """
+    Кешує ембедінги документів між конфігураціями індексу з однаковою
+    нарізкою; ембедінги запитів не кешуються, щоб затримка була чесною.
+    """
+
+    def __init__(self, base: Embeddings):
+        self.base = base
+        self.cache: Dict[str, List[float]] = {}
+        self.embed_seconds = 0.0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        missing = [text for text in dict.fromkeys(texts) if text not in self.cache]
+        if missing:
+            start = time.perf_counter()
+            for text, vector in zip(missing, self.base.embed_documents(missing)):
+                self.cache[text] = vector
+            self.embed_seconds += time.perf_counter() - start
+        return [self.cache[text] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.base.embed_query(text)
+
+
+def load_questions(path: str) -> List[Dict]:
+    with open(path, "r", encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def evaluate_vectorstore(vectorstore, questions: List[Dict], top_ks: List[int]) -> Dict:
+    max_k = max(top_ks)
+    hits = {k: 0 for k in top_ks}
+    reciprocal_ranks = []
+    latencies = []
+
+    for item in questions:
+        start = time.perf_counter()
+        results = vectorstore.similarity_search_with_score(item["question"], k=max_k)
+        latencies.append(time.perf_counter() - start)
+
+        rank = None
+        for position, (doc, _) in enumerate(results, 1):
+            if any(article_hit(doc.page_content, a) for a in item["articles"]):
+                rank = position
+                break
+
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+        for k in top_ks:
+            if rank and rank <= k:
+                hits[k] += 1
+
+    latencies_ms = np.asarray(latencies) * 1000
+    metrics = {f"recall@{k}": hits[k] / len(questions) for k in top_ks}
+    metrics["mrr"] = float(np.mean(reciprocal_ranks))
+    metrics["query_p50_ms"] = float(np.percentile(latencies_ms, 50))
+    metrics["query_p95_ms"] = float(np.percentile(latencies_ms, 95))
+    return metrics
+
+
+def directory_size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(path, name))
+        for name in os.listdir(path)
+        if os.path.isfile(os.path.join(path, name))
+    )
+
+
+def run_sweep(
+    processor: Dataset,
+    documents: List[Dict],
+    questions: List[Dict],
+    embeddings: Embeddings,
+    chunk_sizes: List[int],
+    overlaps: List[int],
+    index_types: List[str],
+    top_ks: List[int],
+    workdir: str,
+) -> List[Dict]:
+    rows = []
+
+    for chunk_size, overlap in product(chunk_sizes, overlaps):
+        if overlap >= chunk_size:
+            continue
+
+        dataset = processor.chunk_documents(
+            documents, chunk_size=chunk_size, overlap=overlap
+        )
+        name = f"chunks_{chunk_size}_{overlap}"
+        processor.save_dataset(
+            dataset, output_formats=["json"], base_path=workdir, filename=name
+        )
+        cached = CachingEmbeddings(embeddings)
+
+        for index_type in index_types:
+            persist_directory = os.path.join(workdir, f"{name}_{index_type}")
+            manager = EmbeddingsManager(
+                persist_directory=persist_directory,
+                embeddings=cached,
+                index_factory=index_type,
+            )
+
+            embed_before = cached.embed_seconds
+            start = time.perf_counter()
+            vectorstore = manager.create_vectorstore(
+                os.path.join(workdir, f"{name}.json"), file_type="json"
+            )
+            build_seconds = time.perf_counter() - start
+            embed_seconds = cached.embed_seconds - embed_before
+
+            row = {
+                "chunk_size": chunk_size,
+                "overlap": overlap,
+                "index_type": index_type,
+                "vectors": vectorstore.index.ntotal,
+                "index_bytes": directory_size(persist_directory),
+                "embed_seconds": round(embed_seconds, 3),
+                "index_build_seconds": round(build_seconds - embed_seconds, 3),
+            }
+            row.update(evaluate_vectorstore(vectorstore, questions, top_ks))
+            rows.append(row)
+
+            logging.getLogger(__name__).info(f"Evaluated {row}")
+
+    return rows
+
+
+def print_table(rows: List[Dict]) -> None:
+    if not rows:
+        print("No configurations evaluated")
+        return
+
+    columns = list(rows[0].keys())
+    formatted = [
+        [
+            f"{row[col]:.3f}" if isinstance(row[col], float) else str(row[col])
+            for col in columns
+        ]
+        for row in rows
+    ]
+    widths = [
+        max(len(col), *(len(values[i]) for values in formatted))
+        for i, col in enumerate(columns)
+    ]
+    print("  ".join(col.rjust(width) for col, width in zip(columns, widths)))
+    for values in formatted:
+        print("  ".join(value.rjust(width) for value, width in zip(values, widths)))
+
+
+def write_rows(rows: List[Dict], path: str) -> None:
+    if path.endswith(".csv"):
+        with open(path, "w", encoding="utf-8", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(rows, file, ensure_ascii=False, indent=2)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Retrieval quality sweep")
+    parser.add_argument("--pdf", nargs="+", help="PDF файли або директорія")
+    parser.add_argument("--questions", default=DEFAULT_QUESTIONS)
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[250, 500, 1000])
+    parser.add_argument("--overlaps", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--index-types", nargs="+", default=["Flat", "HNSW32"])
+    parser.add_argument("--top-k", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument(
+        "--embeddings-model",
+        default="sentence-transformers/paraphrase-multilingual-mpnet-base-v2",
+    )
+    parser.add_argument("--output", default="retrieval_eval.json")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.pdf:
+            from langchain_huggingface import HuggingFaceEmbeddings
+
+            processor = Dataset(args.pdf[0] if len(args.pdf) == 1 else args.pdf)
+            documents = processor.extract_documents()
+            questions = load_questions(args.questions)
+            embeddings = HuggingFaceEmbeddings(model_name=args.embeddings_model)
+        else:
+            pages, queries = generate_corpus()
+            pdf_path = os.path.join(workdir, "synthetic_tax_code.pdf")
+            open(pdf_path, "wb").close()
+            processor = Dataset(pdf_path)
+            documents = [processor._build_document(pdf_path, pages)]
+            questions = [
+                {"question": q["question"], "articles": [q["article"]]} for q in queries
+            ]
+            embeddings = HashingEmbeddings()
+
+        rows = run_sweep(
+            processor,
+            documents,
+            questions,
+            embeddings,
+            args.chunk_sizes,
+            args.overlaps,
+            args.index_types,
+            args.top_k,
+            workdir,
+        )
+
+    rows.sort(key=lambda row: (-row[f"recall@{max(args.top_k)}"], row["index_bytes"]))
+    print_table(rows)
+    if rows:
+        write_rows(rows, args.output)
+
+
+if __name__ == "__main__":
+    main()
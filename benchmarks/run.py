@@ -0,0 +1,315 @@
+"""
+Офлайн-бенчмарк RAG-конвеєра на синтетичному корпусі.
+
+Запуск з кореня репозиторію:
+
+    python -m benchmarks.run --output bench_results.json
+
+Результати пишуться у JSON разом з хешем коміту, тож прогони різних
+комітів можна порівнювати між собою.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+from langchain_core.language_models.fake import FakeListLLM
+
+from benchmarks.corpus import HashingEmbeddings, article_hit, generate_corpus
+from data.dataset import Dataset
+from embeddings.embeddings_faiss import EmbeddingsManager
+from model.model import TaxCodeAssistant
+from tokenizer.tokenizer import Tokenizer
+
+STUB_ANSWER = (
+    "Відповідно до статті 167 Податкового кодексу України ставка податку на "
+    "доходи фізичних осіб становить 18 відсотків. Крім того, сплачується "
+    "військовий збір за ставкою 1,5 відсотка. Податковий агент утримує податок "
+    "під час виплати доходу та подає звітність щокварталу."
+)
+
+
+class StubLLM(FakeListLLM):
+    """Заглушка LLM з фіксованою затримкою генерації."""
+
+    def _call(self, *args, **kwargs) -> str:
+        if self.sleep:
+            time.sleep(self.sleep)
+        return super()._call(*args, **kwargs)
+
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    values = np.asarray(samples) * 1000
+    return {
+        "count": len(samples),
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+    }
+
+
+def measure(func: Callable, repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def bench_tokenizer(pages: List[str], chunk_size: int, overlap: int) -> Dict:
+    tokenizer = Tokenizer()
+    text = "\n\n".join(pages)
+    words = len(tokenizer._split_into_words(text))
+
+    samples = measure(
+        lambda: tokenizer.tokenize_text(
+            text, max_chunk_size=chunk_size, overlap=overlap
+        ),
+        repeat=3,
+    )
+    best = min(samples)
+    return {
+        "words": words,
+        "seconds": best,
+        "words_per_second": words / best,
+        "mb_per_second": len(text.encode("utf-8")) / best / 1e6,
+    }
+
+
+def bench_ingestion(
+    processor: Dataset, pdf_path: str, pages: List[str], chunk_size: int, overlap: int
+) -> Dict:
+    start = time.perf_counter()
+    document = processor._build_document(pdf_path, pages)
+    dataset = processor._tokenize_text(
+        document["text"], document, chunk_size=chunk_size, overlap=overlap
+    )
+    seconds = time.perf_counter() - start
+
+    return {
+        "pages": len(pages),
+        "chunks": len(dataset),
+        "seconds": seconds,
+        "pages_per_second": len(pages) / seconds,
+    }, dataset
+
+
+def bench_index_build(
+    processor: Dataset, dataset: List[Dict], workdir: str, embeddings
+) -> Dict:
+    processor.save_dataset(
+        dataset, output_formats=["json"], base_path=workdir, filename="bench"
+    )
+    manager = EmbeddingsManager(
+        persist_directory=os.path.join(workdir, "db"), embeddings=embeddings
+    )
+
+    start = time.perf_counter()
+    manager.create_vectorstore(os.path.join(workdir, "bench.json"), file_type="json")
+    seconds = time.perf_counter() - start
+
+    return {
+        "vectors": len(dataset),
+        "seconds": seconds,
+        "vectors_per_second": len(dataset) / seconds,
+        "index_bytes": os.path.getsize(
+            os.path.join(manager.persist_directory, "index.faiss")
+        ),
+    }
+
+
+def bench_retrieval(
+    assistant: TaxCodeAssistant, queries: List[Dict], top_ks: List[int]
+) -> Dict:
+    samples = []
+    hits = {k: 0 for k in top_ks}
+    contexts = []
+
+    for query in queries:
+        start = time.perf_counter()
+        context = assistant.get_context(query["question"], top_k=max(top_ks))
+        samples.append(time.perf_counter() - start)
+        contexts.append(context)
+
+        for k in top_ks:
+            if any(
+                article_hit(doc["content"], query["article"]) for doc in context[:k]
+            ):
+                hits[k] += 1
+
+    return {
+        "latency": latency_summary(samples),
+        "recall": {f"@{k}": hits[k] / len(queries) for k in top_ks},
+    }, contexts
+
+
+def bench_postprocessing(
+    assistant: TaxCodeAssistant, contexts: List[List[Dict]]
+) -> Dict:
+    format_samples = []
+    for context in contexts:
+        format_samples.extend(measure(lambda: assistant.format_sources(context), 1))
+
+    response = STUB_ANSWER + "\n\nДжерела:\n" + assistant.format_sources(contexts[0])
+    validate_samples = measure(lambda: assistant.validate_response(response), 1000)
+
+    return {
+        "format_sources": latency_summary(format_samples),
+        "validate_response": latency_summary(validate_samples),
+    }
+
+
+async def bench_query_endpoint(
+    assistant: TaxCodeAssistant, queries: List[Dict], concurrency: int, users: int
+) -> Dict:
+    """
+    Пропускна здатність /query. Запити розподіляються між users
+    користувачами: справедлива черга виконує одночасно не більше
+    LLM_PER_USER_CONCURRENCY генерацій одного користувача, тож з users=1
+    вимірюється черга одного користувача, а не сервер.
+    """
+    import httpx
+
+    import backend.main
+
+    backend.main.assistant = assistant
+    transport = httpx.ASGITransport(app=backend.main.app)
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+    errors = 0
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+
+        async def send(number: int, query: Dict):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(
+                    "/query",
+                    json={
+                        "text": f"Який податок: {query['question']}",
+                        "user_id": number % users,
+                    },
+                )
+                samples.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(send(number, query) for number, query in enumerate(queries))
+        )
+        seconds = time.perf_counter() - start
+
+    return {
+        "requests": len(queries),
+        "concurrency": concurrency,
+        "users": users,
+        "errors": errors,
+        "requests_per_second": len(queries) / seconds,
+        "latency": latency_summary(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RAG pipeline benchmarks")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--articles", type=int, default=200)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--overlap", type=int, default=200)
+    parser.add_argument("--top-k", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--users",
+        type=int,
+        default=None,
+        help="Різних user_id у запитах до /query, типово --concurrency",
+    )
+    parser.add_argument(
+        "--llm-latency",
+        type=float,
+        default=0.05,
+        help="Затримка заглушки LLM на одну генерацію, с",
+    )
+    parser.add_argument(
+        "--embeddings-model",
+        default=None,
+        help="Справжня модель ембедінгів замість офлайн-хешування",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.embeddings_model:
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        embeddings = HuggingFaceEmbeddings(model_name=args.embeddings_model)
+    else:
+        embeddings = HashingEmbeddings()
+
+    pages, queries = generate_corpus(num_articles=args.articles)
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "params": vars(args),
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Dataset перевіряє лише існування файлу; текст сторінок синтетичний
+        pdf_path = os.path.join(workdir, "synthetic_tax_code.pdf")
+        open(pdf_path, "wb").close()
+        processor = Dataset(pdf_path)
+
+        results["tokenizer"] = bench_tokenizer(pages, args.chunk_size, args.overlap)
+        results["ingestion"], dataset = bench_ingestion(
+            processor, pdf_path, pages, args.chunk_size, args.overlap
+        )
+        results["index_build"] = bench_index_build(
+            processor, dataset, workdir, embeddings
+        )
+
+        assistant = TaxCodeAssistant(
+            persist_directory=os.path.join(workdir, "db"),
+            llm=StubLLM(responses=[STUB_ANSWER], sleep=args.llm_latency),
+            embeddings=embeddings,
+            max_retries=1,
+        )
+        results["retrieval"], contexts = bench_retrieval(assistant, queries, args.top_k)
+        results["postprocessing"] = bench_postprocessing(assistant, contexts)
+        results["query_endpoint"] = asyncio.run(
+            bench_query_endpoint(
+                assistant, queries, args.concurrency, args.users or args.concurrency
+            )
+        )
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(results, file, ensure_ascii=False, indent=2)
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
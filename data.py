@@ -3,21 +3,22 @@ from embeddings.embeddings_faiss import EmbeddingsManager
 
 pdf_path = "/app/code/tax_code.pdf"
 
-processor = Dataset(pdf_path)
+processor = Dataset(pdf_path, cache_dir="/app/dataset/pdf_cache")
 
-dataset = processor.prepare_dataset(chunk_size=1000, overlap=200)
+dataset = processor.prepare_dataset(chunk_size=300, overlap=50)
 
 processor.save_dataset(
     dataset,
-    output_formats=["json"],
+    output_formats=["arrow"],
     base_path="/app/dataset",
-    filename="tax_code1000",
+    filename="tax_code300",
 )
 
 
-embeddings_manager = EmbeddingsManager(persist_directory="/app/db")
+# Пошук по дочірніх фрагментах з 60 слів, у контекст - батьківські з 300
+embeddings_manager = EmbeddingsManager(persist_directory="/app/db", child_chunk_size=60)
 
 vectorstore = embeddings_manager.create_vectorstore(
-    dataset_path="/app/dataset/tax_code1000.json",
-    file_type="json",
+    dataset_path="/app/dataset/tax_code300.arrow",
+    file_type="arrow",
 )
@@ -0,0 +1,103 @@
+import os
+from typing import Dict, Iterator, List
+
+import pyarrow as pa
+
+# Плоска колонкова схема фрагмента: вкладені structure та document_metadata
+# розгорнуті в окремі колонки, щоб їх можна було читати вибірково
+SCHEMA = pa.schema(
+    [
+        ("text", pa.string()),
+        ("source_file", pa.string()),
+        ("length", pa.int64()),
+        ("chunk_index", pa.int64()),
+        ("sentence_start", pa.int64()),
+        ("sentence_end", pa.int64()),
+        ("page", pa.int64()),
+        ("articles", pa.list_(pa.string())),
+        ("points", pa.list_(pa.string())),
+        ("total_pages", pa.int64()),
+        ("document_path", pa.string()),
+    ]
+)
+
+DEFAULT_BATCH_SIZE = 4096
+
+
+def _flatten(item: Dict) -> Dict:
+    structure = item.get("structure") or {}
+    document_metadata = item.get("document_metadata") or {}
+    return {
+        "text": item.get("text"),
+        "source_file": item.get("source_file"),
+        "length": item.get("length"),
+        "chunk_index": item.get("chunk_index"),
+        "sentence_start": item.get("sentence_start"),
+        "sentence_end": item.get("sentence_end"),
+        "page": structure.get("page"),
+        "articles": structure.get("articles", []),
+        "points": structure.get("points", []),
+        "total_pages": document_metadata.get("total_pages"),
+        "document_path": document_metadata.get("document_path"),
+    }
+
+
+def _nest(row: Dict) -> Dict:
+    return {
+        "text": row["text"],
+        "source_file": row["source_file"],
+        "length": row["length"],
+        "chunk_index": row["chunk_index"],
+        "sentence_start": row["sentence_start"],
+        "sentence_end": row["sentence_end"],
+        "structure": {
+            "articles": row["articles"],
+            "points": row["points"],
+            "page": row["page"],
+        },
+        "document_metadata": {
+            "total_pages": row["total_pages"],
+            "document_path": row["document_path"],
+        },
+    }
+
+
+def write_arrow_dataset(
+    dataset: List[Dict], path: str, batch_size: int = DEFAULT_BATCH_SIZE
+) -> None:
+    """
+    Запис фрагментів у Arrow IPC файл пакетами по batch_size рядків
+    """
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, SCHEMA) as writer:
+            for start in range(0, len(dataset), batch_size):
+                rows = [_flatten(item) for item in dataset[start : start + batch_size]]
+                writer.write_batch(pa.RecordBatch.from_pylist(rows, schema=SCHEMA))
+
+
+def iter_record_batches(
+    path: str, columns: List[str] = None
+) -> Iterator[pa.RecordBatch]:
+    """
+    Потокове читання Arrow файлу без завантаження всього датасету
+
+    Файл відображається в пам'ять, тож пакет читається без копіювання, а
+    колонки, яких немає в columns, взагалі не торкаються.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Dataset not found at {path}")
+
+    with pa.memory_map(path, "r") as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            yield batch.select(columns) if columns else batch
+
+
+def read_arrow_dataset(path: str) -> List[Dict]:
+    """
+    Читання всього датасету у формі записів Dataset (з вкладеною structure)
+    """
+    return [
+        _nest(row) for batch in iter_record_batches(path) for row in batch.to_pylist()
+    ]
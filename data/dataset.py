@@ -1,11 +1,15 @@
 import logging
 import os
 import re
+from collections import Counter
 from typing import Dict, List, Optional, Union
 
 import pandas as pd
 import PyPDF2
 
+from data.arrow_store import read_arrow_dataset, write_arrow_dataset
+from data.dedup import MinHashDeduplicator
+from data.extraction_cache import ExtractionCache, file_digest
 from tokenizer.tokenizer import Tokenizer
 
 
@@ -16,7 +20,17 @@ class Dataset:
         "subpoint": r"[а-я]\)",
     }
 
-    def __init__(self, pdf_paths: Union[str, List[str]]):
+    # Скільки перших і останніх рядків сторінки перевіряється на колонтитули
+    BOILERPLATE_EDGE_LINES = 3
+
+    def __init__(
+        self,
+        pdf_paths: Union[str, List[str]],
+        strip_boilerplate: bool = True,
+        boilerplate_min_ratio: float = 0.5,
+        dedup_threshold: Optional[float] = 0.9,
+        cache_dir: Optional[str] = None,
+    ):
 
         logging.basicConfig(
             level=logging.INFO, format="%(asctime)s - %(levelname)s: %(message)s"
@@ -25,6 +39,20 @@ class Dataset:
 
         self.tokenizer = Tokenizer()
 
+        # Колонтитули, що повторюються на сторінках, прибираються до нарізки,
+        # а майже однакові фрагменти відкидаються після неї
+        self.strip_boilerplate = strip_boilerplate
+        self.boilerplate_min_ratio = boilerplate_min_ratio
+        self.deduplicator = (
+            MinHashDeduplicator(threshold=dedup_threshold) if dedup_threshold else None
+        )
+        self.stats = {"boilerplate_lines": 0, "chunks": 0, "duplicates_removed": 0}
+
+        # Текст сторінок кешується за вмістом PDF: зміна параметрів нарізки
+        # не потребує повторного розбору файлу
+        cache_dir = cache_dir or os.getenv("PDF_CACHE_DIR")
+        self.cache = ExtractionCache(cache_dir) if cache_dir else None
+
         self.pdf_paths = self._normalize_pdf_paths(pdf_paths)
 
         if not self.pdf_paths:
@@ -55,13 +83,46 @@ class Dataset:
         cleaned = cleaned.strip()
         return cleaned
 
+    def _boilerplate_key(self, line: str) -> str:
+        return re.sub(r"\d+", "#", re.sub(r"\s+", " ", line).strip())
+
+    def _find_boilerplate(self, page_texts: List[str]) -> set:
+        """
+        Рядки-колонтитули: перші та останні рядки сторінки, що (з точністю
+        до цифр) повторюються щонайменше на boilerplate_min_ratio сторінок
+        """
+        if len(page_texts) < 3:
+            return set()
+
+        counts = Counter()
+        for text in page_texts:
+            lines = [line for line in (text or "").splitlines() if line.strip()]
+            # Сторінка з одного рядка не має окремого колонтитула
+            if len(lines) < 2:
+                continue
+            edges = (
+                lines[: self.BOILERPLATE_EDGE_LINES]
+                + lines[-self.BOILERPLATE_EDGE_LINES :]
+            )
+            counts.update({self._boilerplate_key(line) for line in edges})
+
+        min_pages = max(3, self.boilerplate_min_ratio * len(page_texts))
+        return {key for key, count in counts.items() if key and count >= min_pages}
+
+    def _strip_boilerplate(self, text: str, boilerplate: set) -> str:
+        return "\n".join(
+            line
+            for line in (text or "").splitlines()
+            if self._boilerplate_key(line) not in boilerplate
+        )
+
     def _extract_structure_info(self, text: str, page_num: int) -> Dict:
 
         page_pattern = (
             r'Газета\s+"Все\s+про\s+бухгалтерський\s+облік"\s+(\d+)\s+gazeta\.vobu\.ua'
         )
         page_match = re.search(page_pattern, text)
-        page_num = int(page_match.group(1)) if page_match else None
+        page_num = int(page_match.group(1)) if page_match else page_num
 
         articles = [
             f"Стаття {match}" for match in re.findall(self.PATTERNS["article"], text)
@@ -83,47 +144,83 @@ class Dataset:
     def _extract_text_from_pdf(self, pdf_path: str) -> Dict:
 
         try:
-            with open(pdf_path, "rb") as file:
-                reader = PyPDF2.PdfReader(file)
-                full_text = ""
-                page_details = []
-
-                for page_num, page in enumerate(reader.pages, 1):
-                    page_text = page.extract_text()
-                    cleaned_text = self._clean_text(page_text)
-                    full_text += cleaned_text + "\n\n"
-
-                    structure_info = self._extract_structure_info(
-                        cleaned_text, page_num
-                    )
-
-                    page_details.append(
-                        {
-                            "page_number": page_num,
-                            "text_preview": cleaned_text[:200],
-                            "structure": structure_info,
-                        }
-                    )
-
-                return {
-                    "path": pdf_path,
-                    "filename": os.path.basename(pdf_path),
-                    "text": full_text,
-                    "total_pages": len(reader.pages),
-                    "page_details": page_details,
-                }
+            digest = file_digest(pdf_path) if self.cache is not None else None
+            page_texts = self.cache.get(digest) if digest else None
+
+            if page_texts is None:
+                with open(pdf_path, "rb") as file:
+                    reader = PyPDF2.PdfReader(file)
+                    page_texts = [page.extract_text() for page in reader.pages]
+                if digest:
+                    self.cache.put(digest, pdf_path, page_texts)
+            else:
+                self.logger.info(f"Using cached text for {pdf_path}")
+
+            return self._build_document(pdf_path, page_texts)
         except Exception as e:
             self.logger.error(f"Error processing {pdf_path}: {e}")
             return None
 
-    def prepare_dataset(self, chunk_size: int = 512, overlap: int = 100) -> List[Dict]:
+    def _build_document(self, pdf_path: str, page_texts: List[str]) -> Dict:
+
+        full_text = ""
+        page_details = []
+
+        boilerplate = (
+            self._find_boilerplate(page_texts) if self.strip_boilerplate else set()
+        )
+        if boilerplate:
+            self.stats["boilerplate_lines"] += len(boilerplate)
+            self.logger.info(
+                f"Stripping {len(boilerplate)} repeated header/footer lines "
+                f"from {os.path.basename(pdf_path)}"
+            )
+
+        for page_num, page_text in enumerate(page_texts, 1):
+            # Номер сторінки береться з колонтитула до його видалення
+            structure_info = self._extract_structure_info(
+                self._clean_text(page_text), page_num
+            )
 
-        documents = [
+            cleaned_text = self._clean_text(
+                self._strip_boilerplate(page_text, boilerplate)
+            )
+            full_text += cleaned_text + "\n\n"
+
+            page_details.append(
+                {
+                    "page_number": page_num,
+                    "text_preview": cleaned_text[:200],
+                    "structure": structure_info,
+                }
+            )
+
+        return {
+            "path": pdf_path,
+            "filename": os.path.basename(pdf_path),
+            "text": full_text,
+            "total_pages": len(page_texts),
+            "page_details": page_details,
+        }
+
+    def extract_documents(self) -> List[Dict]:
+
+        return [
             doc
             for doc in [self._extract_text_from_pdf(path) for path in self.pdf_paths]
             if doc is not None
         ]
 
+    def prepare_dataset(self, chunk_size: int = 512, overlap: int = 100) -> List[Dict]:
+
+        return self.chunk_documents(
+            self.extract_documents(), chunk_size=chunk_size, overlap=overlap
+        )
+
+    def chunk_documents(
+        self, documents: List[Dict], chunk_size: int = 512, overlap: int = 100
+    ) -> List[Dict]:
+
         dataset = []
 
         for doc in documents:
@@ -132,6 +229,21 @@ class Dataset:
             )
             dataset.extend(chunks)
 
+        self.stats["chunks"] += len(dataset)
+        if self.deduplicator is not None:
+            duplicates = self.deduplicator.find_duplicates(
+                [chunk["text"] for chunk in dataset]
+            )
+            if duplicates:
+                dataset = [
+                    chunk for i, chunk in enumerate(dataset) if i not in duplicates
+                ]
+            self.stats["duplicates_removed"] += len(duplicates)
+            self.logger.info(
+                f"Removed {len(duplicates)} near-duplicate chunks, "
+                f"{len(dataset)} vectors left"
+            )
+
         return dataset
 
     def _tokenize_text(
@@ -143,7 +255,7 @@ class Dataset:
         )
 
         processed_chunks = []
-        for chunk in chunks:
+        for chunk_index, chunk in enumerate(chunks):
             structure_info = self._extract_structure_info(
                 chunk["text"],
                 self._find_page_number(chunk["text"], document_info["page_details"]),
@@ -153,6 +265,10 @@ class Dataset:
                 "text": chunk["text"],
                 "source_file": document_info["filename"],
                 "length": chunk["length"],
+                # Положення фрагмента в документі: номер та діапазон речень
+                "chunk_index": chunk_index,
+                "sentence_start": chunk["sentence_start"],
+                "sentence_end": chunk["sentence_end"],
                 "structure": structure_info,
                 "document_metadata": {
                     "total_pages": document_info["total_pages"],
@@ -186,11 +302,19 @@ class Dataset:
 
         os.makedirs(base_path, exist_ok=True)
 
-        df = pd.DataFrame(dataset)
+        df = None
 
         for format in output_formats:
-            filename = f"{filename}.{format}"
-            filepath = os.path.join(base_path, filename)
+            filepath = os.path.join(base_path, f"{filename}.{format}")
+
+            # Arrow пишеться напряму з записів, без проміжного DataFrame
+            if format == "arrow":
+                write_arrow_dataset(dataset, filepath)
+                self.logger.info(f"Saved {format.upper()} dataset: {filepath}")
+                continue
+
+            if df is None:
+                df = pd.DataFrame(dataset)
 
             if format == "json":
                 df.to_json(filepath, orient="records", force_ascii=False, indent=2)
@@ -215,5 +339,7 @@ class Dataset:
             return pd.read_csv(dataset_path).to_dict("records")
         elif file_type == "parquet":
             return pd.read_parquet(dataset_path).to_dict("records")
+        elif file_type == "arrow":
+            return read_arrow_dataset(dataset_path)
         else:
             raise ValueError(f"Unsupported file type: {file_type}")
@@ -0,0 +1,90 @@
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import mmh3
+import numpy as np
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+class MinHashDeduplicator:
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        num_perm: int = 128,
+        bands: int = 32,
+        shingle_size: int = 5,
+        seed: int = 1,
+    ):
+        """
+        Пошук майже дублікатів фрагментів через MinHash та LSH
+
+        Кандидати знаходяться за збігом хоча б однієї смуги сигнатури, а
+        дублікатом вважається пара з оцінкою схожості Жаккара за множинами
+        шинглів (послідовностей shingle_size слів) не нижче threshold.
+
+        Args:
+            threshold (float): Поріг схожості Жаккара
+            num_perm (int): Довжина сигнатури MinHash
+            bands (int): Кількість смуг LSH; num_perm має ділитися на bands
+            shingle_size (int): Кількість слів у шинглі
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm має ділитися на bands без остачі")
+
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        # Перестановки виду (a * x + b) mod p над 32-бітним хешем шингла
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def _shingles(self, text: str) -> List[str]:
+        words = text.lower().split()
+        if len(words) <= self.shingle_size:
+            return [" ".join(words)]
+        return [
+            " ".join(words[i : i + self.shingle_size])
+            for i in range(len(words) - self.shingle_size + 1)
+        ]
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = np.fromiter(
+            (mmh3.hash(shingle, signed=False) for shingle in set(self._shingles(text))),
+            dtype=np.uint64,
+        )
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % _MERSENNE_PRIME
+        return (permuted & _MAX_HASH).min(axis=1)
+
+    def find_duplicates(self, texts: List[str]) -> Dict[int, int]:
+        """
+        Індекси майже дублікатів та індекс першого фрагмента, який вони
+        повторюють; перший фрагмент групи завжди зберігається
+        """
+        signatures = [self.signature(text) for text in texts]
+        buckets: Dict[Tuple[int, bytes], List[int]] = defaultdict(list)
+        duplicates = {}
+
+        for i, signature in enumerate(signatures):
+            bands = [
+                (band, signature[band * self.rows : (band + 1) * self.rows].tobytes())
+                for band in range(self.bands)
+            ]
+            candidates = {j for key in bands for j in buckets.get(key, [])}
+
+            for j in sorted(candidates):
+                if np.mean(signatures[j] == signature) >= self.threshold:
+                    duplicates[i] = j
+                    break
+            else:
+                # У кошики потрапляють лише оригінали: дублікат порівнюється
+                # з першим фрагментом групи, а не з іншим дублікатом
+                for key in bands:
+                    buckets[key].append(i)
+
+        return duplicates
@@ -0,0 +1,68 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import List, Optional
+
+import PyPDF2
+
+# Змінюється при кожній зміні логіки витягу тексту, щоб старий кеш
+# не використовувався з новим екстрактором
+EXTRACTOR_VERSION = f"pypdf2-{PyPDF2.__version__}/1"
+
+
+def file_digest(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    def __init__(self, cache_dir: str, extractor_version: str = EXTRACTOR_VERSION):
+        """
+        Кеш тексту сторінок PDF, адресований вмістом файлу
+
+        Ключ - SHA-256 вмісту PDF разом з версією екстрактора, тож
+        перейменований або перенесений файл знаходиться в кеші, а змінений
+        файл витягується заново.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.cache_dir = cache_dir
+        self.extractor_version = extractor_version
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_path(self, digest: str) -> str:
+        key = hashlib.sha256(f"{digest}:{self.extractor_version}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, digest: str) -> Optional[List[str]]:
+        path = self._entry_path(digest)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                return json.load(file)["pages"]
+        except (OSError, ValueError, KeyError) as e:
+            self.logger.warning(f"Ignoring broken cache entry {path}: {e}")
+            return None
+
+    def put(self, digest: str, pdf_path: str, page_texts: List[str]) -> None:
+        entry = {
+            "sha256": digest,
+            "extractor": self.extractor_version,
+            "source": os.path.basename(pdf_path),
+            "pages": page_texts,
+        }
+        # Запис через тимчасовий файл: паралельний запуск не прочитає
+        # недописаний запис
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(entry, file, ensure_ascii=False)
+            os.replace(tmp_path, self._entry_path(digest))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
@@ -0,0 +1,51 @@
+import os
+from typing import Optional
+
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_BACKENDS = ("torch", "onnx")
+
+
+def create_embeddings(
+    model_name: str,
+    device: str = "cpu",
+    use_service: Optional[bool] = None,
+    backend: Optional[str] = None,
+) -> Embeddings:
+    """
+    Модель ембедінгів для асистента та менеджера індексу
+
+    Якщо задано EMBEDDINGS_SOCKET, повертається клієнт спільного сервісу
+    (embeddings.service), і воркер не завантажує власну копію моделі.
+    Інакше модель завантажується в процесі: PyTorch (torch) або int8
+    ONNX Runtime (onnx, лише CPU) за EMBEDDINGS_BACKEND; кількість потоків
+    ONNX задається EMBEDDINGS_THREADS.
+    """
+    socket_path = os.getenv("EMBEDDINGS_SOCKET")
+    if use_service is None:
+        use_service = bool(socket_path)
+
+    if use_service:
+        from embeddings.service import EmbeddingServiceClient
+
+        return EmbeddingServiceClient(socket_path)
+
+    backend = backend or os.getenv("EMBEDDINGS_BACKEND", "torch")
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(
+            f"Unknown embeddings backend {backend!r}, expected one of "
+            f"{', '.join(EMBEDDING_BACKENDS)}"
+        )
+
+    if backend == "onnx":
+        if device != "cpu":
+            raise ValueError("ONNX embeddings backend supports only device='cpu'")
+
+        from embeddings.onnx_embeddings import OnnxEmbeddings
+
+        threads = os.getenv("EMBEDDINGS_THREADS")
+        return OnnxEmbeddings(model_name, num_threads=int(threads) if threads else None)
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(model_name=model_name, model_kwargs={"device": device})
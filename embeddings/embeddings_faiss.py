@@ -1,19 +1,83 @@
+import json
 import logging
 import os
-from typing import Dict, List
+import uuid
+from typing import Dict, List, Optional, Tuple
 
-from langchain.embeddings import HuggingFaceEmbeddings
+import faiss
+import numpy as np
+import pyarrow.compute as pc
 from langchain.schema import Document
 from langchain.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.embeddings import Embeddings
 
+from data.arrow_store import DEFAULT_BATCH_SIZE
+from data.arrow_store import SCHEMA as ARROW_SCHEMA
+from data.arrow_store import iter_record_batches
 from data.dataset import Dataset
+from embeddings.backends import create_embeddings
+from embeddings.metadata_filter import MetadataTable
+from embeddings.parent_store import ParentStore
+from embeddings.sharded_store import SHARD_METADATA_FILE
+
+# Формат зберігання векторів і відповідний кодек faiss.index_factory
+STORAGE_CODECS = {"float32": "Flat", "float16": "SQfp16", "sq8": "SQ8"}
+
+
+def resolve_index_factory(
+    index_factory: Optional[str] = None,
+    storage: str = "float32",
+    pca_dim: Optional[int] = None,
+) -> Optional[str]:
+    """
+    Опис індексу для faiss.index_factory з формату зберігання та PCA
+
+    Повертає None для звичайного float32 Flat індексу.
+    """
+    if index_factory:
+        if storage != "float32" or pca_dim:
+            raise ValueError(
+                "index_factory не поєднується з storage/pca_dim; "
+                "вкажіть повний опис, наприклад 'PCA256,SQ8'"
+            )
+        return index_factory
+
+    if storage not in STORAGE_CODECS:
+        raise ValueError(
+            f"Невідомий формат зберігання: {storage}. "
+            f"Доступні: {', '.join(STORAGE_CODECS)}"
+        )
+    if storage == "float32" and not pca_dim:
+        return None
+
+    prefix = f"PCA{pca_dim}," if pca_dim else ""
+    return prefix + STORAGE_CODECS[storage]
 
 
 class EmbeddingsManager:
+    # Список можливих метаданих документа
+    METADATA_FIELDS = [
+        "source_file",
+        "length",
+        "articles",
+        "points",
+        "page",
+        "total_pages",
+        "document_path",
+    ]
+
     def __init__(
         self,
         model_name: str = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2",
         persist_directory: str = "db",
+        embeddings: Optional[Embeddings] = None,
+        index_factory: Optional[str] = None,
+        shard_metadata: Optional[Dict] = None,
+        storage: str = "float32",
+        pca_dim: Optional[int] = None,
+        child_chunk_size: Optional[int] = None,
+        child_overlap: int = 15,
     ):
         """
         Ініціалізація менеджера ембедінгів
@@ -21,20 +85,41 @@ class EmbeddingsManager:
         Args:
             model_name (str): Назва моделі для створення ембедінгів
             persist_directory (str): Директорія для збереження FAISS індексу
+            embeddings (Embeddings): Готова модель ембедінгів замість model_name
+            index_factory (str): Опис індексу FAISS для faiss.index_factory
+                (наприклад "HNSW32" або "IVF256,Flat"); за замовчуванням Flat
+            shard_metadata (dict): Опис шарду для ShardedVectorStore
+                (наприклад {"family": "labour_code", "year": 2024}), який
+                зберігається поруч з індексом у shard.json
+            storage (str): Формат зберігання векторів: "float32", "float16"
+                (вдвічі менше пам'яті) або "sq8" (скалярна int8 квантизація,
+                вчетверо менше пам'яті)
+            pca_dim (int): Розмірність після PCA, що тренується під час
+                побудови індексу; None - без зменшення розмірності
+            child_chunk_size (int): Розмір дочірніх фрагментів у словах для
+                пошуку small-to-big: індексуються малі фрагменти, а фрагменти
+                датасету зберігаються як батьківські в parents.parquet;
+                None - індексувати фрагменти датасету напряму
+            child_overlap (int): Перекриття дочірніх фрагментів у словах
         """
         # Налаштування логування
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
 
         # Ініціалізація моделі ембедінгів
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=model_name,
-            model_kwargs={
-                "device": "cuda" if os.environ.get("USE_CUDA") == "1" else "cpu"
-            },
-        )
+        if embeddings is not None:
+            self.embeddings = embeddings
+        else:
+            self.embeddings = create_embeddings(
+                model_name, "cuda" if os.environ.get("USE_CUDA") == "1" else "cpu"
+            )
 
         self.persist_directory = persist_directory
+        self.index_factory = resolve_index_factory(index_factory, storage, pca_dim)
+        self.pca_dim = pca_dim
+        self.child_chunk_size = child_chunk_size
+        self.child_overlap = child_overlap
+        self.shard_metadata = shard_metadata
 
         # Створюємо директорію, якщо вона не існує
         os.makedirs(persist_directory, exist_ok=True)
@@ -48,19 +133,8 @@ class EmbeddingsManager:
             # Створюємо метадані для документа, перевіряючи наявність ключів
             metadata = {}
 
-            # Список можливих метаданих
-            metadata_fields = [
-                "source_file",
-                "length",
-                "articles",
-                "points",
-                "page",
-                "total_pages",
-                "document_path",
-            ]
-
             # Додаємо тільки ті метадані, які є в датасеті
-            for field in metadata_fields:
+            for field in self.METADATA_FIELDS:
                 if field in item:
                     metadata[field] = str(item[field])
 
@@ -79,22 +153,45 @@ class EmbeddingsManager:
         """
         Створення векторної бази даних з датасету
         """
-        # Завантаження датасету
-        self.logger.info(f"Завантаження датасету з {dataset_path}")
-        dataset = Dataset.load_dataset(dataset_path, file_type)
+        if file_type == "arrow":
+            # Arrow датасет читається пакетами без списку словників у пам'яті
+            self.logger.info(f"Потокове читання датасету з {dataset_path}")
+            vectorstore, table, parents = self.stream_vectorstore(dataset_path)
+        else:
+            # Завантаження датасету
+            self.logger.info(f"Завантаження датасету з {dataset_path}")
+            dataset = Dataset.load_dataset(dataset_path, file_type)
 
-        # Підготовка документів
-        self.logger.info("Підготовка документів")
-        documents = self.prepare_documents(dataset)
+            # Підготовка документів
+            self.logger.info("Підготовка документів")
+            documents = self.prepare_documents(dataset)
+            # Рядки таблиці метаданих у тому ж порядку, що й вектори індексу
+            table = MetadataTable.from_dataset(
+                [item for item in dataset if "text" in item]
+            )
 
-        # Створення векторної бази даних
-        self.logger.info("Створення векторного сховища")
-        vectorstore = FAISS.from_documents(documents, self.embeddings)
+            parents = None
+            if self.child_chunk_size:
+                parents = documents
+                documents, owners = self.split_children(parents)
+                table = table.take(owners)
+
+            # Створення векторної бази даних
+            self.logger.info("Створення векторного сховища")
+            vectorstore = self.build_vectorstore(documents)
 
         # Збереження бази
-        index_path = os.path.join(self.persist_directory, "index.faiss")
-        store_path = os.path.join(self.persist_directory, "store.pkl")
         vectorstore.save_local(self.persist_directory)
+        table.save(self.persist_directory)
+        if parents is not None:
+            ParentStore(parents).save(self.persist_directory)
+        if self.shard_metadata is not None:
+            with open(
+                os.path.join(self.persist_directory, SHARD_METADATA_FILE),
+                "w",
+                encoding="utf-8",
+            ) as file:
+                json.dump(self.shard_metadata, file, ensure_ascii=False, indent=2)
 
         self.logger.info(
             f"Векторне сховище створено та збережено в {self.persist_directory}"
@@ -102,6 +199,147 @@ class EmbeddingsManager:
 
         return vectorstore
 
+    def stream_vectorstore(
+        self, dataset_path: str, batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> Tuple[FAISS, MetadataTable, Optional[List[Document]]]:
+        """
+        Побудова векторного сховища з Arrow датасету пакетами
+
+        Кожен пакет одразу перетворюється на документи та ембедінги; повний
+        датасет у вигляді словників не створюється, а індекс тренується
+        один раз на всіх векторах.
+        """
+        columns = ["text"] + [
+            field for field in self.METADATA_FIELDS if field in ARROW_SCHEMA.names
+        ]
+        documents = []
+        parents = [] if self.child_chunk_size else None
+        vectors = []
+        tables = []
+
+        for batch in iter_record_batches(dataset_path, columns=columns):
+            batch = batch.filter(pc.is_valid(batch.column("text")))
+            values = {name: batch.column(name).to_pylist() for name in columns}
+            texts = values.pop("text")
+
+            batch_documents = [
+                Document(
+                    page_content=text,
+                    metadata={
+                        field: str(column[i])
+                        for field, column in values.items()
+                        if column[i] is not None
+                    },
+                )
+                for i, text in enumerate(texts)
+            ]
+            batch_table = MetadataTable.from_columns(
+                source_file=values["source_file"],
+                page=values["page"],
+                articles=values["articles"],
+                points=values["points"],
+            )
+            rows = range(len(batch_documents))
+
+            if parents is not None:
+                start_id = len(parents)
+                parents.extend(batch_documents)
+                batch_documents, rows = self.split_children(batch_documents, start_id)
+
+            tables.append(batch_table.take(rows, start_id=len(documents)))
+            documents.extend(batch_documents)
+            vectors.append(
+                np.asarray(
+                    self.embeddings.embed_documents(
+                        [doc.page_content for doc in batch_documents]
+                    ),
+                    dtype=np.float32,
+                )
+            )
+            self.logger.info(f"Оброблено {len(documents)} фрагментів")
+
+        if not documents:
+            raise ValueError(f"Датасет {dataset_path} не містить фрагментів")
+
+        vectorstore = self.build_vectorstore(documents, vectors=np.vstack(vectors))
+        return vectorstore, MetadataTable.concat(tables), parents
+
+    def split_children(
+        self, parents: List[Document], start_id: int = 0
+    ) -> Tuple[List[Document], List[int]]:
+        """
+        Нарізка батьківських документів на малі дочірні фрагменти
+
+        Повертає дочірні документи з parent_id у метаданих та позицію
+        батька кожного з них у списку parents.
+        """
+        # Текст фрагментів датасету вже не має розділових знаків між
+        # реченнями, тож дочірні фрагменти - вікна слів з перекриттям
+        step = max(1, self.child_chunk_size - self.child_overlap)
+        children = []
+        owners = []
+        for offset, parent in enumerate(parents):
+            words = parent.page_content.split()
+            for start in range(0, max(1, len(words) - self.child_overlap), step):
+                metadata = dict(parent.metadata, parent_id=str(start_id + offset))
+                children.append(
+                    Document(
+                        page_content=" ".join(
+                            words[start : start + self.child_chunk_size]
+                        ),
+                        metadata=metadata,
+                    )
+                )
+                owners.append(offset)
+        return children, owners
+
+    def build_vectorstore(
+        self, documents: List[Document], vectors: Optional[np.ndarray] = None
+    ) -> FAISS:
+        """
+        Побудова FAISS індексу заданого типу з підготовлених документів
+
+        Готові вектори (наприклад, обчислені пакетами) не перераховуються.
+        """
+        if vectors is None and not self.index_factory:
+            return FAISS.from_documents(documents, self.embeddings)
+
+        if vectors is None:
+            vectors = np.asarray(
+                self.embeddings.embed_documents(
+                    [doc.page_content for doc in documents]
+                ),
+                dtype=np.float32,
+            )
+        index = self.build_index(vectors)
+
+        ids = [str(uuid.uuid4()) for _ in documents]
+        return FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=InMemoryDocstore(dict(zip(ids, documents))),
+            index_to_docstore_id=dict(enumerate(ids)),
+        )
+
+    def build_index(self, vectors: np.ndarray) -> faiss.Index:
+        """
+        Створення, тренування та наповнення індексу з self.index_factory
+
+        PCA та скалярний квантизатор тренуються на самих векторах корпусу.
+        """
+        if self.pca_dim and len(vectors) < self.pca_dim:
+            raise ValueError(
+                f"Для PCA{self.pca_dim} потрібно щонайменше {self.pca_dim} "
+                f"векторів, отримано {len(vectors)}"
+            )
+
+        index = faiss.index_factory(vectors.shape[1], self.index_factory or "Flat")
+        if not index.is_trained:
+            self.logger.info(f"Тренування індексу {self.index_factory}")
+            index.train(vectors)
+        index.add(vectors)
+        return index
+
     def load_vectorstore(self) -> FAISS:
         """
         Завантаження існуючої векторної бази даних
@@ -112,7 +350,11 @@ class EmbeddingsManager:
                 f"Векторне сховище не знайдено в {self.persist_directory}"
             )
 
-        return FAISS.load_local(self.persist_directory, self.embeddings)
+        return FAISS.load_local(
+            self.persist_directory,
+            self.embeddings,
+            allow_dangerous_deserialization=True,
+        )
 
     def add_to_vectorstore(self, dataset_path: str, file_type: str = "json") -> None:
         """
@@ -134,12 +376,36 @@ class EmbeddingsManager:
             self.logger.info("Підготовка нових документів")
             new_documents = self.prepare_documents(new_dataset)
 
+            new_table = MetadataTable.from_dataset(
+                [item for item in new_dataset if "text" in item]
+            )
+
+            # Сховище small-to-big отримує нових батьків і їхні дочірні фрагменти
+            parent_store = ParentStore.load(self.persist_directory)
+            if parent_store is not None:
+                new_parents = new_documents
+                new_documents, owners = self.split_children(
+                    new_parents, start_id=len(parent_store)
+                )
+                parent_store.extend(new_parents)
+            else:
+                owners = range(len(new_documents))
+
             # Додавання нових документів до бази
             self.logger.info("Додавання нових документів до векторного сховища")
+            start_id = vectorstore.index.ntotal
             vectorstore.add_documents(new_documents)
+            new_table = new_table.take(owners, start_id=start_id)
 
             # Збереження оновленої бази
             vectorstore.save_local(self.persist_directory)
+            if parent_store is not None:
+                parent_store.save(self.persist_directory)
+
+            table = MetadataTable.load(self.persist_directory)
+            (table.append(new_table) if table is not None else new_table).save(
+                self.persist_directory
+            )
             self.logger.info(
                 f"Векторне сховище оновлено та збережено в {self.persist_directory}"
             )
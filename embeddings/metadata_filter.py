@@ -0,0 +1,257 @@
+import logging
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import faiss
+import numpy as np
+import pandas as pd
+from langchain.schema import Document
+from langchain.vectorstores import FAISS
+
+METADATA_TABLE_FILE = "metadata.parquet"
+
+# Поля, за якими можна фільтрувати пошук; "article" - віртуальне поле,
+# що відповідає будь-якій статті, згаданій у фрагменті
+FILTER_FIELDS = ("source_file", "page", "article")
+
+# Поля з цілими значеннями: рядок "160" не порівнюється з числом у таблиці
+INTEGER_FIELDS = ("page", "article")
+
+# Оператори виразу фільтра: {"article": {"between": [160, 170]}}
+OPERATORS = ("eq", "in", "between", "gte", "lte")
+
+
+def _article_numbers(articles: List[str], points: List[str]) -> List[int]:
+    numbers = set()
+    for article in articles or []:
+        match = re.search(r"\d+", str(article))
+        if match:
+            numbers.add(int(match.group()))
+    # Фрагмент усередині статті може не містити заголовка "Стаття N",
+    # але пункти 167.1.2 однозначно вказують на статтю
+    for point in points or []:
+        numbers.add(int(str(point).split(".")[0]))
+    return sorted(numbers)
+
+
+def validate_filters(filters: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Перевірка виразу фільтра та приведення скалярних умов до {"eq": value}
+    """
+    normalized = {}
+    for field, condition in filters.items():
+        if field not in FILTER_FIELDS:
+            raise ValueError(f"Невідоме поле фільтра: {field}")
+        condition = (
+            dict(condition) if isinstance(condition, dict) else {"eq": condition}
+        )
+        for operator, value in condition.items():
+            if operator not in OPERATORS:
+                raise ValueError(f"Невідомий оператор фільтра: {operator}")
+            if operator in ("in", "between"):
+                if isinstance(value, (str, bytes, dict)) or not isinstance(
+                    value, Iterable
+                ):
+                    raise ValueError(f"Умова {operator} потребує списку значень")
+                value = list(value)
+                if operator == "between" and len(value) != 2:
+                    raise ValueError("Умова between потребує двох меж")
+                values = value
+            else:
+                values = [value]
+            if field in INTEGER_FIELDS and not all(
+                isinstance(v, int) and not isinstance(v, bool) for v in values
+            ):
+                raise ValueError(f"Поле {field} потребує цілих чисел")
+            condition[operator] = value
+        normalized[field] = condition
+    return normalized
+
+
+class MetadataTable:
+    def __init__(self, frame: pd.DataFrame):
+        """
+        Колонкова таблиця метаданих поруч з FAISS індексом
+
+        Рядок i описує вектор з id i в індексі, тож результат фільтра -
+        готовий набір id для faiss.IDSelector.
+        """
+        self.frame = frame.reset_index(drop=True)
+
+        # Розгорнуті пари (рядок, стаття) для векторизованого пошуку діапазону
+        lengths = self.frame["articles"].map(len).to_numpy()
+        self._article_rows = np.repeat(np.arange(len(self.frame)), lengths)
+        self._article_numbers = (
+            np.concatenate(
+                [np.asarray(a, dtype=np.int64) for a in self.frame["articles"]]
+            )
+            if lengths.sum()
+            else np.empty(0, dtype=np.int64)
+        )
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    @classmethod
+    def from_columns(
+        cls,
+        source_file: List[Optional[str]],
+        page: List[Optional[int]],
+        articles: List[List[str]],
+        points: List[List[str]],
+        start_id: int = 0,
+    ) -> "MetadataTable":
+        frame = pd.DataFrame(
+            {
+                "id": np.arange(start_id, start_id + len(source_file), dtype=np.int64),
+                "source_file": source_file,
+                "page": pd.array(page, dtype="Int64"),
+                "articles": [_article_numbers(a, p) for a, p in zip(articles, points)],
+            }
+        )
+        return cls(frame)
+
+    @classmethod
+    def from_dataset(cls, dataset: List[Dict], start_id: int = 0) -> "MetadataTable":
+        structures = [item.get("structure") or {} for item in dataset]
+        return cls.from_columns(
+            source_file=[item.get("source_file") for item in dataset],
+            page=[
+                structure.get("page", item.get("page"))
+                for item, structure in zip(dataset, structures)
+            ],
+            articles=[structure.get("articles", []) for structure in structures],
+            points=[structure.get("points", []) for structure in structures],
+            start_id=start_id,
+        )
+
+    @classmethod
+    def concat(cls, tables: List["MetadataTable"]) -> "MetadataTable":
+        return cls(pd.concat([table.frame for table in tables], ignore_index=True))
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["MetadataTable"]:
+        path = os.path.join(directory, METADATA_TABLE_FILE)
+        if not os.path.exists(path):
+            return None
+        frame = pd.read_parquet(path)
+        frame["articles"] = frame["articles"].map(list)
+        return cls(frame)
+
+    def save(self, directory: str) -> None:
+        self.frame.to_parquet(
+            os.path.join(directory, METADATA_TABLE_FILE),
+            index=False,
+            compression="snappy",
+        )
+
+    def take(self, rows: List[int], start_id: int = 0) -> "MetadataTable":
+        """
+        Рядки в заданому порядку (з повторами) з новою нумерацією id
+        """
+        frame = self.frame.iloc[list(rows)].reset_index(drop=True)
+        frame["id"] = np.arange(start_id, start_id + len(frame), dtype=np.int64)
+        return MetadataTable(frame)
+
+    def append(self, other: "MetadataTable") -> "MetadataTable":
+        return MetadataTable.concat([self, other])
+
+    def _article_mask(self, low: int, high: int) -> np.ndarray:
+        mask = np.zeros(len(self.frame), dtype=bool)
+        matched = (self._article_numbers >= low) & (self._article_numbers <= high)
+        mask[self._article_rows[matched]] = True
+        return mask
+
+    def _condition_mask(self, field: str, operator: str, value: Any) -> np.ndarray:
+        if field == "article":
+            if operator == "eq":
+                return self._article_mask(int(value), int(value))
+            if operator == "in":
+                return np.logical_or.reduce(
+                    [self._article_mask(int(v), int(v)) for v in value]
+                    or [np.zeros(len(self.frame), dtype=bool)]
+                )
+            if operator == "between":
+                return self._article_mask(int(value[0]), int(value[1]))
+            if operator == "gte":
+                return self._article_mask(int(value), np.iinfo(np.int64).max)
+            return self._article_mask(np.iinfo(np.int64).min, int(value))
+
+        column = self.frame[field]
+        if operator == "eq":
+            mask = column == value
+        elif operator == "in":
+            mask = column.isin(list(value))
+        elif operator == "between":
+            mask = (column >= value[0]) & (column <= value[1])
+        elif operator == "gte":
+            mask = column >= value
+        else:
+            mask = column <= value
+        return mask.fillna(False).to_numpy(dtype=bool)
+
+    def select(self, filters: Dict[str, Any]) -> np.ndarray:
+        """
+        Id векторів, що задовольняють фільтр
+
+        Фільтр - словник поле -> умова, умови поєднуються через AND:
+            {"source_file": {"in": ["tax_code.pdf"]},
+             "article": {"between": [160, 170]},
+             "page": {"gte": 100}}
+        Скалярне значення умови означає рівність.
+        """
+        mask = np.ones(len(self.frame), dtype=bool)
+        for field, condition in validate_filters(filters).items():
+            for operator, value in condition.items():
+                mask &= self._condition_mask(field, operator, value)
+        return self.frame["id"].to_numpy(dtype=np.int64)[mask]
+
+
+def _search_parameters(index, selector) -> faiss.SearchParameters:
+    # Вкладений індекс визначає тип параметрів пошуку; налаштування пошуку
+    # самого індексу переносяться, інакше діють значення за замовчуванням
+    base = faiss.downcast_index(
+        index.index if isinstance(index, faiss.IndexPreTransform) else index
+    )
+    if isinstance(base, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=base.hnsw.efSearch)
+    ivf = faiss.try_extract_index_ivf(base)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    return faiss.SearchParameters(sel=selector)
+
+
+def filtered_search(
+    vectorstore: FAISS, embedding: List[float], k: int, ids: np.ndarray
+) -> List[Tuple[Document, float]]:
+    """
+    Пошук лише серед векторів з заданими id
+
+    Селектор передається самому FAISS, тож індекс не обчислює відстані до
+    відфільтрованих векторів замість пошуку з запасом і постфільтрації.
+    """
+    if len(ids) == 0:
+        return []
+
+    vector = np.asarray([embedding], dtype=np.float32)
+    if vectorstore._normalize_L2:
+        faiss.normalize_L2(vector)
+
+    selector = faiss.IDSelectorBatch(ids)
+    distances, indices = vectorstore.index.search(
+        vector,
+        min(k, len(ids)),
+        params=_search_parameters(vectorstore.index, selector),
+    )
+
+    results = []
+    for distance, i in zip(distances[0], indices[0]):
+        if i == -1:
+            continue
+        doc = vectorstore.docstore.search(vectorstore.index_to_docstore_id[i])
+        if not isinstance(doc, Document):
+            logging.getLogger(__name__).warning(f"Документ для id {i} не знайдено")
+            continue
+        results.append((doc, float(distance)))
+    return results
@@ -0,0 +1,158 @@
+"""
+CPU бекенд ембедінгів на ONNX Runtime з динамічною int8 квантизацією.
+
+Модель sentence-transformers експортується в ONNX один раз і кешується на
+диску; далі запити обслуговує onnxruntime без PyTorch. Вектори - середнє
+прихованих станів за маскою уваги, як у пулінгу sentence-transformers.
+"""
+
+import logging
+import os
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "onnx_embeddings")
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model.int8.onnx"
+
+
+def export_onnx(
+    model_name: str, output_dir: str, quantize: bool = True, opset: int = 14
+) -> str:
+    """
+    Експорт трансформера моделі в ONNX та динамічна int8 квантизація ваг
+
+    Returns:
+        str: Шлях до файлу моделі, яку слід завантажувати
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    logger = logging.getLogger(__name__)
+    os.makedirs(output_dir, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    model.eval()
+    tokenizer.save_pretrained(output_dir)
+
+    sample = tokenizer(["Податковий кодекс України"], return_tensors="pt")
+    input_names = [
+        name
+        for name in ("input_ids", "attention_mask", "token_type_ids")
+        if name in sample
+    ]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    model_path = os.path.join(output_dir, MODEL_FILE)
+    logger.info(f"Exporting {model_name} to {model_path}")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+
+    if not quantize:
+        return model_path
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantized_path = os.path.join(output_dir, QUANTIZED_MODEL_FILE)
+    quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+    logger.info(f"Quantized model saved to {quantized_path}")
+    return quantized_path
+
+
+class OnnxEmbeddings(Embeddings):
+    def __init__(
+        self,
+        model_name: str,
+        cache_dir: Optional[str] = None,
+        quantize: bool = True,
+        num_threads: Optional[int] = None,
+        batch_size: int = 32,
+        max_length: int = 128,
+    ):
+        """
+        Ембедінги через ONNX Runtime на CPU
+
+        Args:
+            model_name (str): Модель sentence-transformers з mean pooling
+            cache_dir (str): Директорія експортованих моделей (ONNX_CACHE_DIR)
+            quantize (bool): Використовувати int8 квантизовану модель
+            num_threads (int): Потоки intra-op; None - всі ядра
+            batch_size (int): Розмір пакета при кодуванні документів
+            max_length (int): Максимальна довжина в токенах, як max_seq_length
+                моделі sentence-transformers
+        """
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.logger = logging.getLogger(__name__)
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+
+        cache_dir = cache_dir or os.getenv("ONNX_CACHE_DIR", DEFAULT_CACHE_DIR)
+        model_dir = os.path.join(cache_dir, model_name.replace("/", "__"))
+        model_path = os.path.join(
+            model_dir, QUANTIZED_MODEL_FILE if quantize else MODEL_FILE
+        )
+        if not os.path.exists(model_path):
+            model_path = export_onnx(model_name, model_dir, quantize=quantize)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.session = ort.InferenceSession(
+            model_path, options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = [item.name for item in self.session.get_inputs()]
+        self.logger.info(
+            f"Loaded ONNX embeddings {model_path} (threads: {num_threads or 'all'})"
+        )
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        inputs = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="np",
+        )
+        feed = {name: inputs[name].astype(np.int64) for name in self.input_names}
+        (hidden,) = self.session.run(["last_hidden_state"], feed)
+
+        mask = inputs["attention_mask"][..., None].astype(np.float32)
+        return (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+
+        # Пакети з текстів близької довжини: менше доповнення до спільної довжини
+        order = np.argsort([len(text) for text in texts])
+        vectors = np.empty((len(texts), 0), dtype=np.float32)
+        for start in range(0, len(texts), self.batch_size):
+            batch = order[start : start + self.batch_size]
+            encoded = self._encode([texts[i] for i in batch])
+            if not vectors.shape[1]:
+                vectors = np.empty((len(texts), encoded.shape[1]), dtype=np.float32)
+            vectors[batch] = encoded
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0].tolist()
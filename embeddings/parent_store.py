@@ -0,0 +1,61 @@
+import json
+import os
+from typing import List, Optional
+
+import pandas as pd
+from langchain.schema import Document
+
+PARENT_STORE_FILE = "parents.parquet"
+
+
+class ParentStore:
+    def __init__(self, documents: List[Document]):
+        """
+        Батьківські фрагменти для пошуку small-to-big
+
+        В індексі лежать малі дочірні фрагменти з parent_id у метаданих, а
+        в контекст відповіді потрапляє батьківський фрагмент з цього сховища:
+        id батька - його позиція в списку.
+        """
+        self.documents = documents
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def get(self, parent_id: int) -> Optional[Document]:
+        if 0 <= parent_id < len(self.documents):
+            return self.documents[parent_id]
+        return None
+
+    def extend(self, documents: List[Document]) -> None:
+        self.documents.extend(documents)
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["ParentStore"]:
+        path = os.path.join(directory, PARENT_STORE_FILE)
+        if not os.path.exists(path):
+            return None
+        frame = pd.read_parquet(path)
+        return cls(
+            [
+                Document(page_content=text, metadata=json.loads(metadata))
+                for text, metadata in zip(frame["text"], frame["metadata"])
+            ]
+        )
+
+    def save(self, directory: str) -> None:
+        frame = pd.DataFrame(
+            {
+                "parent_id": range(len(self.documents)),
+                "text": [doc.page_content for doc in self.documents],
+                "metadata": [
+                    json.dumps(doc.metadata, ensure_ascii=False)
+                    for doc in self.documents
+                ],
+            }
+        )
+        frame.to_parquet(
+            os.path.join(directory, PARENT_STORE_FILE),
+            index=False,
+            compression="snappy",
+        )
@@ -0,0 +1,257 @@
+"""
+Спільний процес моделі ембедінгів для кількох воркерів бекенду.
+
+Один процес тримає модель і обслуговує запити через Unix socket, а воркери
+підключаються до нього як клієнти (EMBEDDINGS_SOCKET). Запити, що прийшли
+одночасно, кодуються одним пакетом.
+
+    python -m embeddings.service --socket /run/embeddings/embeddings.sock
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from embeddings.backends import EMBEDDING_BACKENDS, create_embeddings
+
+_HEADER = struct.Struct("!I")
+
+
+def _send_frame(sock: socket.socket, header: dict, payload: bytes = b"") -> None:
+    encoded = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(encoded)) + encoded + payload)
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Embedding service closed the connection")
+        data.extend(chunk)
+    return bytes(data)
+
+
+class EmbeddingServer:
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        socket_path: str,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+    ):
+        """
+        Сервер ембедінгів з мікропакетуванням запитів
+
+        Args:
+            embeddings (Embeddings): Модель, якою володіє процес
+            socket_path (str): Шлях до Unix socket
+            max_batch_size (int): Максимум текстів в одному пакеті моделі
+            max_wait_ms (float): Скільки чекати на інші запити перед кодуванням
+        """
+        self.logger = logging.getLogger(__name__)
+        self.embeddings = embeddings
+        self.socket_path = socket_path
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        # Модель працює в одному потоці: паралелізм дає її власний пул потоків
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="encode")
+        self._queue: Optional[asyncio.Queue] = None
+
+    async def _batcher(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            size = len(pending[0][0])
+            deadline = loop.time() + self.max_wait
+
+            while size < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                size += len(item[0])
+
+            texts = [text for item_texts, _ in pending for text in item_texts]
+            try:
+                vectors = await loop.run_in_executor(
+                    self._executor, self.embeddings.embed_documents, texts
+                )
+                vectors = np.asarray(vectors, dtype=np.float32)
+            except Exception as e:
+                self.logger.exception(f"Encoding failed: {e}")
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            start = 0
+            for item_texts, future in pending:
+                if not future.done():
+                    future.set_result(vectors[start : start + len(item_texts)])
+                start += len(item_texts)
+
+    async def _encode(self, texts: List[str]) -> np.ndarray:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((texts, future))
+        return await future
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                try:
+                    (length,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+                except asyncio.IncompleteReadError:
+                    break
+                request = json.loads(await reader.readexactly(length))
+
+                try:
+                    vectors = await self._encode(request["texts"])
+                    header = {"shape": list(vectors.shape)}
+                    payload = vectors.tobytes()
+                except Exception as e:
+                    header, payload = {"error": str(e)}, b""
+
+                encoded = json.dumps(header).encode("utf-8")
+                writer.write(_HEADER.pack(len(encoded)) + encoded + payload)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self) -> None:
+        self._queue = asyncio.Queue()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        os.makedirs(os.path.dirname(self.socket_path) or ".", exist_ok=True)
+
+        batcher = asyncio.create_task(self._batcher())
+        server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        self.logger.info(f"Embedding service listening on {self.socket_path}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+
+
+class EmbeddingServiceClient(Embeddings):
+    def __init__(
+        self,
+        socket_path: str,
+        batch_size: int = 256,
+        connect_timeout: float = 120.0,
+    ):
+        """
+        Клієнт спільного сервісу ембедінгів
+
+        Кожен потік має власне з'єднання. Під час старту клієнт чекає до
+        connect_timeout секунд, доки сервіс завантажить модель.
+        """
+        self.socket_path = socket_path
+        self.batch_size = batch_size
+        self.connect_timeout = connect_timeout
+        self._local = threading.local()
+
+    def _connect(self) -> socket.socket:
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.socket_path)
+                return sock
+            except (FileNotFoundError, ConnectionRefusedError):
+                sock.close()
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.5)
+
+    def _request(self, texts: List[str]) -> np.ndarray:
+        # Одна повторна спроба: сервіс міг перезапуститися між запитами
+        for attempt in range(2):
+            sock = getattr(self._local, "sock", None)
+            if sock is None:
+                sock = self._local.sock = self._connect()
+            try:
+                _send_frame(sock, {"texts": texts})
+                (length,) = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+                header = json.loads(_recv_exactly(sock, length))
+                if "error" in header:
+                    break
+                # Вектори читаються під тим самим захистом: обірване посеред
+                # них з'єднання інакше лишилося б у потоці з залишком відповіді
+                rows, dimension = header["shape"]
+                payload = _recv_exactly(sock, rows * dimension * 4)
+                break
+            except (ConnectionError, OSError):
+                sock.close()
+                self._local.sock = None
+                if attempt:
+                    raise
+
+        if "error" in header:
+            raise RuntimeError(f"Embedding service error: {header['error']}")
+        return np.frombuffer(payload, dtype=np.float32).reshape(rows, dimension)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(self._request(texts[start : start + self.batch_size]))
+        return [vector.tolist() for vector in vectors]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._request([text])[0].tolist()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Shared embedding model service")
+    parser.add_argument(
+        "--socket",
+        default=os.getenv("EMBEDDINGS_SOCKET", "/run/embeddings/embeddings.sock"),
+    )
+    parser.add_argument(
+        "--model",
+        default="sentence-transformers/paraphrase-multilingual-mpnet-base-v2",
+    )
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument(
+        "--backend",
+        choices=EMBEDDING_BACKENDS,
+        default=os.getenv("EMBEDDINGS_BACKEND", "torch"),
+    )
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    embeddings = create_embeddings(
+        args.model, args.device, use_service=False, backend=args.backend
+    )
+    server = EmbeddingServer(
+        embeddings,
+        args.socket,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+    )
+    asyncio.run(server.serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+import heapq
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from langchain.schema import Document
+from langchain.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+
+from embeddings.metadata_filter import MetadataTable, filtered_search
+from embeddings.parent_store import ParentStore
+
+SHARD_METADATA_FILE = "shard.json"
+DEFAULT_SHARD = "default"
+
+
+class ShardedVectorStore:
+    def __init__(
+        self,
+        root_directory: str,
+        embeddings: Embeddings,
+        max_workers: Optional[int] = None,
+    ):
+        """
+        Набір незалежних FAISS індексів (шардів) з паралельним пошуком
+
+        Кожна піддиректорія root_directory з файлом index.faiss є окремим
+        шардом: кодекс, трудове законодавство, листи ДПС, зміни за рік тощо.
+        Шард будується та оновлюється окремо (EmbeddingsManager з
+        persist_directory=<root>/<shard>), а пошук опитує шарди паралельно
+        і зливає top-k за оцінкою. Індекс у самій root_directory
+        завантажується як шард "default" для сумісності зі старою структурою.
+
+        Args:
+            root_directory (str): Директорія з шардами
+            embeddings (Embeddings): Модель ембедінгів, спільна для всіх шардів
+            max_workers (int): Кількість потоків пошуку; FAISS звільняє GIL
+                під час пошуку, тож шарди обробляються на різних ядрах
+        """
+        self.logger = logging.getLogger(__name__)
+        self.root_directory = root_directory
+        self.embeddings = embeddings
+        self._shards: Dict[str, FAISS] = {}
+        self._metadata: Dict[str, Dict[str, Any]] = {}
+        self._tables: Dict[str, Optional[MetadataTable]] = {}
+        self._parents: Dict[str, Optional[ParentStore]] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or min(8, os.cpu_count() or 1),
+            thread_name_prefix="shard-search",
+        )
+
+    @property
+    def shards(self) -> List[str]:
+        return sorted(self._shards)
+
+    @property
+    def has_parents(self) -> bool:
+        return any(store is not None for store in self._parents.values())
+
+    def shard_metadata(self, name: str) -> Dict[str, Any]:
+        return self._metadata.get(name, {})
+
+    def discover(self) -> Dict[str, str]:
+        """
+        Пошук директорій шардів у root_directory
+        """
+        found = {}
+        if not os.path.isdir(self.root_directory):
+            return found
+
+        if os.path.exists(os.path.join(self.root_directory, "index.faiss")):
+            found[DEFAULT_SHARD] = self.root_directory
+
+        for name in sorted(os.listdir(self.root_directory)):
+            path = os.path.join(self.root_directory, name)
+            if os.path.exists(os.path.join(path, "index.faiss")):
+                found[name] = path
+        return found
+
+    def load(self) -> "ShardedVectorStore":
+        """
+        Завантаження всіх знайдених шардів
+        """
+        for name, path in self.discover().items():
+            self.load_shard(name, path)
+        self.logger.info(f"Loaded {len(self._shards)} shards: {', '.join(self.shards)}")
+        return self
+
+    def load_shard(self, name: str, path: Optional[str] = None) -> None:
+        """
+        Завантаження або перезавантаження одного шарду
+
+        Новий індекс підміняє старий лише після повного завантаження, тож
+        пошук під час оновлення шарду продовжує працювати зі старою версією.
+        """
+        if path is None:
+            path = (
+                self.root_directory
+                if name == DEFAULT_SHARD
+                else os.path.join(self.root_directory, name)
+            )
+        if not os.path.exists(os.path.join(path, "index.faiss")):
+            raise FileNotFoundError(f"Шард {name} не знайдено в {path}")
+
+        vectorstore = FAISS.load_local(
+            path, self.embeddings, allow_dangerous_deserialization=True
+        )
+
+        metadata = {}
+        metadata_path = os.path.join(path, SHARD_METADATA_FILE)
+        if os.path.exists(metadata_path):
+            with open(metadata_path, "r", encoding="utf-8") as file:
+                metadata = json.load(file)
+
+        table = MetadataTable.load(path)
+        parents = ParentStore.load(path)
+
+        with self._lock:
+            self._shards[name] = vectorstore
+            self._metadata[name] = metadata
+            self._tables[name] = table
+            self._parents[name] = parents
+
+    def unload_shard(self, name: str) -> None:
+        with self._lock:
+            self._shards.pop(name, None)
+            self._metadata.pop(name, None)
+            self._tables.pop(name, None)
+            self._parents.pop(name, None)
+
+    def select_shards(
+        self,
+        shards: Optional[Iterable[str]] = None,
+        shard_filter: Optional[Dict[str, Any]] = None,
+    ) -> List[str]:
+        """
+        Вибір шардів за назвою та/або за полями shard.json
+
+        Значення фільтра може бути списком допустимих значень, наприклад
+        {"family": ["tax_code", "labour_code"], "year": 2024}.
+        """
+        names = (
+            self.shards if shards is None else [s for s in shards if s in self._shards]
+        )
+        if not shard_filter:
+            return names
+
+        selected = []
+        for name in names:
+            metadata = self._metadata.get(name, {})
+            if all(
+                (
+                    metadata.get(key) in value
+                    if isinstance(value, (list, tuple, set))
+                    else metadata.get(key) == value
+                )
+                for key, value in shard_filter.items()
+            ):
+                selected.append(name)
+        return selected
+
+    def _search_shard(
+        self,
+        name: str,
+        vectorstore: FAISS,
+        embedding: List[float],
+        k: int,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Tuple[Document, float]]:
+        if filters:
+            table = self._tables.get(name)
+            if table is None:
+                # Без таблиці метаданих шард не може підтвердити умови фільтра
+                self.logger.warning(f"Shard {name} has no metadata table, skipped")
+                return []
+            results = filtered_search(vectorstore, embedding, k, table.select(filters))
+        else:
+            results = vectorstore.similarity_search_with_score_by_vector(embedding, k=k)
+        for doc, _ in results:
+            doc.metadata.setdefault("shard", name)
+        return results
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        shards: Optional[Iterable[str]] = None,
+        shard_filter: Optional[Dict[str, Any]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Tuple[Document, float]]:
+        """
+        Паралельний пошук у вибраних шардах і злиття результатів
+
+        filters обмежує пошук векторами, метадані яких задовольняють умови
+        (див. MetadataTable.select). Всі шарди мають бути побудовані однією моделлю ембедінгів з L2
+        метрикою, тоді відстані порівнювані і менша означає ближчий документ.
+        """
+        with self._lock:
+            targets = [
+                (name, self._shards[name])
+                for name in self.select_shards(shards, shard_filter)
+            ]
+
+        if not targets:
+            return []
+        if len(targets) == 1:
+            name, vectorstore = targets[0]
+            return self._search_shard(name, vectorstore, embedding, k, filters)
+
+        futures = [
+            self._executor.submit(
+                self._search_shard, name, vectorstore, embedding, k, filters
+            )
+            for name, vectorstore in targets
+        ]
+        results = [item for future in futures for item in future.result()]
+        return heapq.nsmallest(k, results, key=lambda item: item[1])
+
+    def search_parents(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        max_chars: int = 8192,
+        fanout: int = 4,
+        **search_kwargs,
+    ) -> List[Tuple[Document, float]]:
+        """
+        Пошук small-to-big: дочірні фрагменти замінюються їхніми батьками
+
+        Шукається k * fanout дочірніх фрагментів, бо кілька з них зазвичай
+        належать одному батьку. Батьки повертаються без повторів у порядку
+        найкращого дочірнього збігу, доки їх не більше k і сумарна довжина
+        не перевищує max_chars. Документи без parent_id повертаються як є.
+        """
+        results = self.similarity_search_with_score_by_vector(
+            embedding, k=k * fanout, **search_kwargs
+        )
+
+        parents = []
+        seen = set()
+        total_chars = 0
+        for doc, score in results:
+            shard = doc.metadata.get("shard")
+            parent_id = doc.metadata.get("parent_id")
+            store = self._parents.get(shard)
+            parent = (
+                store.get(int(parent_id))
+                if store is not None and parent_id is not None
+                else None
+            )
+
+            key = (shard, parent_id) if parent is not None else id(doc)
+            if key in seen:
+                continue
+            seen.add(key)
+
+            if parent is not None:
+                doc = Document(
+                    page_content=parent.page_content,
+                    metadata=dict(parent.metadata, shard=shard, parent_id=parent_id),
+                )
+            if parents and total_chars + len(doc.page_content) > max_chars:
+                break
+
+            parents.append((doc, score))
+            total_chars += len(doc.page_content)
+            if len(parents) >= k:
+                break
+        return parents
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
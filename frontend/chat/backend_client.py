@@ -0,0 +1,82 @@
+import asyncio
+import os
+import weakref
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+BACKEND_URL = os.getenv("BACKEND_URL", "http://backend:8000")
+
+BACKEND_TIMEOUT = httpx.Timeout(
+    connect=float(os.getenv("BACKEND_CONNECT_TIMEOUT", "5")),
+    read=float(os.getenv("BACKEND_READ_TIMEOUT", "180")),
+    write=10.0,
+    pool=10.0,
+)
+BACKEND_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("BACKEND_MAX_CONNECTIONS", "200")),
+    max_keepalive_connections=int(os.getenv("BACKEND_MAX_KEEPALIVE", "50")),
+)
+# Транспорт повторює лише збої встановлення з'єднання: запит ще не дійшов до
+# бекенду, тож повтор не запустить генерацію двічі
+BACKEND_RETRIES = int(os.getenv("BACKEND_RETRIES", "2"))
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Спільний клієнт з пулом з'єднань на кожен event loop.
+
+    З'єднання httpx прив'язані до loop, у якому створені: окремий клієнт
+    мають loop ASGI-воркера та loop фонових задач генерації, а під
+    runserver клієнт створюється для кожного запиту.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            base_url=BACKEND_URL,
+            timeout=BACKEND_TIMEOUT,
+            transport=httpx.AsyncHTTPTransport(
+                retries=BACKEND_RETRIES, limits=BACKEND_LIMITS
+            ),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def query_backend(
+    text: str,
+    metadata: Optional[Dict[str, Any]] = None,
+    chat_id: Optional[int] = None,
+    history: Optional[List[Dict[str, str]]] = None,
+    user_id: Optional[int] = None,
+    summary: Optional[str] = None,
+) -> httpx.Response:
+    # user_id - ключ справедливої черги LLM запитів на бекенді
+    payload = {
+        "text": text,
+        "chat_id": chat_id,
+        "user_id": user_id,
+        "history": history or [],
+        "summary": summary or None,
+    }
+    if metadata is not None:
+        payload["metadata"] = metadata
+    return await get_client().post("/query", json=payload)
+
+
+async def summarize_backend(
+    summary: str,
+    turns: List[Dict[str, str]],
+    chat_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+) -> httpx.Response:
+    payload = {
+        "summary": summary,
+        "turns": turns,
+        "chat_id": chat_id,
+        "user_id": user_id,
+    }
+    return await get_client().post("/summarize", json=payload)
@@ -0,0 +1,277 @@
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .backend_client import query_backend, summarize_backend
+from .models import Chat, Message
+
+ANSWER_JOB_CONCURRENCY = int(os.getenv("ANSWER_JOB_CONCURRENCY", "32"))
+# Задача в статусі running довше за цей час вважається втраченою (рестарт воркера)
+ANSWER_JOB_STALE_AFTER = timedelta(
+    seconds=int(os.getenv("ANSWER_JOB_STALE_AFTER", "600"))
+)
+# Як часто кожен процес шукає втрачені задачі, секунд
+ANSWER_JOB_RECOVER_INTERVAL = int(os.getenv("ANSWER_JOB_RECOVER_INTERVAL", "60"))
+
+# Вікно історії, яке надсилається бекенду разом з питанням
+CHAT_HISTORY_MESSAGES = int(os.getenv("CHAT_HISTORY_MESSAGES", "10"))
+CHAT_HISTORY_MESSAGE_CHARS = int(os.getenv("CHAT_HISTORY_MESSAGE_CHARS", "1500"))
+# Бюджет історії в промпті бекенду (history_budget TaxCodeAssistant): поки
+# нестиснуті ходи в нього вміщаються, резюме не потрібне
+CHAT_HISTORY_BUDGET_TOKENS = int(os.getenv("CHAT_HISTORY_BUDGET_TOKENS", "1024"))
+# Наближено, як model.history.CHARS_PER_TOKEN
+CHAT_HISTORY_CHARS_PER_TOKEN = 3.0
+SOURCES_SEPARATOR = "\n\nДжерела:"
+
+CONNECTION_ERROR_TEXT = "Sorry, I'm having trouble connecting to the server."
+BACKEND_ERROR_TEXT = "Sorry, the server could not answer this question."
+
+logger = logging.getLogger(__name__)
+
+
+class AnswerJobRunner:
+    """
+    Фонова генерація відповідей поза циклом запит-відповідь Django.
+
+    Черга зберігається в БД: повідомлення асистента створюється зі статусом
+    pending одразу разом з питанням і заповнюється, коли бекенд відповість.
+    Задачі виконуються в окремому потоці з власним event loop, тож очікування
+    LLM не займає воркери фронтенду, а паралельність обмежена семафором.
+    """
+
+    def __init__(self, concurrency: int = ANSWER_JOB_CONCURRENCY):
+        self._loop = asyncio.new_event_loop()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="answer-jobs", daemon=True
+        )
+        self._thread.start()
+
+    def start_recovery(self, interval: float = ANSWER_JOB_RECOVER_INTERVAL) -> Future:
+        """
+        Періодичний recover() у циклі задач: перший прохід одразу після
+        старту, далі кожні interval секунд, тож задачі воркера, що впав чи
+        завис, підхоплюються без рестарту і без нового питання.
+        """
+        return asyncio.run_coroutine_threadsafe(
+            self._recover_periodically(interval), self._loop
+        )
+
+    async def _recover_periodically(self, interval: float) -> None:
+        while True:
+            try:
+                # submit() тут, а не в потоці sync_to_async: задача успадкувала
+                # б його контекст і asgiref відмовив би їй у доступі до БД
+                for message_id in await sync_to_async(self._reclaim)():
+                    self.submit(message_id)
+            except Exception:
+                logger.exception("Answer job recovery failed")
+            finally:
+                await sync_to_async(close_old_connections)()
+            await asyncio.sleep(interval)
+
+    def submit(self, message_id: int) -> Future:
+        return asyncio.run_coroutine_threadsafe(self._run(message_id), self._loop)
+
+    async def _run(self, message_id: int) -> None:
+        async with self._semaphore:
+            try:
+                await self._process(message_id)
+            finally:
+                await sync_to_async(close_old_connections)()
+
+    async def _process(self, message_id: int) -> None:
+        # Атомарне захоплення: з кількох воркерів задачу виконає лише один
+        claimed = await Message.objects.filter(
+            id=message_id, status=Message.Status.PENDING
+        ).aupdate(status=Message.Status.RUNNING, updated_at=timezone.now())
+        if not claimed:
+            return
+
+        try:
+            message = await Message.objects.select_related("question", "chat").aget(
+                id=message_id
+            )
+            content, status = await self._generate(message)
+
+            message.content = content
+            message.status = status
+            await message.asave(update_fields=["content", "status", "updated_at"])
+        except Exception:
+            # Інакше повідомлення лишилося б у running до recover() після рестарту
+            logger.exception(f"Answer job for message {message_id} crashed")
+            await Message.objects.filter(id=message_id).aupdate(
+                content=BACKEND_ERROR_TEXT,
+                status=Message.Status.FAILED,
+                updated_at=timezone.now(),
+            )
+            return
+
+        if status == Message.Status.DONE:
+            await self._update_summary(message)
+
+    async def _generate(self, message: Message):
+        if message.question is None:
+            return BACKEND_ERROR_TEXT, Message.Status.FAILED
+
+        try:
+            response = await query_backend(
+                message.question.content,
+                chat_id=message.chat_id,
+                history=await self._history(message),
+                user_id=message.chat.user_id,
+                summary=message.chat.history_summary,
+            )
+            if response.status_code != 200:
+                logger.warning(
+                    f"Backend returned {response.status_code} for message {message.id}"
+                )
+                return BACKEND_ERROR_TEXT, Message.Status.FAILED
+
+            return response.json()["answer"], Message.Status.DONE
+        except httpx.HTTPError as e:
+            logger.warning(f"Backend request for message {message.id} failed: {e}")
+            return CONNECTION_ERROR_TEXT, Message.Status.FAILED
+        except Exception:
+            logger.exception(f"Answer job for message {message.id} crashed")
+            return BACKEND_ERROR_TEXT, Message.Status.FAILED
+
+    def _unsummarized(self, message: Message):
+        # Ходи після резюме чату і до питання, на яке відповідає message
+        rows = Message.objects.filter(
+            chat_id=message.chat_id,
+            id__lt=message.question_id,
+            status=Message.Status.DONE,
+        )
+        if message.chat.summary_until_id is not None:
+            rows = rows.filter(id__gt=message.chat.summary_until_id)
+        return rows
+
+    def _as_turns(self, rows: List[Message]) -> List[Dict[str, str]]:
+        # Блок джерел не потрібен моделі як історія, лише роздуває промпт
+        return [
+            {
+                "role": "assistant" if row.is_assistant else "user",
+                "content": row.content.split(SOURCES_SEPARATOR)[0][
+                    :CHAT_HISTORY_MESSAGE_CHARS
+                ],
+            }
+            for row in rows
+        ]
+
+    async def _history(self, message: Message) -> List[Dict[str, str]]:
+        rows = [
+            row
+            async for row in self._unsummarized(message).order_by("-timestamp", "-id")[
+                :CHAT_HISTORY_MESSAGES
+            ]
+        ]
+        rows.reverse()
+        return self._as_turns(rows)
+
+    def _fits_budget(self, summary: str, turns: List[Dict[str, str]]) -> bool:
+        chars = len(summary or "") + sum(len(turn["content"]) for turn in turns)
+        return chars <= CHAT_HISTORY_BUDGET_TOKENS * CHAT_HISTORY_CHARS_PER_TOKEN
+
+    async def _update_summary(self, message: Message) -> None:
+        """
+        Коли історія для наступного запиту перестає вміщатися у вікно чи
+        бюджет токенів, ходи до поточного питання згортаються в резюме чату,
+        тож наступний запит несе резюме і лише останній хід дослівно
+        """
+        chat = message.chat
+        rows = [
+            row
+            async for row in self._unsummarized(message).order_by("id")[
+                :CHAT_HISTORY_MESSAGES
+            ]
+        ]
+        if not rows:
+            return
+
+        # Наступний запит надішле ці ходи разом з поточним: якщо вони
+        # вміщаються, зайвий виклик LLM не потрібен
+        turns = self._as_turns(rows + [message.question, message])
+        if len(turns) <= CHAT_HISTORY_MESSAGES and self._fits_budget(
+            chat.history_summary, turns
+        ):
+            return
+
+        # Резюме - оптимізація промпту: відповідь уже збережена, тож будь-яка
+        # помилка лише лишає ходи нестиснутими до наступної спроби
+        try:
+            response = await summarize_backend(
+                chat.history_summary,
+                self._as_turns(rows),
+                chat_id=chat.id,
+                user_id=chat.user_id,
+            )
+            if response.status_code != 200:
+                logger.warning(
+                    f"Backend returned {response.status_code} for chat {chat.id} summary"
+                )
+                return
+
+            # Паралельна задача того ж чату могла вже оновити резюме
+            await Chat.objects.filter(
+                id=chat.id, summary_until_id=chat.summary_until_id
+            ).aupdate(
+                history_summary=response.json()["summary"],
+                summary_until_id=rows[-1].id,
+            )
+        except Exception as e:
+            logger.warning(f"History summary for chat {chat.id} failed: {e}")
+
+    def recover(self) -> int:
+        """Повертає в чергу задачі, втрачені після рестарту процесу."""
+        pending = self._reclaim()
+        for message_id in pending:
+            self.submit(message_id)
+        return len(pending)
+
+    def _reclaim(self) -> List[int]:
+        """
+        Id задач до виконання: pending та running довше за
+        ANSWER_JOB_STALE_AFTER, які повертаються в pending
+        """
+        stale_before = timezone.now() - ANSWER_JOB_STALE_AFTER
+        Message.objects.filter(
+            status=Message.Status.RUNNING, updated_at__lt=stale_before
+        ).update(status=Message.Status.PENDING)
+
+        pending = list(
+            Message.objects.filter(status=Message.Status.PENDING).values_list(
+                "id", flat=True
+            )
+        )
+        if pending:
+            logger.info(f"Re-enqueued {len(pending)} pending answer jobs")
+        return pending
+
+
+_runner: Optional[AnswerJobRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_runner() -> AnswerJobRunner:
+    global _runner
+
+    with _runner_lock:
+        if _runner is None:
+            _runner = AnswerJobRunner()
+            _runner.start_recovery()
+    return _runner
+
+
+async def enqueue_answer(message_id: int) -> None:
+    runner = await sync_to_async(get_runner)()
+    runner.submit(message_id)
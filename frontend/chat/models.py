@@ -6,16 +6,60 @@ class Chat(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     title = models.CharField(max_length=200)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Резюме ходів до summary_until включно; новіші ходи надсилаються дослівно
+    history_summary = models.TextField(blank=True, default="")
+    summary_until = models.ForeignKey(
+        "Message",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at", "-id"], name="chat_user_created_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.username}'s chat: {self.title}"
 
 
 class Message(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        RUNNING = "running"
+        DONE = "done"
+        FAILED = "failed"
+
     chat = models.ForeignKey(Chat, on_delete=models.CASCADE)
     content = models.TextField()
     is_assistant = models.BooleanField(default=False)
     timestamp = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.DONE
+    )
+    question = models.ForeignKey(
+        "self",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="answers",
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["chat", "-timestamp", "-id"], name="message_chat_timestamp_idx"
+            ),
+        ]
+
+    @property
+    def is_pending(self):
+        return self.status in (self.Status.PENDING, self.Status.RUNNING)
 
     def __str__(self):
         return f"{'Assistant' if self.is_assistant else 'User'}: {self.content[:50]}"
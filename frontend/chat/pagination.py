@@ -0,0 +1,66 @@
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from django.db.models import Q, QuerySet
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(moment: datetime, pk: int) -> str:
+    raw = f"{moment.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        moment, pk = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(moment), int(pk)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+def parse_limit(value: Optional[str]) -> int:
+    try:
+        limit = int(value) if value else DEFAULT_PAGE_SIZE
+    except ValueError:
+        limit = DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+async def keyset_page(
+    queryset: QuerySet,
+    time_field: str,
+    before: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> Tuple[List, Optional[str]]:
+    """
+    Сторінка записів від найновіших до старіших за ключем (time_field, id).
+
+    Замість OFFSET запит продовжується від курсора останнього запису, тож
+    за наявності складеного індексу вартість сторінки не залежить від
+    довжини історії.
+    """
+    if before:
+        moment, pk = decode_cursor(before)
+        queryset = queryset.filter(
+            Q(**{f"{time_field}__lt": moment}) | Q(**{time_field: moment, "id__lt": pk})
+        )
+
+    rows = [
+        row async for row in queryset.order_by(f"-{time_field}", "-id")[: limit + 1]
+    ]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, time_field), last.id)
+
+    return rows, next_cursor
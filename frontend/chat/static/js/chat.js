@@ -87,6 +87,88 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    // Poll answers that are still being generated in the background
+    function pollPendingMessage(element) {
+        fetch(`/chat/messages/${element.dataset.messageId}/`, {credentials: 'same-origin'})
+            .then(response => response.ok ? response.json() : Promise.reject(response.status))
+            .then(data => {
+                if (data.pending) {
+                    setTimeout(() => pollPendingMessage(element), 2000);
+                    return;
+                }
+                element.textContent = data.content;
+                element.dataset.status = data.status;
+                element.classList.remove('pending');
+                messagesContainer.scrollTop = messagesContainer.scrollHeight;
+            })
+            .catch(() => setTimeout(() => pollPendingMessage(element), 5000));
+    }
+
+    document.querySelectorAll('.message.pending').forEach(pollPendingMessage);
+
+    // Keyset-paginated history: older messages are prepended on demand
+    function renderMessage(message) {
+        const element = document.createElement('div');
+        element.className = `message ${message.is_assistant ? 'assistant' : 'user'}`;
+        element.dataset.messageId = message.id;
+        element.dataset.status = message.status;
+        if (message.pending) {
+            element.classList.add('pending');
+            element.textContent = 'Генерую відповідь...';
+            pollPendingMessage(element);
+        } else {
+            element.textContent = message.content;
+        }
+        return element;
+    }
+
+    const olderMessagesButton = document.querySelector('.load-older-messages');
+    if (olderMessagesButton) {
+        olderMessagesButton.addEventListener('click', function() {
+            const chatId = this.dataset.chatId;
+            fetch(`/chat/api/chats/${chatId}/messages/?before=${this.dataset.cursor}`, {credentials: 'same-origin'})
+                .then(response => response.json())
+                .then(data => {
+                    const previousHeight = messagesContainer.scrollHeight;
+                    const fragment = document.createDocumentFragment();
+                    data.results.forEach(message => fragment.appendChild(renderMessage(message)));
+                    this.after(fragment);
+                    messagesContainer.scrollTop += messagesContainer.scrollHeight - previousHeight;
+
+                    if (data.next_cursor) {
+                        this.dataset.cursor = data.next_cursor;
+                    } else {
+                        this.remove();
+                    }
+                });
+        });
+    }
+
+    const moreChatsButton = document.querySelector('.load-more-chats');
+    if (moreChatsButton) {
+        moreChatsButton.addEventListener('click', function() {
+            fetch(`/chat/api/chats/?before=${this.dataset.cursor}`, {credentials: 'same-origin'})
+                .then(response => response.json())
+                .then(data => {
+                    data.results.forEach(chat => {
+                        const item = document.createElement('div');
+                        item.className = 'chat-item';
+                        const link = document.createElement('a');
+                        link.href = `?chat_id=${chat.id}`;
+                        link.textContent = chat.title;
+                        item.appendChild(link);
+                        this.before(item);
+                    });
+
+                    if (data.next_cursor) {
+                        this.dataset.cursor = data.next_cursor;
+                    } else {
+                        this.remove();
+                    }
+                });
+        });
+    }
+
     // Periodic check for new messages
     let lastMessageTimestamp = null;
     if (messagesContainer) {
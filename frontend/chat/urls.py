@@ -6,4 +6,15 @@ urlpatterns = [
     path("", views.login_view, name="login"),
     path("register/", views.register_view, name="register"),
     path("chat/", views.chat_view, name="chat"),
+    path("chat/api/chats/", views.chats_api_view, name="chats_api"),
+    path(
+        "chat/api/chats/<int:chat_id>/messages/",
+        views.messages_api_view,
+        name="messages_api",
+    ),
+    path(
+        "chat/messages/<int:message_id>/",
+        views.message_status_view,
+        name="message_status",
+    ),
 ]
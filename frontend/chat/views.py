@@ -1,15 +1,14 @@
-import os
-
-import requests
 from django.contrib.auth import authenticate, login
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.shortcuts import get_object_or_404, redirect, render
+from django.http import JsonResponse
+from django.shortcuts import aget_object_or_404, redirect, render
+from django.urls import reverse
 
 from .forms import LoginForm, RegistrationForm
+from .jobs import enqueue_answer
 from .models import Chat, Message
-
-BACKEND_URL = os.getenv("BACKEND_URL", "http://backend:8000")
+from .pagination import InvalidCursor, keyset_page, parse_limit
 
 
 def login_view(request):
@@ -53,53 +52,129 @@ def register_view(request):
 
 
 @login_required
-def chat_view(request):
-    chats = Chat.objects.filter(user=request.user).order_by("-created_at")
-    current_chat = None
-    messages = []
-
-    chat_id = request.GET.get("chat_id")
-    if chat_id:
-        current_chat = get_object_or_404(Chat, id=chat_id, user=request.user)
-        messages = Message.objects.filter(chat=current_chat).order_by("timestamp")
+async def chat_view(request):
+    user = await request.auser()
 
     if request.method == "POST":
         message_text = request.POST.get("message")
         chat_id = request.POST.get("chat_id")
 
         if not chat_id:
-            current_chat = Chat.objects.create(
-                user=request.user, title=message_text[:50]
+            current_chat = await Chat.objects.acreate(
+                user=user, title=message_text[:50]
             )
         else:
-            current_chat = get_object_or_404(Chat, id=chat_id, user=request.user)
+            current_chat = await aget_object_or_404(Chat, id=chat_id, user=user)
 
-        Message.objects.create(
+        question = await Message.objects.acreate(
             chat=current_chat, content=message_text, is_assistant=False
         )
+        answer = await Message.objects.acreate(
+            chat=current_chat,
+            content="",
+            is_assistant=True,
+            status=Message.Status.PENDING,
+            question=question,
+        )
+        await enqueue_answer(answer.id)
 
-        try:
-            response = requests.post(
-                f"{BACKEND_URL}/query", json={"text": message_text}
-            )
+        # Відповідь генерується у фоні; сторінка опитує статус повідомлення
+        return redirect(f"{reverse('chat')}?chat_id={current_chat.id}")
 
-            if response.status_code == 200:
-                Message.objects.create(
-                    chat=current_chat,
-                    content=response.json()["answer"],
-                    is_assistant=True,
-                )
-        except requests.exceptions.RequestException as e:
-            Message.objects.create(
-                chat=current_chat,
-                content="Sorry, I'm having trouble connecting to the server.",
-                is_assistant=True,
-            )
+    chats, chats_cursor = await keyset_page(
+        Chat.objects.filter(user=user), "created_at"
+    )
+    current_chat = None
+    messages = []
+    messages_cursor = None
 
-        messages = Message.objects.filter(chat=current_chat).order_by("timestamp")
+    chat_id = request.GET.get("chat_id")
+    if chat_id:
+        current_chat = await aget_object_or_404(Chat, id=chat_id, user=user)
+        messages, messages_cursor = await keyset_page(
+            Message.objects.filter(chat=current_chat), "timestamp"
+        )
+        messages.reverse()
 
     return render(
         request,
         "chat.html",
-        {"chats": chats, "current_chat": current_chat, "messages": messages},
+        {
+            "chats": chats,
+            "chats_cursor": chats_cursor,
+            "current_chat": current_chat,
+            "messages": messages,
+            "messages_cursor": messages_cursor,
+        },
+    )
+
+
+def _chat_payload(chat):
+    return {
+        "id": chat.id,
+        "title": chat.title,
+        "created_at": chat.created_at.isoformat(),
+    }
+
+
+def _message_payload(message):
+    return {
+        "id": message.id,
+        "content": message.content,
+        "is_assistant": message.is_assistant,
+        "status": message.status,
+        "pending": message.is_pending,
+        "timestamp": message.timestamp.isoformat(),
+    }
+
+
+@login_required
+async def chats_api_view(request):
+    user = await request.auser()
+
+    try:
+        chats, next_cursor = await keyset_page(
+            Chat.objects.filter(user=user),
+            "created_at",
+            before=request.GET.get("before"),
+            limit=parse_limit(request.GET.get("limit")),
+        )
+    except InvalidCursor:
+        return JsonResponse({"error": "Invalid cursor"}, status=400)
+
+    return JsonResponse(
+        {"results": [_chat_payload(chat) for chat in chats], "next_cursor": next_cursor}
     )
+
+
+@login_required
+async def messages_api_view(request, chat_id):
+    user = await request.auser()
+    chat = await aget_object_or_404(Chat, id=chat_id, user=user)
+
+    try:
+        messages, next_cursor = await keyset_page(
+            Message.objects.filter(chat=chat),
+            "timestamp",
+            before=request.GET.get("before"),
+            limit=parse_limit(request.GET.get("limit")),
+        )
+    except InvalidCursor:
+        return JsonResponse({"error": "Invalid cursor"}, status=400)
+
+    # Сторінка береться від новіших до старіших, а віддається хронологічно
+    messages.reverse()
+    return JsonResponse(
+        {
+            "results": [_message_payload(message) for message in messages],
+            "next_cursor": next_cursor,
+        }
+    )
+
+
+@login_required
+async def message_status_view(request, message_id):
+    user = await request.auser()
+    message = await aget_object_or_404(Message, id=message_id, chat__user=user)
+
+    return JsonResponse(_message_payload(message))
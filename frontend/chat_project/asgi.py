@@ -0,0 +1,13 @@
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "chat_project.settings")
+application = get_asgi_application()
+
+# Черга відповідей стартує разом із сервером, а не з першим питанням: задачі,
+# втрачені під час рестарту, підхоплюються одразу. Імпорт після налаштування
+# Django, тож migrate та інші команди manage.py черги не запускають.
+from chat.jobs import get_runner  # noqa: E402
+
+get_runner()
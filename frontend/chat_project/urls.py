@@ -1,7 +1,11 @@
 from django.contrib import admin
+from django.contrib.staticfiles.urls import staticfiles_urlpatterns
 from django.urls import include, path
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("", include("chat.urls")),
 ]
+
+# Під ASGI-сервером статику в режимі DEBUG віддає сам Django
+urlpatterns += staticfiles_urlpatterns()
@@ -0,0 +1,282 @@
+"""
+Пакетні відповіді на питання без HTTP бекенду.
+
+Питання читаються з JSONL (поля id, question або text, необов'язкові filters,
+shards та shard_filter) або CSV з тими ж колонками. Відповіді, джерела,
+маршрут, час та результат валідації дописуються в JSONL по мірі готовності,
+тож перерваний запуск продовжується з того ж файлу: питання з успішною відповіддю
+пропускаються, а питання з помилкою (зокрема із заглушкою замість відповіді
+після вичерпаних спроб генерації) виконуються повторно.
+
+    python -m model.batch questions.jsonl --output answers.jsonl \
+        --persist-directory /app/db --concurrency 8
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+import numpy as np
+
+from model.model import TaxCodeAssistant, is_fallback_response
+from model.query_handler import QueryType
+
+SOURCES_SEPARATOR = "\n\nДжерела:"
+
+logger = logging.getLogger(__name__)
+
+
+def read_questions(path: str) -> Iterator[Dict[str, Any]]:
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Questions file not found at {path}")
+
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        if path.endswith(".csv"):
+            rows = csv.DictReader(file)
+        else:
+            rows = (json.loads(line) for line in file if line.strip())
+
+        for number, row in enumerate(rows, start=1):
+            question = row.get("question") or row.get("text")
+            if not question:
+                raise ValueError(f"{path}:{number}: missing question text")
+
+            # У CSV filters і shard_filter - JSON рядки, а shards - список через кому
+            filters = row.get("filters") or None
+            if isinstance(filters, str):
+                filters = json.loads(filters)
+            shard_filter = row.get("shard_filter") or None
+            if isinstance(shard_filter, str):
+                shard_filter = json.loads(shard_filter)
+            shards = row.get("shards") or None
+            if isinstance(shards, str):
+                shards = [shard.strip() for shard in shards.split(",") if shard.strip()]
+
+            yield {
+                "id": str(row.get("id") or number),
+                "question": question,
+                "filters": filters,
+                "shards": shards,
+                "shard_filter": shard_filter,
+            }
+
+
+def completed_ids(path: str) -> Set[str]:
+    """
+    Id питань з успішною відповіддю у вже записаному виводі
+
+    Недописаний останній рядок (запуск перервано під час запису)
+    відрізається, щоб нові записи почалися з нового рядка.
+    """
+    if not os.path.exists(path):
+        return set()
+
+    with open(path, "rb+") as file:
+        data = file.read()
+        if data and not data.endswith(b"\n"):
+            file.truncate(data.rfind(b"\n") + 1)
+            data = data[: data.rfind(b"\n") + 1]
+
+    done = set()
+    for line in data.decode("utf-8").splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if record.get("error") is None:
+            done.add(record["id"])
+    return done
+
+
+class BatchRunner:
+    def __init__(
+        self,
+        assistant: TaxCodeAssistant,
+        concurrency: int = 4,
+        batch_size: int = 64,
+    ):
+        """
+        Пакетне виконання питань через TaxCodeAssistant
+
+        Ембедінги питань вікна рахуються одним викликом моделі та кладуться
+        в кеш асистента, після чого маршрутизація, пошук і генерація йдуть
+        у concurrency потоках.
+
+        Args:
+            assistant (TaxCodeAssistant): Асистент з завантаженим індексом
+            concurrency (int): Одночасних генерацій
+            batch_size (int): Питань в одному пакеті ембедінгів
+        """
+        self.assistant = assistant
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        if assistant.local_model_path and concurrency > 1:
+            # llama.cpp модель не можна викликати з кількох потоків одночасно
+            logger.warning("Local model is not thread-safe, running with concurrency 1")
+            self.concurrency = 1
+
+        # У роботі до двох вікон питань: кеш має вміщати їх ембедінги, інакше
+        # вони витіснятимуться до пошуку
+        self.window = max(batch_size, self.concurrency * 4)
+        assistant.embedding_cache_size = max(
+            assistant.embedding_cache_size, self.window * 2
+        )
+
+    def prime_embeddings(self, questions: List[str]) -> None:
+        self.assistant.warm_embeddings(questions, batch_size=self.batch_size)
+
+    def _uses_llm(self, query_type: QueryType) -> bool:
+        return query_type == QueryType.TAX_QUERY or (
+            query_type == QueryType.CALCULATION
+            and self.assistant.query_handler.explain_calculations
+        )
+
+    def answer(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        record = {"id": item["id"], "question": item["question"], "error": None}
+        start = time.perf_counter()
+        try:
+            analysis = self.assistant.query_handler.route(item["question"])
+            response = self.assistant.process_query(
+                item["question"],
+                shards=item["shards"],
+                shard_filter=item.get("shard_filter"),
+                filters=item["filters"],
+                analysis=analysis,
+            )
+            answer, _, sources = response.partition(SOURCES_SEPARATOR)
+            record.update(
+                {
+                    "route": analysis.query_type.value,
+                    "answer": answer.strip(),
+                    "sources": [line for line in sources.splitlines() if line],
+                    # Готові відповіді без LLM валідувати нема чого
+                    "validation": (
+                        self.assistant.validate_response(response)
+                        if self._uses_llm(analysis.query_type)
+                        else None
+                    ),
+                }
+            )
+            if self._uses_llm(analysis.query_type) and is_fallback_response(response):
+                # Заглушка замість відповіді - помилка, щоб продовжений запуск
+                # повторив питання
+                record["error"] = record["answer"].splitlines()[0]
+        except Exception as e:
+            logger.warning(f"Question {item['id']} failed: {e}")
+            record["error"] = str(e)
+        record["seconds"] = round(time.perf_counter() - start, 3)
+        return record
+
+    def _windows(self, items: Iterator[Dict[str, Any]]) -> Iterator[List[Dict]]:
+        window = []
+        for item in items:
+            window.append(item)
+            if len(window) >= self.window:
+                yield window
+                window = []
+        if window:
+            yield window
+
+    def run(self, items: Iterator[Dict[str, Any]], output_path: str) -> Dict[str, Any]:
+        done = completed_ids(output_path)
+        if done:
+            logger.info(f"Resuming: {len(done)} questions already answered")
+
+        latencies = []
+        failed = invalid = 0
+
+        def write(futures) -> None:
+            nonlocal failed, invalid
+            for future in futures:
+                record = future.result()
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                output.flush()
+
+                latencies.append(record["seconds"])
+                if record["error"] is not None:
+                    failed += 1
+                elif record["validation"] and not record["validation"]["is_valid"]:
+                    invalid += 1
+
+        start = time.perf_counter()
+        with open(output_path, "a", encoding="utf-8") as output, ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="batch"
+        ) as executor:
+            todo = (item for item in items if item["id"] not in done)
+            pending = set()
+            for window in self._windows(todo):
+                self.prime_embeddings([item["question"] for item in window])
+                pending.update(executor.submit(self.answer, item) for item in window)
+
+                # Наступне вікно готується, поки потоки ще відповідають на
+                # питання попереднього, тож пул не простоює між вікнами
+                while len(pending) > self.window:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    write(finished)
+                logger.info(f"Answered {len(latencies)} questions")
+
+            write(as_completed(pending))
+
+        elapsed = time.perf_counter() - start
+        summary = {
+            "answered": len(latencies),
+            "skipped": len(done),
+            "failed": failed,
+            "invalid": invalid,
+            "seconds": round(elapsed, 3),
+            "questions_per_second": (
+                round(len(latencies) / elapsed, 3) if elapsed else 0.0
+            ),
+        }
+        if latencies:
+            summary["p50_seconds"] = float(np.percentile(latencies, 50))
+            summary["p95_seconds"] = float(np.percentile(latencies, 95))
+        return summary
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Batch question answering")
+    parser.add_argument("questions", help="JSONL або CSV файл з питаннями")
+    parser.add_argument("--output", required=True, help="JSONL файл відповідей")
+    parser.add_argument("--persist-directory", default="/app/db")
+    parser.add_argument("--model-name", default="mistralai/Mixtral-8x7B-Instruct-v0.1")
+    parser.add_argument("--local-model-path", default=None)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--use-intent-classifier", action="store_true")
+    parser.add_argument(
+        "--explain-calculations",
+        action="store_true",
+        help="Числові питання пояснює LLM замість готового розрахунку",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    assistant = TaxCodeAssistant(
+        persist_directory=args.persist_directory,
+        model_name=args.model_name,
+        local_model_path=args.local_model_path,
+        device=args.device,
+        use_intent_classifier=args.use_intent_classifier,
+        explain_calculations=args.explain_calculations,
+    )
+    runner = BatchRunner(
+        assistant, concurrency=args.concurrency, batch_size=args.batch_size
+    )
+    summary = runner.run(read_questions(args.questions), args.output)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
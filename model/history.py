@@ -0,0 +1,143 @@
+import logging
+import math
+from typing import Dict, List, Optional
+
+from langchain_core.language_models import BaseLLM
+
+# Наближена кількість символів українського тексту на токен Mistral
+CHARS_PER_TOKEN = 3.0
+
+SUMMARY_PREFIX = "Резюме попередньої розмови: "
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = """[INST] Стисло онови резюме розмови користувача з податковим асистентом.
+Збережи суми, ставки, групу ФОП, періоди, статті кодексу та те, що користувач
+уже уточнив; відкинь ввічливі формули та повтори. Не більше {max_words} слів.
+
+Поточне резюме:
+{summary}
+
+Нові репліки:
+{turns}
+
+Оновлене резюме: [/INST]"""
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    max_chars = int(max_tokens * CHARS_PER_TOKEN)
+    if len(text) <= max_chars:
+        return text
+    return text[: max(max_chars - 3, 0)].rstrip() + "..."
+
+
+def format_turns(turns: List[Dict[str, str]]) -> List[str]:
+    lines = []
+    for turn in turns:
+        role = "Асистент" if turn.get("role") == "assistant" else "Користувач"
+        lines.append(f"{role}: {turn.get('content', '').strip()}")
+    return lines
+
+
+class HistoryCompressor:
+    def __init__(
+        self,
+        llm: BaseLLM,
+        budget_tokens: int = 1024,
+        summary_tokens: int = 256,
+    ):
+        """
+        Історія чату в межах бюджету токенів
+
+        Останній хід (питання та відповідь) потрапляє в промпт дослівно, а
+        старіші ходи згорнуті в резюме. Резюме оновлюється інкрементально,
+        коли нестиснуті ходи перестають вміщатися в бюджет: клієнт зберігає
+        його разом з чатом і надсилає разом з ходами, які ще не увійшли до
+        нього.
+
+        Args:
+            llm (BaseLLM): Модель, що оновлює резюме
+            budget_tokens (int): Бюджет токенів усієї історії в промпті
+            summary_tokens (int): Частина бюджету, яку може зайняти резюме
+        """
+        self.llm = llm
+        self.budget_tokens = budget_tokens
+        self.summary_tokens = min(summary_tokens, budget_tokens)
+
+    def summarize(self, summary: str, turns: List[Dict[str, str]]) -> str:
+        """
+        Нове резюме: попереднє резюме разом з ходами, що з нього випали
+        """
+        if not turns:
+            return summary
+
+        # Кожна репліка обрізається, щоб промпт резюмування теж був обмежений
+        lines = [
+            truncate_to_tokens(line, self.budget_tokens) for line in format_turns(turns)
+        ]
+        prompt = SUMMARY_PROMPT.format(
+            max_words=int(self.summary_tokens * CHARS_PER_TOKEN / 7),
+            summary=summary.strip() or "(порожнє)",
+            turns="\n".join(lines),
+        )
+        response = self.llm.invoke(prompt)
+        if not isinstance(response, str):
+            response = getattr(response, "content", str(response))
+        return truncate_to_tokens(response.strip(), self.summary_tokens)
+
+    def render(
+        self, history: Optional[List[Dict[str, str]]], summary: Optional[str] = None
+    ) -> str:
+        """
+        Текст історії для промпту, не довший за budget_tokens
+
+        Бюджет розподіляється за пріоритетом: спершу останній хід (на нього
+        найчастіше посилається нове питання), потім резюме, а старіші репліки
+        займають те, що лишилося.
+        """
+        lines = format_turns(history or [])
+
+        # Останній хід - від останнього питання користувача до кінця
+        split = len(lines) - 1
+        for index in range(len(lines) - 1, -1, -1):
+            if history[index].get("role") != "assistant":
+                split = index
+                break
+        older, last = lines[: max(split, 0)], lines[max(split, 0) :]
+
+        remaining = self.budget_tokens
+        last_tokens = sum(estimate_tokens(line) for line in last)
+        if last_tokens > remaining:
+            logger.warning(
+                f"Last chat turn ({last_tokens} tokens) exceeds history budget "
+                f"of {self.budget_tokens} tokens, truncating it"
+            )
+            last = [truncate_to_tokens("\n".join(last), remaining)]
+            last_tokens = estimate_tokens(last[0])
+        remaining -= last_tokens
+
+        parts = []
+        summary_budget = min(
+            self.summary_tokens, remaining - estimate_tokens(SUMMARY_PREFIX)
+        )
+        if summary and summary.strip() and summary_budget > 0:
+            summary_text = SUMMARY_PREFIX + truncate_to_tokens(
+                summary.strip(), summary_budget
+            )
+            parts.append(summary_text)
+            remaining -= estimate_tokens(summary_text)
+
+        # Від найновіших старіших реплік до найстаріших, поки вистачає бюджету
+        recent = []
+        for line in reversed(older):
+            if remaining <= 0:
+                break
+            line = truncate_to_tokens(line, remaining)
+            recent.append(line)
+            remaining -= estimate_tokens(line)
+
+        return "\n".join(parts + recent[::-1] + last)
@@ -0,0 +1,109 @@
+import os
+import time
+from contextlib import contextmanager
+
+from opentelemetry import trace
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+tracer = trace.get_tracer("rag.pipeline")
+
+# З кількома воркерами uvicorn кожен процес пише метрики у файли цього
+# каталогу, а /metrics будь-якого воркера віддає їх суму. Каталог має бути
+# порожнім на старті сервера (у docker-compose це tmpfs).
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+STAGE_LATENCY = Histogram(
+    "rag_stage_duration_seconds",
+    "Latency of RAG pipeline stages",
+    ["stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+QUERIES = Counter(
+    "rag_queries_total", "Processed queries by routed type", ["query_type"]
+)
+GENERATION_RETRIES = Counter(
+    "rag_generation_retries_total", "LLM generation attempts beyond the first"
+)
+VALIDATION_FAILURES = Counter(
+    "rag_validation_failures_total",
+    "Rejected LLM responses by validation rule",
+    ["reason"],
+)
+EMBEDDING_CACHE = Counter(
+    "rag_embedding_cache_requests_total",
+    "Query embedding cache lookups",
+    ["result"],
+)
+SCHEDULER_QUEUED = Gauge(
+    "rag_scheduler_queued_requests",
+    "LLM requests waiting in the fair-share queue",
+    multiprocess_mode="livesum",
+)
+SCHEDULER_WAIT = Histogram(
+    "rag_scheduler_wait_seconds",
+    "Time LLM requests spend queued before generation starts",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+SCHEDULER_REJECTED = Counter(
+    "rag_scheduler_rejected_total", "LLM requests rejected by per-user queue limit"
+)
+STARTUP_PHASE = Gauge(
+    "rag_startup_phase_seconds",
+    "Duration of backend startup phases",
+    ["phase"],
+    multiprocess_mode="max",
+)
+
+
+def latest_metrics() -> bytes:
+    """Метрики для /metrics: усіх воркерів у multiprocess режимі, інакше процесу."""
+    if not MULTIPROC_DIR:
+        return generate_latest()
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=MULTIPROC_DIR)
+    return generate_latest(registry)
+
+
+def mark_worker_dead() -> None:
+    # Прибирає live-gauge файли воркера, що завершується
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid(), path=MULTIPROC_DIR)
+
+
+def configure_tracing(service_name: str = "tax-assistant-backend") -> None:
+    # Без адреси колектора span-и лишаються no-op, а метрики Prometheus працюють
+    if not os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        return
+
+    # gRPC експортер імпортується лише тоді, коли він справді потрібен
+    from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import (
+        OTLPSpanExporter,
+    )
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+
+
+@contextmanager
+def stage(name: str, **attributes):
+    """Вимірює тривалість етапу: span OpenTelemetry та гістограма Prometheus."""
+    with tracer.start_as_current_span(name) as span:
+        for key, value in attributes.items():
+            span.set_attribute(key, value)
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            STAGE_LATENCY.labels(stage=name).observe(time.perf_counter() - start)
@@ -1,79 +1,51 @@
+import logging
 import os
 import re
+import threading
 import warnings
-from typing import Any, Dict, List
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
 
 from dotenv import load_dotenv
 from langchain.chains import LLMChain
-from langchain.memory import ConversationBufferWindowMemory
 from langchain.prompts import PromptTemplate
-from langchain.vectorstores import FAISS
 from langchain_community.llms import HuggingFaceHub
-from langchain_huggingface import HuggingFaceEmbeddings
-
-from model.query_handler import QueryHandler, QueryType
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseLLM
+from langchain_huggingface import HuggingFaceEndpoint
+
+from embeddings.backends import create_embeddings
+from embeddings.sharded_store import ShardedVectorStore
+from model.history import HistoryCompressor
+from model.metrics import (
+    EMBEDDING_CACHE,
+    GENERATION_RETRIES,
+    VALIDATION_FAILURES,
+    stage,
+)
+from model.query_handler import (
+    IntentClassifier,
+    QueryAnalysisResult,
+    QueryHandler,
+    QueryType,
+)
+from model.response_validator import (
+    GenerationAborted,
+    StreamingResponseValidator,
+    StreamingValidationHandler,
+)
+from model.tax_calculator import TaxCalculation, TaxCalculator
 
 warnings.filterwarnings("ignore", category=FutureWarning)
 
 
-class TaxCodeAssistant:
-    def __init__(
-        self,
-        persist_directory: str = "faiss/db",
-        embeddings_model: str = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2",
-        device: str = "cpu",
-        model_name: str = "mistralai/Mixtral-8x7B-Instruct-v0.1",
-        max_retries: int = 5,
-    ):
-        load_dotenv()
-        self.max_retries = max_retries
-        self.persist_directory = persist_directory
-
-        self.query_handler = QueryHandler()
-
-        self.memory = ConversationBufferWindowMemory(
-            memory_key="chat_history",
-            input_key="question",
-            return_messages=True,
-            k=5,
-        )
-
-        self.llm = HuggingFaceHub(
-            repo_id=model_name,
-            huggingfacehub_api_token=os.getenv("HUGGINGFACE_API_TOKEN"),
-            model_kwargs={
-                "temperature": 0.5,
-                "max_new_tokens": 512,
-                "top_p": 0.95,
-                "do_sample": True,
-                "num_beams": 3,
-                "return_full_text": False,
-                "context_length": 8192,
-                "early_stopping": True,
-            },
-        )
-
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=embeddings_model, model_kwargs={"device": device}
-        )
-
-        if os.path.exists(os.path.join(persist_directory, "index.faiss")):
-            self.vectorstore = FAISS.load_local(
-                persist_directory, self.embeddings, allow_dangerous_deserialization=True
-            )
-        else:
-
-            self.vectorstore = None
-
-        self.prompt = PromptTemplate(
-            input_variables=["question", "context", "chat_history"],
-            template="""[INST] Ти - асистент з податкового законодавства України.
+# Незмінна частина промпту йде першою і не містить змінних: її токени
+# однакові в кожному запиті, тож локальний бекенд обчислює KV-кеш для неї
+# лише один раз (див. warm_prompt_cache)
+STATIC_PROMPT = """[INST] Ти - асистент з податкового законодавства України.
                 ВАЖЛИВО: Відповідай українською мовою за замовчуванням.
                 ВАЖЛИВО: Надавай тільки чітку, структуровану відповідь. Уникайте повторень та незрозумілих послідовностей.
 
-                Історія чату:
-                {chat_history}
-
                 Використовуй наданий контекст для відповіді на питання.
                 Відповідай лише на основі контексту. Якщо не можеш знайти відповідь в контексті,
                 скажи що не знаєш. 
@@ -114,12 +86,162 @@ class TaxCodeAssistant:
                     4. Вкажи обов'язки роботодавця
                     5. Нагадай про терміни виплати зарплати
 
+"""
+
+DYNAMIC_PROMPT = """                Історія чату:
+                {chat_history}
+
                     Контекст: {context}
 
-                    Питання: {question} [/INST]""",
+                    Питання: {question} [/INST]"""
+
+INVALID_RESPONSE_TEXT = (
+    "Вибачте, але я не можу надати коректну відповідь на ваше запитання."
+)
+REPHRASE_TEXT = "Будь ласка, спробуйте переформулювати запитання."
+GENERATION_ERROR_TEXT = "Виникла помилка при генерації відповіді:"
+
+
+def is_fallback_response(response: str) -> bool:
+    """Чи є відповідь заглушкою get_response після вичерпаних спроб генерації"""
+    return response.startswith((INVALID_RESPONSE_TEXT, GENERATION_ERROR_TEXT))
+
+
+class TaxCodeAssistant:
+    def __init__(
+        self,
+        persist_directory: str = "faiss/db",
+        embeddings_model: str = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2",
+        device: str = "cpu",
+        model_name: str = "mistralai/Mixtral-8x7B-Instruct-v0.1",
+        max_retries: int = 5,
+        streaming: bool = True,
+        use_intent_classifier: bool = False,
+        embedding_cache_size: int = 256,
+        history_turns: int = 5,
+        history_budget: int = 1024,
+        use_calculator: bool = True,
+        explain_calculations: bool = False,
+        summary_budget: int = 256,
+        top_k: int = 10,
+        context_budget: int = 8192,
+        local_model_path: Optional[str] = None,
+        prompt_cache_bytes: int = 2 << 30,
+        llm: Optional[BaseLLM] = None,
+        embeddings: Optional[Embeddings] = None,
+    ):
+        load_dotenv()
+        self.logger = logging.getLogger(__name__)
+        self.max_retries = max_retries
+        self.streaming = streaming
+        self.persist_directory = persist_directory
+        # Історію чату надсилає клієнт; сервер не зберігає стан розмов
+        self.history_turns = history_turns
+        self.top_k = top_k
+        # Максимальна довжина контексту в символах, що потрапляє в промпт
+        self.context_budget = context_budget
+        self.local_model_path = local_model_path or os.getenv("LOCAL_MODEL_PATH")
+
+        self.embedding_cache_size = embedding_cache_size
+        self._embedding_cache = OrderedDict()
+        self._embedding_cache_lock = threading.Lock()
+
+        # Готові llm/embeddings можна передати ззовні (бенчмарки, офлайн-запуски)
+        if llm is not None:
+            self.llm = llm
+        elif self.local_model_path:
+            self.llm = self._create_local_llm(prompt_cache_bytes)
+        elif streaming:
+            # Потокова генерація дозволяє перервати виродженну відповідь
+            # на першому ж порушенні правил валідації
+            self.llm = HuggingFaceEndpoint(
+                repo_id=model_name,
+                huggingfacehub_api_token=os.getenv("HUGGINGFACE_API_TOKEN"),
+                temperature=0.5,
+                max_new_tokens=512,
+                top_p=0.95,
+                do_sample=True,
+                return_full_text=False,
+                streaming=True,
+            )
+        else:
+            self.llm = HuggingFaceHub(
+                repo_id=model_name,
+                huggingfacehub_api_token=os.getenv("HUGGINGFACE_API_TOKEN"),
+                model_kwargs={
+                    "temperature": 0.5,
+                    "max_new_tokens": 512,
+                    "top_p": 0.95,
+                    "do_sample": True,
+                    "num_beams": 3,
+                    "return_full_text": False,
+                    "context_length": 8192,
+                    "early_stopping": True,
+                },
+            )
+
+        if embeddings is not None:
+            self.embeddings = embeddings
+        else:
+            self.embeddings = create_embeddings(embeddings_model, device)
+
+        classifier = None
+        if use_intent_classifier:
+            examples_path = os.getenv("INTENT_EXAMPLES_PATH")
+            classifier = IntentClassifier(
+                self.embeddings.embed_documents,
+                examples=(
+                    IntentClassifier.load_examples(examples_path)
+                    if examples_path
+                    else None
+                ),
+            )
+
+        self.query_handler = QueryHandler(
+            keywords_path=os.getenv("QUERY_KEYWORDS_PATH"),
+            classifier=classifier,
+            embed_query=self.embed_query,
+            calculator=TaxCalculator() if use_calculator else None,
+            explain_calculations=explain_calculations,
+        )
+
+        # Кожна піддиректорія persist_directory з index.faiss є окремим шардом
+        self.vectorstore = ShardedVectorStore(persist_directory, self.embeddings).load()
+
+        self.prompt = PromptTemplate(
+            input_variables=["question", "context", "chat_history"],
+            template=STATIC_PROMPT + DYNAMIC_PROMPT,
         )
+        if self.local_model_path:
+            self.warm_prompt_cache()
 
-        self.chain = LLMChain(llm=self.llm, prompt=self.prompt, memory=self.memory)
+        self.chain = LLMChain(llm=self.llm, prompt=self.prompt)
+        self.history_compressor = HistoryCompressor(
+            self.llm, budget_tokens=history_budget, summary_tokens=summary_budget
+        )
+
+    def _create_local_llm(self, prompt_cache_bytes: int) -> BaseLLM:
+        from langchain_community.llms import LlamaCpp
+        from llama_cpp import LlamaRAMCache
+
+        llm = LlamaCpp(
+            model_path=self.local_model_path,
+            n_ctx=int(os.getenv("LOCAL_MODEL_CTX", "8192")),
+            n_threads=int(os.getenv("LOCAL_MODEL_THREADS", os.cpu_count() or 4)),
+            temperature=0.5,
+            max_tokens=512,
+            top_p=0.95,
+            streaming=self.streaming,
+        )
+        # Кеш станів llama.cpp шукає найдовший спільний префікс токенів, тож
+        # статична частина промпту не обчислюється повторно для кожного запиту
+        llm.client.set_cache(LlamaRAMCache(capacity_bytes=prompt_cache_bytes))
+        return llm
+
+    def warm_prompt_cache(self) -> None:
+        with stage("prompt_cache_warmup"):
+            self.llm.client(STATIC_PROMPT, max_tokens=1)
+        self.logger.info("Prompt prefix cache warmed up")
 
     def format_sources(self, context: List[Dict[str, Any]]) -> str:
         articles_dict = {}
@@ -164,15 +286,84 @@ class TaxCodeAssistant:
 
         return "\n".join(sources)
 
-    def get_context(self, query: str, top_k: int = 10) -> List[Dict[str, Any]]:
-        if self.vectorstore is None:
+    def embed_query(self, query: str) -> List[float]:
+        # Один ембедінг на запит: спільний для маршрутизації та пошуку
+        with self._embedding_cache_lock:
+            embedding = self._embedding_cache.get(query)
+            if embedding is not None:
+                self._embedding_cache.move_to_end(query)
+                EMBEDDING_CACHE.labels(result="hit").inc()
+                return embedding
+
+        EMBEDDING_CACHE.labels(result="miss").inc()
+        with stage("embedding"):
+            embedding = self.embeddings.embed_query(query)
+
+        with self._embedding_cache_lock:
+            self._embedding_cache[query] = embedding
+            while len(self._embedding_cache) > self.embedding_cache_size:
+                self._embedding_cache.popitem(last=False)
+        return embedding
+
+    def warm_embeddings(self, queries: List[str], batch_size: int = 64) -> int:
+        """
+        Кладе в кеш ембедінги запитів, яких там ще немає
+
+        Ембедінги рахуються пакетами по batch_size за один виклик моделі, тож
+        наступні embed_query для цих запитів не звертаються до неї.
+
+        Returns:
+            int: Скільки запитів було пораховано
+        """
+        with self._embedding_cache_lock:
+            pending = [
+                query
+                for query in dict.fromkeys(queries)
+                if query not in self._embedding_cache
+            ]
+
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start : start + batch_size]
+            with stage("embedding"):
+                vectors = self.embeddings.embed_documents(batch)
+
+            with self._embedding_cache_lock:
+                for query, vector in zip(batch, vectors):
+                    self._embedding_cache[query] = vector
+                while len(self._embedding_cache) > self.embedding_cache_size:
+                    self._embedding_cache.popitem(last=False)
+        return len(pending)
+
+    def get_context(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        shards: Optional[List[str]] = None,
+        shard_filter: Optional[Dict[str, Any]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        if not self.vectorstore.shards:
             return []
 
-        results = self.vectorstore.similarity_search_with_score(query, k=top_k)
+        top_k = top_k or self.top_k
+        embedding = self.embed_query(query)
+        with stage("retrieval", top_k=top_k):
+            search_kwargs = dict(
+                shards=shards, shard_filter=shard_filter, filters=filters
+            )
+            if self.vectorstore.has_parents:
+                # Пошук по малих фрагментах, у контекст - їхні батьківські
+                results = self.vectorstore.search_parents(
+                    embedding, k=top_k, max_chars=self.context_budget, **search_kwargs
+                )
+            else:
+                results = self.vectorstore.similarity_search_with_score_by_vector(
+                    embedding, k=top_k, **search_kwargs
+                )
 
         context = []
         for doc, score in results:
-            content = doc.page_content[:8192]
+            content = doc.page_content[: self.context_budget]
             context.append(
                 {"content": content, "metadata": doc.metadata, "score": score}
             )
@@ -180,16 +371,18 @@ class TaxCodeAssistant:
 
     def validate_response(self, response: str) -> dict:
         errors = []
+        reasons = []
 
         if not response:
-            return {"is_valid": False, "errors": [""]}
+            return {"is_valid": False, "errors": [""], "reasons": ["empty"]}
 
         words = response.lower().split()
 
         unique_words = set(word for word in words if len(word) > 2)
         if len(unique_words) < 5:
             errors.append("")
-            return {"is_valid": False, "errors": errors}
+            reasons.append("too_few_unique_words")
+            return {"is_valid": False, "errors": errors, "reasons": reasons}
 
         consecutive_repeats = 0
         previous_word = None
@@ -198,6 +391,7 @@ class TaxCodeAssistant:
                 consecutive_repeats += 1
                 if consecutive_repeats > 5:
                     errors.append("")
+                    reasons.append("consecutive_repeats")
                     break
             else:
                 consecutive_repeats = 0
@@ -209,6 +403,7 @@ class TaxCodeAssistant:
                 word_counts[word] = word_counts.get(word, 0) + 1
                 if word_counts[word] > len(words) * 0.15:
                     errors.append(f" ")
+                    reasons.append("word_frequency")
                     break
 
         legal_reference = r"\d+\.\d+(\.\d+)*"
@@ -217,19 +412,23 @@ class TaxCodeAssistant:
         repetitive_pattern = r"(\d+\.){7,}"
         if re.search(repetitive_pattern, cleaned_response):
             errors.append("")
+            reasons.append("repetitive_numbering")
 
         numbers = len(re.findall(r"\d", response))
         text_length = len(response)
         if numbers > text_length * 0.5:
             errors.append("")
+            reasons.append("digit_ratio")
 
         invalid_pattern = r"^[I\d.]+$"
         if re.match(invalid_pattern, response.strip()):
             errors.append("")
+            reasons.append("invalid_format")
 
         ukrainian_pattern = r"[а-яА-ЯіІїЇєЄґҐ]"
         if not re.search(ukrainian_pattern, response):
             errors.append("")
+            reasons.append("no_ukrainian")
 
         nonsense_patterns = [
             r"(\b\w+\b)(\s+\1){10,}",
@@ -239,31 +438,70 @@ class TaxCodeAssistant:
         for pattern in nonsense_patterns:
             if re.search(pattern, response):
                 errors.append("")
+                reasons.append("nonsense_pattern")
                 break
 
-        return {"is_valid": len(errors) == 0, "errors": errors}
+        return {"is_valid": len(errors) == 0, "errors": errors, "reasons": reasons}
 
-    def get_response(self, query: str) -> str:
+    def format_chat_history(
+        self,
+        history: Optional[List[Dict[str, str]]],
+        summary: Optional[str] = None,
+    ) -> str:
+        # Одна репліка користувача + одна асистента на кожен хід
+        recent = history[-self.history_turns * 2 :] if history else []
+        return self.history_compressor.render(recent, summary)
+
+    def summarize_history(self, summary: str, turns: List[Dict[str, str]]) -> str:
+        with stage("history_summary"):
+            return self.history_compressor.summarize(summary, turns)
+
+    def get_response(
+        self,
+        query: str,
+        history: Optional[List[Dict[str, str]]] = None,
+        shards: Optional[List[str]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        summary: Optional[str] = None,
+        calculation: Optional[TaxCalculation] = None,
+        shard_filter: Optional[Dict[str, Any]] = None,
+    ) -> str:
+
+        question = query
+        if calculation is not None:
+            # LLM лише пояснює перевірені числа, а не рахує їх сама
+            question = (
+                f"{query}\n\nПеревірений розрахунок (використовуй лише ці числа, "
+                f"не перераховуй їх):\n{calculation.format()}"
+            )
 
         for attempt in range(self.max_retries):
+            if attempt > 0:
+                GENERATION_RETRIES.inc()
             try:
-                context = self.get_context(query)
+                context = self.get_context(
+                    query, shards=shards, shard_filter=shard_filter, filters=filters
+                )
                 if not context:
                     return "Не знайдено релевантної інформації для відповіді на це питання."
 
-                context_text = "\n".join([doc["content"] for doc in context])
-                if len(context_text) > 8192:
-                    context_text = context_text[:8192] + "..."
+                with stage("prompt_assembly"):
+                    context_text = "\n".join([doc["content"] for doc in context])
+                    if len(context_text) > self.context_budget:
+                        context_text = context_text[: self.context_budget] + "..."
 
-                chat_history = self.memory.load_memory_variables({})["chat_history"]
+                    chat_history = self.format_chat_history(history, summary)
 
-                response = self.chain.invoke(
-                    {
-                        "question": query,
-                        "context": context_text,
-                        "chat_history": chat_history,
-                    }
-                )
+                validator = StreamingResponseValidator()
+                with stage("llm", attempt=attempt):
+                    response = self.chain.invoke(
+                        {
+                            "question": question,
+                            "context": context_text,
+                            "chat_history": chat_history,
+                        },
+                        config={"callbacks": [StreamingValidationHandler(validator)]},
+                    )
 
                 if isinstance(response, dict) and "text" in response:
                     response = response["text"]
@@ -273,27 +511,65 @@ class TaxCodeAssistant:
                 sources = self.format_sources(context)
                 response += f"\n\nДжерела:\n{sources}"
 
-                validation_result = self.validate_response(response)
+                with stage("validation"):
+                    validation_result = self.validate_response(response)
                 if validation_result["is_valid"]:
                     return response
                 else:
+                    for reason in validation_result["reasons"]:
+                        VALIDATION_FAILURES.labels(reason=reason).inc()
+                    self.logger.warning(
+                        f"Response rejected on attempt {attempt + 1}: "
+                        f"{', '.join(validation_result['reasons'])}"
+                    )
                     if attempt == self.max_retries - 1:
                         error_details = "\n".join(validation_result["errors"])
                         return (
-                            f"Вибачте, але я не можу надати коректну відповідь на ваше запитання. "
-                            f"Причини:\n{error_details}\n"
-                            f"Будь ласка, спробуйте переформулювати запитання."
+                            f"{INVALID_RESPONSE_TEXT} Причини:\n{error_details}\n"
+                            f"{REPHRASE_TEXT}"
                         )
                     continue
 
-            except Exception as e:
-                print(f"Error in get_response: {str(e)}")
+            except GenerationAborted as e:
+                VALIDATION_FAILURES.labels(reason=f"stream_{e.reason}").inc()
+                self.logger.warning(
+                    f"Generation aborted on attempt {attempt + 1}: {e.reason}"
+                )
                 if attempt == self.max_retries - 1:
-                    return f"Виникла помилка при генерації відповіді: {str(e)}"
+                    return f"{INVALID_RESPONSE_TEXT} {REPHRASE_TEXT}"
                 continue
 
-    def process_query(self, query: str) -> str:
+            except Exception as e:
+                self.logger.exception(f"Error in get_response: {str(e)}")
+                if attempt == self.max_retries - 1:
+                    return f"{GENERATION_ERROR_TEXT} {str(e)}"
+                continue
 
-        return self.query_handler.handle_query(
-            query, model_response_func=self.get_response
-        )
+    def process_query(
+        self,
+        query: str,
+        history: Optional[List[Dict[str, str]]] = None,
+        shards: Optional[List[str]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        analysis: Optional[QueryAnalysisResult] = None,
+        summary: Optional[str] = None,
+        shard_filter: Optional[Dict[str, Any]] = None,
+    ) -> str:
+
+        with stage("process_query"):
+            if analysis is None:
+                analysis = self.query_handler.route(query)
+            calculation = (analysis.details or {}).get("calculation")
+            return self.query_handler.handle_query(
+                query,
+                model_response_func=lambda q: self.get_response(
+                    q,
+                    history,
+                    shards,
+                    filters,
+                    summary,
+                    calculation,
+                    shard_filter=shard_filter,
+                ),
+                analysis=analysis,
+            )
@@ -1,8 +1,17 @@
+import json
+import logging
+import os
 import re
+import time
 from dataclasses import dataclass
 from enum import Enum
 from random import choice
-from typing import Optional
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from model.metrics import QUERIES, stage
+from model.tax_calculator import TaxCalculator
 
 
 class QueryType(Enum):
@@ -10,6 +19,7 @@ class QueryType(Enum):
     SYSTEM_QUERY = "system_query"
     TAX_QUERY = "tax_query"
     IRRELEVANT = "irrelevant"
+    CALCULATION = "calculation"
 
 
 @dataclass
@@ -19,8 +29,153 @@ class QueryAnalysisResult:
     details: Optional[dict] = None
 
 
+UKRAINIAN_SUFFIXES = sorted(
+    "ами ями ові еві ого ому ими іми ій ий ах ях ам ям ом ем ою ею ої ів "
+    "а я у ю о е и і ї ь".split(),
+    key=len,
+    reverse=True,
+)
+
+MIN_STEM_LENGTH = 3
+# Основи такої довжини збігаються лише повністю, а не як префікс слова:
+# "рента" не повинна знаходитися в "рентабельність"
+SHORT_STEM_LENGTH = 4
+
+# "і" в останньому закритому складі основи (перед кінцевими приголосними)
+LAST_SYLLABLE_I = re.compile(r"і(?=[^аеєиіїоуюя]+$)")
+
+
+def fold_vowels(word: str) -> str:
+    # Чергування і/о (збір - збору, рік - року, сіль - солі) буває лише в
+    # останньому складі основи, тож решта "і" лишається без змін
+    return LAST_SYLLABLE_I.sub("о", word)
+
+
+def stem_word(word: str) -> str:
+    """Легкий стемер для українських словоформ (податок/податку/податки)."""
+    if len(word) <= 4:
+        return fold_vowels(word)
+
+    # Випадне е/о: податок -> податк-, підприємець -> підприємц-
+    if word.endswith("ість"):
+        return fold_vowels(word[:-4] + "ост")
+    if word.endswith("ок"):
+        return fold_vowels(word[:-2] + "к")
+    if word.endswith("ець"):
+        return fold_vowels(word[:-3] + "ц")
+
+    for suffix in UKRAINIAN_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM_LENGTH:
+            return fold_vowels(word[: -len(suffix)])
+    return fold_vowels(word)
+
+
+class KeywordMatcher:
+    """
+    Мультишаблонний пошук ключових слів за один прохід по тексту.
+
+    Основи ключових слів зберігаються у префіксному дереві, тож вартість
+    аналізу залежить від довжини запиту, а не від кількості ключових слів.
+    Ключові слова з короткою основою (абревіатури на кшталт "фоп", "тов",
+    слова на кшталт "рента") шукаються як окремі слова з можливим
+    відмінковим закінченням, щоб "тов" не збігався з "товари".
+    """
+
+    word_pattern = re.compile(r"\w+")
+
+    def __init__(self, keyword_tables: Dict[str, Dict[str, float]]):
+        self.trie: Dict[str, dict] = {}
+        self.exact: Dict[str, List[Tuple[str, str, float, Tuple[str, ...]]]] = {}
+        self.size = 0
+
+        for category, keywords in keyword_tables.items():
+            for keyword, weight in keywords.items():
+                self.add(category, keyword, weight)
+
+    def add(self, category: str, keyword: str, weight: float) -> None:
+        words = self.word_pattern.findall(keyword.lower())
+        if not words:
+            return
+
+        stems = tuple(stem_word(word) for word in words)
+        entry = (category, keyword, weight, stems[1:])
+
+        if len(stems[0]) <= SHORT_STEM_LENGTH:
+            self.exact.setdefault(stems[0], []).append(entry)
+        else:
+            node = self.trie
+            for char in stems[0]:
+                node = node.setdefault(char, {})
+            node.setdefault("", []).append(entry)
+        self.size += 1
+
+    @staticmethod
+    def _word_keys(word: str, stem: str) -> Set[str]:
+        # Основа слова та слово без кожного з можливих закінчень
+        keys = {fold_vowels(word), stem}
+        for suffix in UKRAINIAN_SUFFIXES:
+            if word.endswith(suffix) and len(word) > len(suffix):
+                keys.add(fold_vowels(word[: -len(suffix)]))
+        return keys
+
+    def _exact_entries(self, keys: Set[str]):
+        for key in keys:
+            entries = self.exact.get(key)
+            if entries:
+                yield from entries
+
+    def _prefix_entries(self, stem: str):
+        node = self.trie
+        for char in stem:
+            node = node.get(char)
+            if node is None:
+                return
+            if "" in node:
+                yield from node[""]
+
+    def match(self, text: str) -> Dict[str, Dict[str, float]]:
+        words = self.word_pattern.findall(text.lower())
+        stems = [stem_word(word) for word in words]
+        keys = [self._word_keys(word, stem) for word, stem in zip(words, stems)]
+        matches: Dict[str, Dict[str, float]] = {}
+
+        for index in range(len(words)):
+            candidates = list(self._exact_entries(keys[index]))
+            candidates.extend(self._prefix_entries(stems[index]))
+
+            for category, keyword, weight, tail in candidates:
+                if tail and not self._match_tail(stems, keys, index + 1, tail):
+                    continue
+                matches.setdefault(category, {})[keyword] = weight
+
+        return matches
+
+    @staticmethod
+    def _match_tail(
+        stems: List[str], keys: List[Set[str]], start: int, tail: Tuple[str, ...]
+    ) -> bool:
+        if start + len(tail) > len(stems):
+            return False
+        return all(
+            (
+                stem in keys[start + offset]
+                if len(stem) <= SHORT_STEM_LENGTH
+                else stems[start + offset].startswith(stem)
+            )
+            for offset, stem in enumerate(tail)
+        )
+
+
 class QueryAnalyzer:
-    def __init__(self):
+    def __init__(
+        self, keywords_path: Optional[str] = None, reload_interval: float = 5.0
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.keywords_path = keywords_path
+        self.reload_interval = reload_interval
+        self._keywords_mtime = None
+        self._last_reload_check = 0.0
+
         self.greeting_patterns = {
             r"^(добр[ий|ого]\s*)(ранк[у|ок]|ден[ь|я]|вечі[р|ора])": 0.9,
             r"^віта[ю|ння]": 0.9,
@@ -58,41 +213,104 @@ class QueryAnalyzer:
             "резидент": 0.8,
         }
 
+        if keywords_path:
+            self.reload(force=True)
+        else:
+            self._compile()
+
+    def _compile(self) -> None:
+        patterns = list(self.greeting_patterns.items())
+        greeting_regex = re.compile(
+            "|".join(f"(?P<g{i}>{pattern})" for i, (pattern, _) in enumerate(patterns))
+        )
+        matcher = KeywordMatcher(
+            {
+                "system": self.system_query_keywords,
+                "tax": self.tax_keywords,
+            }
+        )
+        # Одне присвоєння, щоб паралельні запити не бачили напівготових таблиць
+        self._compiled = (greeting_regex, patterns, matcher)
+
+    def reload(self, force: bool = False) -> bool:
+        """Перезавантажує таблиці ключових слів з JSON-файлу, якщо він змінився."""
+        if not self.keywords_path:
+            return False
+
+        try:
+            mtime = os.stat(self.keywords_path).st_mtime
+        except OSError as e:
+            self.logger.warning(f"Keyword tables not available: {e}")
+            if force:
+                self._compile()
+            return False
+
+        if not force and mtime == self._keywords_mtime:
+            return False
+
+        try:
+            with open(self.keywords_path, "r", encoding="utf-8") as file:
+                tables = json.load(file)
+        except (OSError, ValueError) as e:
+            self.logger.error(f"Error loading keyword tables {self.keywords_path}: {e}")
+            if force:
+                self._compile()
+            return False
+
+        self.greeting_patterns = tables.get("greeting_patterns", self.greeting_patterns)
+        self.system_query_keywords = tables.get(
+            "system_query_keywords", self.system_query_keywords
+        )
+        self.tax_keywords = tables.get("tax_keywords", self.tax_keywords)
+        self._compile()
+        self._keywords_mtime = mtime
+
+        self.logger.info(
+            f"Loaded keyword tables from {self.keywords_path}: "
+            f"{self._compiled[2].size} keywords"
+        )
+        return True
+
+    def _maybe_reload(self) -> None:
+        if not self.keywords_path:
+            return
+        now = time.monotonic()
+        if now - self._last_reload_check < self.reload_interval:
+            return
+        self._last_reload_check = now
+        self.reload()
+
     def analyze_query(self, text: str) -> QueryAnalysisResult:
+        self._maybe_reload()
+        greeting_regex, patterns, matcher = self._compiled
+
         text = text.lower().strip()
 
-        for pattern, confidence in self.greeting_patterns.items():
-            if re.search(pattern, text):
-                return QueryAnalysisResult(
-                    QueryType.GREETING, confidence, {"pattern": pattern}
-                )
-
-        system_confidence = 0
-        system_matches = []
-        for keyword, weight in self.system_query_keywords.items():
-            if keyword in text:
-                system_confidence += weight
-                system_matches.append(keyword)
-
-        tax_confidence = 0
-        tax_matches = []
-        for keyword, weight in self.tax_keywords.items():
-            if keyword in text:
-                tax_confidence += weight
-                tax_matches.append(keyword)
-
-        system_confidence = min(system_confidence, 1.0)
-        tax_confidence = min(tax_confidence, 1.0)
+        greeting_match = greeting_regex.search(text)
+        if greeting_match:
+            pattern, confidence = patterns[int(greeting_match.lastgroup[1:])]
+            return QueryAnalysisResult(
+                QueryType.GREETING, confidence, {"pattern": pattern}
+            )
+
+        matches = matcher.match(text)
+        system_matches = matches.get("system", {})
+        tax_matches = matches.get("tax", {})
+
+        system_confidence = min(sum(system_matches.values()), 1.0)
+        tax_confidence = min(sum(tax_matches.values()), 1.0)
 
         if system_confidence > 0.6:
             return QueryAnalysisResult(
                 QueryType.SYSTEM_QUERY,
                 system_confidence,
-                {"matched_keywords": system_matches},
+                {"matched_keywords": list(system_matches)},
             )
         elif tax_confidence > 0.6:
             return QueryAnalysisResult(
-                QueryType.TAX_QUERY, tax_confidence, {"matched_keywords": tax_matches}
+                QueryType.TAX_QUERY,
+                tax_confidence,
+                {"matched_keywords": list(tax_matches)},
             )
 
         return QueryAnalysisResult(
@@ -100,9 +318,122 @@ class QueryAnalyzer:
         )
 
 
+DEFAULT_INTENT_EXAMPLES = {
+    QueryType.GREETING: [
+        "Добрий день",
+        "Привіт!",
+        "Вітаю",
+        "Доброго ранку",
+        "Здрастуйте, є хто?",
+    ],
+    QueryType.SYSTEM_QUERY: [
+        "Хто ти?",
+        "Що ти вмієш?",
+        "Як ти працюєш?",
+        "Яка модель лежить в основі цього асистента?",
+        "Які в тебе можливості?",
+    ],
+    QueryType.TAX_QUERY: [
+        "Яка ставка ПДФО для зарплати?",
+        "Скільки потрібно сплатити ЄСВ за місяць?",
+        "Який ліміт доходу для ФОП третьої групи?",
+        "Коли подавати річну декларацію про майновий стан?",
+        "Чи потрібно платити військовий збір з дивідендів?",
+        "Як оподатковується продаж квартири?",
+        "Які штрафи за несвоєчасну сплату податку?",
+        "Як зареєструватися платником ПДВ?",
+        "Чи можна найняти працівника на єдиному податку?",
+        "Як отримати податкову соціальну пільгу?",
+    ],
+    QueryType.IRRELEVANT: [
+        "Який рецепт борщу?",
+        "Яка погода буде завтра в Києві?",
+        "Порадь фільм на вечір",
+        "Хто виграв чемпіонат світу з футболу?",
+        "Напиши вірш про кохання",
+        "Як вивчити англійську мову швидко?",
+        "Як налаштувати домашній Wi-Fi роутер?",
+    ],
+}
+
+
+class IntentClassifier:
+    """
+    Класифікатор запитів за близькістю ембедінга до центроїдів намірів.
+
+    Центроїди обчислюються один раз при старті з розмічених прикладів.
+    Ембедінг запиту передається ззовні, тож його можна повторно використати
+    для пошуку у векторному сховищі.
+    """
+
+    def __init__(
+        self,
+        embed_documents: Callable[[List[str]], List[List[float]]],
+        examples: Optional[Dict[QueryType, List[str]]] = None,
+        min_confidence: float = 0.6,
+        temperature: float = 0.05,
+    ):
+        self.min_confidence = min_confidence
+        self.temperature = temperature
+
+        examples = examples or DEFAULT_INTENT_EXAMPLES
+        self.intents = [intent for intent, texts in examples.items() if texts]
+
+        centroids = []
+        for intent in self.intents:
+            vectors = self._normalize(np.asarray(embed_documents(examples[intent])))
+            centroids.append(vectors.mean(axis=0))
+        self.centroids = self._normalize(np.vstack(centroids))
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    @classmethod
+    def load_examples(cls, path: str) -> Dict[QueryType, List[str]]:
+        with open(path, "r", encoding="utf-8") as file:
+            raw = json.load(file)
+        return {QueryType(intent): texts for intent, texts in raw.items()}
+
+    def classify(self, embedding: List[float]) -> QueryAnalysisResult:
+        query_vector = self._normalize(np.asarray(embedding, dtype=np.float32))
+        similarities = self.centroids @ query_vector
+
+        logits = (similarities - similarities.max()) / self.temperature
+        probabilities = np.exp(logits) / np.exp(logits).sum()
+        best = int(probabilities.argmax())
+
+        return QueryAnalysisResult(
+            self.intents[best],
+            float(probabilities[best]),
+            {
+                "source": "embedding",
+                "similarities": {
+                    intent.value: round(float(similarity), 4)
+                    for intent, similarity in zip(self.intents, similarities)
+                },
+            },
+        )
+
+
 class QueryHandler:
-    def __init__(self):
-        self.analyzer = QueryAnalyzer()
+    def __init__(
+        self,
+        keywords_path: Optional[str] = None,
+        classifier: Optional[IntentClassifier] = None,
+        embed_query: Optional[Callable[[str], List[float]]] = None,
+        calculator: Optional[TaxCalculator] = None,
+        explain_calculations: bool = False,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.analyzer = QueryAnalyzer(keywords_path=keywords_path)
+        self.classifier = classifier
+        self.embed_query = embed_query
+        # Питання з сумою та видом податку рахуються без LLM; з
+        # explain_calculations LLM отримує готові числа лише для пояснення
+        self.calculator = calculator
+        self.explain_calculations = explain_calculations
         self.greeting_responses = [
             "Вітаю! Чим можу допомогти з питань оподаткування?",
             "Доброго дня! Готовий допомогти вам з податковими питаннями.",
@@ -135,9 +466,48 @@ class QueryHandler:
         Будь ласка, задайте питання, пов'язане з цими темами.
         """
 
-    def handle_query(self, query: str, model_response_func=None) -> str:
+    def analyze(self, query: str) -> QueryAnalysisResult:
         analysis = self.analyzer.analyze_query(query)
 
+        if (
+            self.classifier is None
+            or self.embed_query is None
+            or analysis.query_type == QueryType.GREETING
+        ):
+            return analysis
+
+        intent = self.classifier.classify(self.embed_query(query))
+        if intent.confidence >= self.classifier.min_confidence:
+            intent.details["keyword_analysis"] = analysis.query_type.value
+            return intent
+
+        return analysis
+
+    def calculate(self, query: str) -> Optional[QueryAnalysisResult]:
+        request = self.calculator.extract(query)
+        if request is None:
+            return None
+        try:
+            calculation = self.calculator.calculate(request)
+        except ValueError as e:
+            self.logger.warning(f"Calculation skipped: {e}")
+            return None
+        return QueryAnalysisResult(
+            QueryType.CALCULATION, 1.0, {"calculation": calculation}
+        )
+
+    def route(self, query: str) -> QueryAnalysisResult:
+        with stage("routing"):
+            analysis = self.analyze(query)
+            if self.calculator and analysis.query_type == QueryType.TAX_QUERY:
+                analysis = self.calculate(query) or analysis
+        QUERIES.labels(query_type=analysis.query_type.value).inc()
+        return analysis
+
+    def instant_response(self, analysis: QueryAnalysisResult) -> Optional[str]:
+        """
+        Готова відповідь для маршрутів без LLM; None для податкових питань
+        """
         if analysis.query_type == QueryType.GREETING:
             return choice(self.greeting_responses)
 
@@ -145,9 +515,29 @@ class QueryHandler:
             return self.system_query_response.strip()
 
         elif analysis.query_type == QueryType.TAX_QUERY:
-            if model_response_func:
-                return model_response_func(query)
-            return ""
+            return None
+
+        elif analysis.query_type == QueryType.CALCULATION:
+            if self.explain_calculations:
+                return None
+            return analysis.details["calculation"].format()
 
         else:
             return self.irrelevant_query_response.strip()
+
+    def handle_query(
+        self,
+        query: str,
+        model_response_func=None,
+        analysis: Optional[QueryAnalysisResult] = None,
+    ) -> str:
+        if analysis is None:
+            analysis = self.route(query)
+
+        response = self.instant_response(analysis)
+        if response is not None:
+            return response
+
+        if model_response_func:
+            return model_response_func(query)
+        return ""
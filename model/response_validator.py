@@ -0,0 +1,168 @@
+import re
+from typing import Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+class GenerationAborted(Exception):
+    def __init__(self, reason: str):
+        super().__init__(f"Generation aborted: {reason}")
+        self.reason = reason
+
+
+class StreamingResponseValidator:
+    """
+    Інкрементальна перевірка відповіді, що генерується токен за токеном.
+
+    Правила повторів та мови перевіряються лише на новому фрагменті тексту,
+    тож вартість кожного токена не залежить від довжини вже згенерованої
+    відповіді. Повну перевірку після генерації виконує
+    TaxCodeAssistant.validate_response.
+
+    Рядки таблиць і рядки без літер (суми, ставки) не рахуються в обсяг
+    тексту для перевірки no_ukrainian: відповідь може починатися з таблиці.
+    """
+
+    ukrainian_pattern = re.compile(r"[а-яА-ЯіІїЇєЄґҐ]")
+    word_pattern = re.compile(r"^\w+$")
+
+    def __init__(
+        self,
+        max_consecutive_repeats: int = 5,
+        max_identical_tokens: int = 10,
+        max_latin_run: int = 30,
+        min_chars_for_ratio_checks: int = 200,
+        max_digit_ratio: float = 0.5,
+    ):
+        self.max_consecutive_repeats = max_consecutive_repeats
+        self.max_identical_tokens = max_identical_tokens
+        self.max_latin_run = max_latin_run
+        self.min_chars_for_ratio_checks = min_chars_for_ratio_checks
+        self.max_digit_ratio = max_digit_ratio
+
+        self.reason: Optional[str] = None
+        self.total_chars = 0
+        self.digit_chars = 0
+        self.has_ukrainian = False
+        # Символи рядків з літерами поза таблицями, з них рахується поріг
+        # no_ukrainian
+        self.text_chars = 0
+
+        self._pending_word = ""
+        self._previous_word = None
+        self._consecutive_repeats = 0
+        self._previous_token = None
+        self._identical_tokens = 0
+        self._latin_run = 0
+        self._line_chars = 0
+        self._line_started = False
+        self._line_is_table = False
+        self._line_has_letters = False
+
+    def feed(self, chunk: str) -> Optional[str]:
+        if self.reason is not None or not chunk:
+            return self.reason
+
+        self.total_chars += len(chunk)
+
+        for char in chunk:
+            if char.isdigit():
+                self.digit_chars += 1
+
+            # Той самий фрагмент, що й [A-Za-z\s]{30,} у validate_response:
+            # пробіли подовжують його, будь-який інший символ обриває, тож
+            # посилання на закон з цифрами та розділовими знаками проходить
+            if ("a" <= char <= "z") or ("A" <= char <= "Z") or char.isspace():
+                self._latin_run += 1
+                if self._latin_run >= self.max_latin_run:
+                    return self._trip("latin_text")
+            else:
+                self._latin_run = 0
+
+            if char == "\n":
+                self._end_line()
+            else:
+                if not self._line_started and not char.isspace():
+                    self._line_started = True
+                    self._line_is_table = char == "|"
+                self._line_chars += 1
+                self._line_has_letters = self._line_has_letters or char.isalpha()
+
+            if char.isspace():
+                if self._pending_word:
+                    reason = self._complete_word(self._pending_word)
+                    self._pending_word = ""
+                    if reason:
+                        return self._trip(reason)
+            else:
+                self._pending_word += char
+
+        if not self.has_ukrainian and self.ukrainian_pattern.search(chunk):
+            self.has_ukrainian = True
+
+        if (
+            not self.has_ukrainian
+            and self._counted_text_chars() >= self.min_chars_for_ratio_checks
+        ):
+            return self._trip("no_ukrainian")
+        if (
+            self.total_chars >= self.min_chars_for_ratio_checks
+            and self.digit_chars > self.total_chars * self.max_digit_ratio
+        ):
+            return self._trip("digit_ratio")
+
+        return None
+
+    def _is_text_line(self) -> bool:
+        return self._line_has_letters and not self._line_is_table
+
+    def _end_line(self) -> None:
+        if self._is_text_line():
+            self.text_chars += self._line_chars
+        self._line_chars = 0
+        self._line_started = False
+        self._line_is_table = False
+        self._line_has_letters = False
+
+    def _counted_text_chars(self) -> int:
+        if self._is_text_line():
+            return self.text_chars + self._line_chars
+        return self.text_chars
+
+    def _complete_word(self, token: str) -> Optional[str]:
+        if self.word_pattern.match(token) and token == self._previous_token:
+            self._identical_tokens += 1
+            if self._identical_tokens >= self.max_identical_tokens:
+                return "repeated_sequence"
+        else:
+            self._identical_tokens = 0
+        self._previous_token = token
+
+        word = token.lower()
+        if word == self._previous_word and len(word) > 2:
+            self._consecutive_repeats += 1
+            if self._consecutive_repeats > self.max_consecutive_repeats:
+                return "consecutive_repeats"
+        else:
+            self._consecutive_repeats = 0
+        self._previous_word = word
+
+        return None
+
+    def _trip(self, reason: str) -> str:
+        self.reason = reason
+        return reason
+
+
+class StreamingValidationHandler(BaseCallbackHandler):
+    """Передає токени LLM у валідатор і перериває генерацію при порушенні правил."""
+
+    raise_error = True
+
+    def __init__(self, validator: StreamingResponseValidator):
+        self.validator = validator
+
+    def on_llm_new_token(self, token: str, **kwargs) -> None:
+        reason = self.validator.feed(token)
+        if reason:
+            raise GenerationAborted(reason)
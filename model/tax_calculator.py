@@ -0,0 +1,455 @@
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_TAX_RATES = os.path.join(os.path.dirname(__file__), "tax_rates.json")
+
+KOPECK = Decimal("0.01")
+
+FOP_GROUPS = ("1", "2", "3")
+
+_NUMBER = r"\d{1,3}(?:[  ]\d{3})+(?:[.,]\d+)?|\d+(?:[.,]\d+)?"
+AMOUNT_PATTERN = re.compile(
+    rf"(?<![\d.,])({_NUMBER})\s*(млн|мільйон\w*|тис\w*)?\.?"
+    r"\s*(грн|гривен\w*|гривн\w*|₴)?"
+)
+YEAR_PATTERN = re.compile(r"\b(20[2-3]\d)\s*(?:р\.|рік|році|року|рр\.)?")
+GROUP_PATTERN = re.compile(
+    r"\b([1-3])\s*-?\s*(?:а|ї|й|ої)?\s*груп\w*|груп\w*\s*([1-3])\b"
+)
+MONTHS_PATTERN = re.compile(r"\b(\d{1,2})\s*місяц\w*")
+
+MILLION_PREFIXES = ("млн", "мільйон")
+
+SALARY_KEYWORDS = ("зарплат", "заробітн", "оклад", "брудн", "нарахован")
+# Скорочення "зп" / "з/п" лише окремим словом, не всередині "зпо", "азп" тощо
+SALARY_ABBREVIATION = re.compile(r"\bз/?п\b")
+# Доходи, що оподатковуються інакше, ніж зарплата чи дохід ФОП: продаж
+# майна, дивіденди, оренда, спадщина тощо рахуються не калькулятором, а LLM
+OTHER_INCOME_KEYWORDS = (
+    "продаж",
+    "продав",
+    "продам",
+    "дивіденд",
+    "оренд",
+    "спадщин",
+    "спадок",
+    "подарун",
+    "дарув",
+    "виграш",
+    "лотере",
+    "роялті",
+    "депозит",
+    "відсотк",
+    "інвестиц",
+    "криптовалют",
+    "нерухом",
+    "квартир",
+    "будин",
+    "автомобіл",
+    "іноземн",
+    "пенсі",
+    "стипенді",
+)
+FOP_KEYWORDS = ("фоп", "єдин", "підприєм")
+VAT_KEYWORDS = ("з пдв", "платник пдв", "платником пдв")
+
+
+def _decimal(value) -> Decimal:
+    return Decimal(str(value))
+
+
+def _round(value: Decimal) -> Decimal:
+    return value.quantize(KOPECK, rounding=ROUND_HALF_UP)
+
+
+def _money(value: Decimal) -> str:
+    whole, _, fraction = f"{_round(value):.2f}".partition(".")
+    sign = "-" if whole.startswith("-") else ""
+    whole = whole.lstrip("-")
+    groups = []
+    while whole:
+        groups.insert(0, whole[-3:])
+        whole = whole[:-3]
+    return f"{sign}{' '.join(groups)},{fraction}"
+
+
+def _percent(rate: Decimal) -> str:
+    return f"{(rate * 100).normalize():f}".replace(".", ",") + "%"
+
+
+@dataclass(frozen=True)
+class RateTable:
+    version: str
+    effective_from: date
+    source: str
+    minimum_wage: Decimal
+    subsistence_minimum: Decimal
+    pdfo_rate: Decimal
+    military_levy_rate: Decimal
+    esv_rate: Decimal
+    esv_max_base_minimum_wages: int
+    fop: Dict[str, Dict[str, Decimal]]
+    # Значення ще не звірені з чинним законом: розрахунок за ними не ведеться
+    provisional: bool = False
+
+    @classmethod
+    def from_dict(cls, raw: Dict) -> "RateTable":
+        return cls(
+            version=raw["version"],
+            effective_from=date.fromisoformat(raw["effective_from"]),
+            source=raw.get("source", ""),
+            minimum_wage=_decimal(raw["minimum_wage"]),
+            subsistence_minimum=_decimal(raw["subsistence_minimum"]),
+            pdfo_rate=_decimal(raw["pdfo_rate"]),
+            military_levy_rate=_decimal(raw["military_levy_rate"]),
+            esv_rate=_decimal(raw["esv_rate"]),
+            esv_max_base_minimum_wages=int(raw["esv_max_base_minimum_wages"]),
+            fop={
+                group: {key: _decimal(value) for key, value in values.items()}
+                for group, values in raw["fop"].items()
+            },
+            provisional=bool(raw.get("provisional", False)),
+        )
+
+    @property
+    def esv_minimum(self) -> Decimal:
+        return _round(self.minimum_wage * self.esv_rate)
+
+    @property
+    def esv_max_base(self) -> Decimal:
+        return self.minimum_wage * self.esv_max_base_minimum_wages
+
+
+class TaxTables:
+    def __init__(self, tables: List[RateTable]):
+        """
+        Версіоновані таблиці ставок і лімітів
+
+        Кожна версія діє з effective_from до початку наступної, тож розрахунок
+        за минулий період використовує ставки, що діяли тоді. Неперевірені
+        (provisional) версії пропускаються: на їхній період діє остання
+        перевірена таблиця, а розрахунок отримує примітку про це.
+        """
+        if not tables:
+            raise ValueError("Tax rate tables are empty")
+        self.tables = sorted(tables, key=lambda table: table.effective_from)
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "TaxTables":
+        path = path or os.getenv("TAX_RATES_PATH") or DEFAULT_TAX_RATES
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Tax rate tables not found at {path}")
+        with open(path, "r", encoding="utf-8") as file:
+            raw = json.load(file)
+        return cls([RateTable.from_dict(version) for version in raw["versions"]])
+
+    def for_date(self, on: date) -> RateTable:
+        applicable = [
+            table
+            for table in self.tables
+            if table.effective_from <= on and not table.provisional
+        ]
+        if not applicable:
+            raise ValueError(f"No verified tax rates on {on.isoformat()}")
+        return applicable[-1]
+
+    def provisional_for(self, on: date) -> Optional[RateTable]:
+        """Неперевірена таблиця, що діяла б на дату замість for_date(on)"""
+        applicable = [table for table in self.tables if table.effective_from <= on]
+        if applicable and applicable[-1].provisional:
+            return applicable[-1]
+        return None
+
+
+@dataclass
+class CalculationRequest:
+    kind: str
+    amount: Decimal
+    months: int = 1
+    group: Optional[str] = None
+    year: Optional[int] = None
+    vat: bool = False
+    notes: List[str] = field(default_factory=list)
+
+
+@dataclass
+class CalculationLine:
+    label: str
+    formula: str
+    amount: Decimal
+
+
+@dataclass
+class TaxCalculation:
+    title: str
+    table: RateTable
+    lines: List[CalculationLine]
+    notes: List[str] = field(default_factory=list)
+
+    def format(self) -> str:
+        rows = [f"Розрахунок: {self.title}"]
+        for line in self.lines:
+            formula = f"{line.formula} = " if line.formula else ""
+            rows.append(f"- {line.label}: {formula}{_money(line.amount)} грн")
+        rows.extend(self.notes)
+        rows.append(
+            f"Ставки: таблиця {self.table.version}, діє з "
+            f"{self.table.effective_from:%d.%m.%Y} ({self.table.source})"
+        )
+        return "\n".join(rows)
+
+
+class TaxCalculator:
+    def __init__(self, tables: Optional[TaxTables] = None):
+        """
+        Детермінований розрахунок ПДФО, військового збору, ЄСВ та податків ФОП
+
+        Суми рахуються в Decimal з округленням до копійки, ставки беруться з
+        таблиці, чинної на дату розрахунку.
+        """
+        self.tables = tables or TaxTables.load()
+
+    def _table(self, on: Optional[date]) -> Tuple[RateTable, List[str]]:
+        on = on or date.today()
+        table = self.tables.for_date(on)
+        pending = self.tables.provisional_for(on)
+        if pending is None:
+            return table, []
+        return table, [
+            f"Ставки з {pending.effective_from:%d.%m.%Y} ще не звірені з чинним "
+            f"законом, тож на {on:%d.%m.%Y} розраховано за таблицею "
+            f"{table.version}: суми можуть відрізнятися від чинних."
+        ]
+
+    def salary(
+        self, gross: Decimal, months: int = 1, on: Optional[date] = None
+    ) -> TaxCalculation:
+        table, notes = self._table(on)
+        pdfo = _round(gross * table.pdfo_rate)
+        levy = _round(gross * table.military_levy_rate)
+        esv_base = min(gross, table.esv_max_base * months)
+        esv = _round(esv_base * table.esv_rate)
+
+        period = "на місяць" if months == 1 else f"за {months} міс."
+        lines = [
+            CalculationLine(
+                "ПДФО (ст. 167 ПКУ)",
+                f"{_money(gross)} × {_percent(table.pdfo_rate)}",
+                pdfo,
+            ),
+            CalculationLine(
+                "Військовий збір (п. 16-1 підр. 10 розд. XX ПКУ)",
+                f"{_money(gross)} × {_percent(table.military_levy_rate)}",
+                levy,
+            ),
+            CalculationLine(
+                "До виплати працівнику",
+                f"{_money(gross)} − {_money(pdfo)} − {_money(levy)}",
+                gross - pdfo - levy,
+            ),
+            CalculationLine(
+                "ЄСВ, сплачує роботодавець понад зарплату",
+                f"{_money(esv_base)} × {_percent(table.esv_rate)}",
+                esv,
+            ),
+        ]
+
+        if esv_base < gross:
+            notes.append(
+                f"База ЄСВ обмежена {table.esv_max_base_minimum_wages} мінімальними "
+                f"зарплатами ({_money(table.esv_max_base)} грн на місяць)."
+            )
+        if gross < table.minimum_wage * months:
+            notes.append(
+                f"Зарплата нижча за мінімальну ({_money(table.minimum_wage)} грн): "
+                "за повної зайнятості ЄСВ нараховується не менше ніж з мінімальної."
+            )
+        return TaxCalculation(
+            f"заробітна плата {_money(gross)} грн {period}", table, lines, notes
+        )
+
+    def fop(
+        self,
+        group: str,
+        income: Decimal,
+        months: int = 12,
+        on: Optional[date] = None,
+        vat: bool = False,
+    ) -> TaxCalculation:
+        if group not in FOP_GROUPS:
+            raise ValueError(f"Unsupported FOP group {group!r}")
+
+        table, notes = self._table(on)
+        rates = table.fop[group]
+        lines = []
+
+        if group == "3":
+            rate = rates["tax_rate_vat"] if vat else rates["tax_rate"]
+            lines.append(
+                CalculationLine(
+                    "Єдиний податок (ст. 293 ПКУ)",
+                    f"{_money(income)} × {_percent(rate)}",
+                    _round(income * rate),
+                )
+            )
+            if rates["military_levy_rate"]:
+                lines.append(
+                    CalculationLine(
+                        "Військовий збір",
+                        f"{_money(income)} × {_percent(rates['military_levy_rate'])}",
+                        _round(income * rates["military_levy_rate"]),
+                    )
+                )
+        else:
+            lines.append(
+                CalculationLine(
+                    "Єдиний податок (ст. 293 ПКУ)",
+                    f"{_money(rates['monthly_tax'])} × {months} міс.",
+                    _round(rates["monthly_tax"] * months),
+                )
+            )
+            if rates["military_levy_monthly"]:
+                lines.append(
+                    CalculationLine(
+                        "Військовий збір",
+                        f"{_money(rates['military_levy_monthly'])} × {months} міс.",
+                        _round(rates["military_levy_monthly"] * months),
+                    )
+                )
+
+        lines.append(
+            CalculationLine(
+                "Мінімальний ЄСВ за себе",
+                f"{_money(table.esv_minimum)} × {months} міс.",
+                _round(table.esv_minimum * months),
+            )
+        )
+        lines.append(
+            CalculationLine("Разом до сплати", "", sum(line.amount for line in lines))
+        )
+
+        limit = rates["income_limit"]
+        if months == 12 and income > limit:
+            notes.append(
+                f"Дохід перевищує річний ліміт {group} групи ({_money(limit)} грн): "
+                "з суми перевищення сплачується 15%, а ФОП має перейти на іншу "
+                "групу або загальну систему (ст. 293 ПКУ)."
+            )
+        else:
+            notes.append(f"Річний ліміт доходу {group} групи: {_money(limit)} грн.")
+
+        period = "рік" if months == 12 else f"{months} міс."
+        vat_note = ", платник ПДВ" if vat and group == "3" else ""
+        return TaxCalculation(
+            f"ФОП {group} групи{vat_note}, дохід {_money(income)} грн за {period}",
+            table,
+            lines,
+            notes,
+        )
+
+    def calculate(self, request: CalculationRequest) -> TaxCalculation:
+        on = None
+        if request.year is not None and request.year != date.today().year:
+            # Минулий рік рахується за ставками на його кінець, майбутній - на початок
+            on = (
+                date(request.year, 12, 31)
+                if request.year < date.today().year
+                else date(request.year, 1, 1)
+            )
+
+        if request.kind == "salary":
+            calculation = self.salary(request.amount, request.months, on)
+        elif request.kind == "fop":
+            calculation = self.fop(
+                request.group, request.amount, request.months, on, request.vat
+            )
+        else:
+            raise ValueError(f"Unknown calculation kind {request.kind!r}")
+
+        notes = list(request.notes)
+        if on is not None:
+            notes.append(f"Розраховано за ставками на {on:%d.%m.%Y}.")
+        calculation.notes = notes + calculation.notes
+        return calculation
+
+    @staticmethod
+    def extract(query: str) -> Optional[CalculationRequest]:
+        """
+        Сума, вид податку та період з тексту питання; None, якщо питання
+        не містить усього потрібного для розрахунку
+        """
+        text = " " + query.lower().replace("’", "'") + " "
+
+        year_match = YEAR_PATTERN.search(text)
+        year = int(year_match.group(1)) if year_match else None
+        group_match = GROUP_PATTERN.search(text)
+        group = (group_match.group(1) or group_match.group(2)) if group_match else None
+        months_match = MONTHS_PATTERN.search(text)
+
+        # Рік, група та кількість місяців - теж числа, але не суми
+        stripped = text
+        for pattern in (YEAR_PATTERN, GROUP_PATTERN, MONTHS_PATTERN):
+            stripped = pattern.sub(" ", stripped)
+
+        amounts = []
+        for number, multiplier, currency in AMOUNT_PATTERN.findall(stripped):
+            value = _decimal(re.sub(r"[  ]", "", number).replace(",", "."))
+            if multiplier:
+                value *= (
+                    Decimal(1_000_000)
+                    if multiplier.startswith(MILLION_PREFIXES)
+                    else Decimal(1000)
+                )
+            if multiplier or currency or value >= 1000:
+                amounts.append(value)
+        if len(amounts) != 1:
+            return None
+
+        if months_match:
+            months = int(months_match.group(1))
+        elif re.search(r"квартал", text):
+            months = 3
+        elif re.search(r"за рік|на рік|річн", text):
+            months = 12
+        elif re.search(r"місяц|щомісяч|в місяць", text):
+            months = 1
+        else:
+            months = None
+        if months is not None and not 1 <= months <= 12:
+            return None
+
+        if any(keyword in text for keyword in OTHER_INCOME_KEYWORDS):
+            return None
+
+        notes = []
+        if any(keyword in text for keyword in FOP_KEYWORDS):
+            if group is None:
+                return None
+            if months is None:
+                months = 12
+                notes.append("Період не вказано: дохід вважається річним.")
+            return CalculationRequest(
+                "fop",
+                amounts[0],
+                months=months,
+                group=group,
+                year=year,
+                vat=any(keyword in text for keyword in VAT_KEYWORDS),
+                notes=notes,
+            )
+
+        # Лише явна зарплата: "ПДФО з 100 000 грн" без неї може бути будь-яким
+        # доходом з іншими ставками і без ЄСВ
+        if SALARY_ABBREVIATION.search(text) or any(
+            keyword in text for keyword in SALARY_KEYWORDS
+        ):
+            return CalculationRequest(
+                "salary", amounts[0], months=months or 1, year=year, notes=notes
+            )
+
+        return None
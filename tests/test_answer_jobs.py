@@ -0,0 +1,177 @@
+import os
+import sys
+import time
+
+import httpx
+import pytest
+
+pytest.importorskip("django")
+
+import django  # noqa: E402
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "frontend"))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "chat_project.settings")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from chat import jobs  # noqa: E402
+from chat.models import Chat, Message  # noqa: E402
+
+# Хід з такими репліками перевищує бюджет історії навіть після обрізання
+LONG_QUESTION = "Яка ставка ПДФО та військового збору для зарплати? " * 40
+LONG_ANSWER = "Ставка ПДФО становить 18%, військовий збір - 1,5%. " * 40
+
+
+@pytest.fixture(scope="module")
+def runner(tmp_path_factory):
+    # Тести не торкаються db.sqlite3 розробника
+    settings.DATABASES["default"]["NAME"] = str(
+        tmp_path_factory.mktemp("db") / "jobs.sqlite3"
+    )
+    call_command("migrate", verbosity=0)
+    return jobs.AnswerJobRunner(concurrency=2)
+
+
+def _pending_answer(text: str = "Яка ставка ПДФО?") -> Message:
+    user, _ = User.objects.get_or_create(username="jobs")
+    chat = Chat.objects.create(user=user, title="test")
+    question = Message.objects.create(chat=chat, content=text)
+    return Message.objects.create(
+        chat=chat,
+        content="",
+        is_assistant=True,
+        question=question,
+        status=Message.Status.PENDING,
+    )
+
+
+def _respond(status_code: int = 200, **kwargs):
+    async def call(*args, **_):
+        return httpx.Response(status_code, **kwargs)
+
+    return call
+
+
+def test_malformed_answer_marks_message_failed(runner, monkeypatch):
+    monkeypatch.setattr(jobs, "query_backend", _respond(json={"detail": "?"}))
+    message = _pending_answer()
+
+    runner.submit(message.id).result(timeout=10)
+
+    message.refresh_from_db()
+    assert message.status == Message.Status.FAILED
+    assert message.content == jobs.BACKEND_ERROR_TEXT
+
+
+def test_crash_after_claim_does_not_leave_message_running(runner, monkeypatch):
+    async def crash(self, message):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(jobs.AnswerJobRunner, "_generate", crash)
+    message = _pending_answer()
+
+    runner.submit(message.id).result(timeout=10)
+
+    message.refresh_from_db()
+    assert message.status == Message.Status.FAILED
+    assert message.content == jobs.BACKEND_ERROR_TEXT
+
+
+def _next_turn(previous: Message, text: str = "А ВЗ?") -> Message:
+    question = Message.objects.create(chat=previous.chat, content=text)
+    return Message.objects.create(
+        chat=previous.chat,
+        content="",
+        is_assistant=True,
+        question=question,
+        status=Message.Status.PENDING,
+    )
+
+
+def _summary_calls(monkeypatch) -> list:
+    calls = []
+
+    async def summarize(summary, turns, **kwargs):
+        calls.append(turns)
+        return httpx.Response(200, json={"summary": "Питали про ПДФО"})
+
+    monkeypatch.setattr(jobs, "summarize_backend", summarize)
+    return calls
+
+
+def test_summary_failure_keeps_answer(runner, monkeypatch):
+    monkeypatch.setattr(jobs, "query_backend", _respond(json={"answer": LONG_ANSWER}))
+    monkeypatch.setattr(jobs, "summarize_backend", _respond(content=b"not json"))
+    first = _pending_answer(LONG_QUESTION)
+    runner.submit(first.id).result(timeout=10)
+
+    # Другий хід того ж чату: довгий перший хід не вміщається в бюджет
+    second = _next_turn(first)
+    runner.submit(second.id).result(timeout=10)
+
+    second.refresh_from_db()
+    chat = Chat.objects.get(id=first.chat_id)
+    assert second.status == Message.Status.DONE
+    assert second.content == LONG_ANSWER
+    assert chat.history_summary == ""
+    assert chat.summary_until_id is None
+
+
+def test_short_history_is_not_summarized(runner, monkeypatch):
+    monkeypatch.setattr(jobs, "query_backend", _respond(json={"answer": "18%"}))
+    calls = _summary_calls(monkeypatch)
+    first = _pending_answer()
+    runner.submit(first.id).result(timeout=10)
+
+    for _ in range(3):
+        turn = _next_turn(first)
+        runner.submit(turn.id).result(timeout=10)
+
+    assert calls == []
+    assert Chat.objects.get(id=first.chat_id).summary_until_id is None
+
+
+def test_history_over_budget_is_summarized(runner, monkeypatch):
+    monkeypatch.setattr(jobs, "query_backend", _respond(json={"answer": LONG_ANSWER}))
+    calls = _summary_calls(monkeypatch)
+    first = _pending_answer(LONG_QUESTION)
+    runner.submit(first.id).result(timeout=10)
+
+    second = _next_turn(first)
+    runner.submit(second.id).result(timeout=10)
+
+    chat = Chat.objects.get(id=first.chat_id)
+    assert [turn["role"] for turn in calls[0]] == ["user", "assistant"]
+    assert chat.history_summary == "Питали про ПДФО"
+    assert chat.summary_until_id == first.id
+
+
+def test_periodic_recovery_reclaims_stale_jobs(runner, monkeypatch):
+    monkeypatch.setattr(jobs, "query_backend", _respond(json={"answer": "18%"}))
+    stale, fresh = _pending_answer(), _pending_answer()
+    # Воркер, що захопив задачу, впав: оновлення давно не було
+    Message.objects.filter(id=stale.id).update(
+        status=Message.Status.RUNNING,
+        updated_at=timezone.now() - jobs.ANSWER_JOB_STALE_AFTER * 2,
+    )
+    Message.objects.filter(id=fresh.id).update(status=Message.Status.RUNNING)
+
+    recovery = runner.start_recovery(interval=0.05)
+    try:
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            stale.refresh_from_db()
+            if stale.status == Message.Status.DONE:
+                break
+            time.sleep(0.05)
+    finally:
+        recovery.cancel()
+
+    fresh.refresh_from_db()
+    assert stale.status == Message.Status.DONE
+    assert stale.content == "18%"
+    assert fresh.status == Message.Status.RUNNING
@@ -0,0 +1,76 @@
+import pytest
+
+from data.arrow_store import (
+    iter_record_batches,
+    read_arrow_dataset,
+    write_arrow_dataset,
+)
+from data.dataset import Dataset
+from tokenizer.tokenizer import Tokenizer
+
+TEXT = " ".join(
+    f"Стаття {number}. Платник податку подає декларацію за {number} квартал. "
+    f"Сума зобов'язання сплачується протягом десяти днів"
+    for number in range(1, 31)
+)
+
+
+@pytest.fixture
+def chunks():
+    items = []
+    for index, chunk in enumerate(Tokenizer().tokenize_text(TEXT, 20, 6)):
+        items.append(
+            {
+                "text": chunk["text"],
+                "source_file": "code.pdf",
+                "length": chunk["length"],
+                "chunk_index": index,
+                "sentence_start": chunk["sentence_start"],
+                "sentence_end": chunk["sentence_end"],
+                "structure": {
+                    "articles": [f"Стаття {index + 1}"],
+                    "points": [],
+                    "page": index // 4 + 1,
+                },
+                "document_metadata": {"total_pages": 8, "document_path": "/code.pdf"},
+            }
+        )
+    return items
+
+
+def test_round_trip_keeps_records_and_offsets(chunks, tmp_path):
+    path = str(tmp_path / "dataset.arrow")
+    write_arrow_dataset(chunks, path, batch_size=4)
+
+    restored = read_arrow_dataset(path)
+
+    assert restored == chunks
+    sentences = Tokenizer()._split_into_sentences(TEXT)
+    for item in restored:
+        span = sentences[item["sentence_start"] : item["sentence_end"]]
+        assert item["text"] == " ".join(span)
+
+
+def test_batches_stream_selected_columns(chunks, tmp_path):
+    path = str(tmp_path / "dataset.arrow")
+    write_arrow_dataset(chunks, path, batch_size=4)
+
+    batches = list(iter_record_batches(path, columns=["text", "sentence_start"]))
+
+    assert [batch.num_rows for batch in batches][:-1] == [4] * (len(batches) - 1)
+    assert all(batch.schema.names == ["text", "sentence_start"] for batch in batches)
+    assert [row for batch in batches for row in batch.column(1).to_pylist()] == [
+        item["sentence_start"] for item in chunks
+    ]
+
+
+def test_dataset_loads_arrow_file(chunks, tmp_path):
+    path = str(tmp_path / "dataset.arrow")
+    write_arrow_dataset(chunks, path)
+
+    assert Dataset.load_dataset(path, "arrow") == chunks
+
+
+def test_missing_file_is_reported(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        next(iter_record_batches(str(tmp_path / "missing.arrow")))
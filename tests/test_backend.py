@@ -0,0 +1,21 @@
+import threading
+
+from fastapi.testclient import TestClient
+
+import backend.main
+
+
+def test_lifespan_starts_warm_up_and_marks_worker_dead(monkeypatch):
+    started = threading.Event()
+    stopped = []
+    monkeypatch.setattr(backend.main, "warm_up", started.set)
+    monkeypatch.setattr(backend.main, "mark_worker_dead", lambda: stopped.append(1))
+
+    with TestClient(backend.main.app) as client:
+        assert started.wait(timeout=5)
+        assert client.get("/healthz").json() == {"status": "ok"}
+        # Поки асистент вантажиться, сервер відповідає, але ще не готовий
+        assert client.get("/readyz").status_code == 503
+        assert stopped == []
+
+    assert stopped == [1]
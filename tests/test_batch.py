@@ -0,0 +1,66 @@
+import json
+
+import pytest
+from langchain_core.language_models.fake import FakeListLLM
+
+from benchmarks.corpus import HashingEmbeddings
+from model.batch import BatchRunner, completed_ids
+from model.model import INVALID_RESPONSE_TEXT, REPHRASE_TEXT, TaxCodeAssistant
+
+QUESTION = {
+    "id": "1",
+    "question": "Як зареєструватися платником ПДВ?",
+    "filters": None,
+    "shards": None,
+}
+
+
+@pytest.fixture
+def assistant(tmp_path):
+    return TaxCodeAssistant(
+        persist_directory=str(tmp_path / "db"),
+        llm=FakeListLLM(responses=["Відповідь"]),
+        embeddings=HashingEmbeddings(),
+    )
+
+
+def _run(assistant, monkeypatch, tmp_path, response: str) -> dict:
+    monkeypatch.setattr(assistant, "process_query", lambda *args, **kwargs: response)
+    output = tmp_path / "answers.jsonl"
+    BatchRunner(assistant, concurrency=1).run(iter([QUESTION]), str(output))
+    return json.loads(output.read_text(encoding="utf-8").splitlines()[-1])
+
+
+def test_fallback_response_is_retried_on_resume(assistant, monkeypatch, tmp_path):
+    record = _run(
+        assistant, monkeypatch, tmp_path, f"{INVALID_RESPONSE_TEXT} {REPHRASE_TEXT}"
+    )
+
+    assert record["route"] == "tax_query"
+    assert record["error"] == f"{INVALID_RESPONSE_TEXT} {REPHRASE_TEXT}"
+    assert completed_ids(str(tmp_path / "answers.jsonl")) == set()
+
+
+def test_generation_error_is_retried_on_resume(assistant, monkeypatch, tmp_path):
+    record = _run(
+        assistant,
+        monkeypatch,
+        tmp_path,
+        "Виникла помилка при генерації відповіді: timeout",
+    )
+
+    assert record["error"] is not None
+    assert completed_ids(str(tmp_path / "answers.jsonl")) == set()
+
+
+def test_answer_is_not_retried(assistant, monkeypatch, tmp_path):
+    record = _run(
+        assistant,
+        monkeypatch,
+        tmp_path,
+        "Реєстрація платником ПДВ.\n\nДжерела:\nСтаття 180",
+    )
+
+    assert record["error"] is None
+    assert record["sources"] == ["Стаття 180"]
+    assert completed_ids(str(tmp_path / "answers.jsonl")) == {"1"}
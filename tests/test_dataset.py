@@ -0,0 +1,97 @@
+import pytest
+
+from data.dataset import Dataset
+from data.dedup import MinHashDeduplicator
+
+ARTICLE = (
+    "Платники єдиного податку першої групи сплачують фіксовану ставку у "
+    "відсотках до прожиткового мінімуму для працездатних осіб встановленого "
+    "законом на перше січня податкового року незалежно від обсягу доходу "
+    "отриманого протягом кварталу а також подають річну декларацію платника "
+    "єдиного податку до контролюючого органу за місцем податкової адреси"
+)
+
+
+def test_near_duplicates_keep_first_of_group():
+    deduplicator = MinHashDeduplicator(threshold=0.8)
+    other = "Податкова накладна складається на дату виникнення податкових зобов'язань"
+    texts = [
+        ARTICLE,
+        other,
+        ARTICLE + " відповідно",
+        ARTICLE,
+        ARTICLE.replace("першої", "другої"),
+    ]
+
+    duplicates = deduplicator.find_duplicates(texts)
+
+    assert duplicates[2] == 0
+    assert duplicates[3] == 0
+    assert 1 not in duplicates
+    assert 0 not in duplicates
+
+
+def test_distinct_texts_are_kept():
+    deduplicator = MinHashDeduplicator()
+    texts = [
+        f"Стаття {number}. " + " ".join(ARTICLE.split()[number:]) for number in range(8)
+    ]
+
+    assert deduplicator.find_duplicates(texts[::4]) == {}
+
+
+def test_num_perm_must_split_into_bands():
+    with pytest.raises(ValueError):
+        MinHashDeduplicator(num_perm=100, bands=32)
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    pdf_path = tmp_path / "code.pdf"
+    pdf_path.write_bytes(b"")
+    return Dataset(str(pdf_path))
+
+
+def _page(number: int, body: str) -> str:
+    return (
+        "Податковий кодекс України\n"
+        f"{body}\n"
+        f'Газета "Все про бухгалтерський облік" {number + 100} gazeta.vobu.ua'
+    )
+
+
+def test_running_headers_and_footers_are_stripped(dataset):
+    words = ARTICLE.split()
+    pages = [
+        _page(
+            number, f"Стаття {number}. {' '.join(words[number * 5 : number * 5 + 5])}"
+        )
+        for number in range(6)
+    ]
+
+    document = dataset._build_document("code.pdf", pages)
+
+    assert "Податковий кодекс України" not in document["text"]
+    assert "gazeta.vobu.ua" not in document["text"]
+    assert "Стаття 3. " + " ".join(words[15:20]) in document["text"]
+    # Номер сторінки читається з колонтитула до його видалення
+    assert document["page_details"][3]["structure"]["page"] == 103
+
+
+def test_single_line_pages_are_not_boilerplate(dataset):
+    pages = ["Зміст"] * 4 + ["Зміст\nСтаття 1"]
+
+    assert dataset._find_boilerplate(pages) == set()
+
+
+def test_chunking_drops_duplicated_document(dataset):
+    document = dataset._build_document("code.pdf", [ARTICLE])
+    copy = dict(document, filename="copy.pdf")
+    plain = Dataset(dataset.pdf_paths, dedup_threshold=None)
+
+    expected = plain.chunk_documents([document], chunk_size=20, overlap=0)
+    chunks = dataset.chunk_documents([document, copy], chunk_size=20, overlap=0)
+
+    assert [chunk["text"] for chunk in chunks] == [chunk["text"] for chunk in expected]
+    assert {chunk["source_file"] for chunk in chunks} == {"code.pdf"}
+    assert dataset.stats["duplicates_removed"] == len(expected)
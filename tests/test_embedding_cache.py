@@ -0,0 +1,63 @@
+import pytest
+from langchain_core.language_models.fake import FakeListLLM
+
+from benchmarks.corpus import HashingEmbeddings
+from model.batch import BatchRunner
+from model.model import TaxCodeAssistant
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self.batches.append([text])
+        return super().embed_query(text)
+
+
+@pytest.fixture
+def assistant(tmp_path):
+    return TaxCodeAssistant(
+        persist_directory=str(tmp_path / "db"),
+        llm=FakeListLLM(responses=["Відповідь"]),
+        embeddings=CountingEmbeddings(),
+        embedding_cache_size=8,
+    )
+
+
+def test_warm_embeddings_batches_and_skips_cached(assistant):
+    assistant.embed_query("ПДВ")
+    assistant.embeddings.batches.clear()
+
+    computed = assistant.warm_embeddings(["ПДВ", "ЄСВ", "ПДФО", "ЄСВ", "ВЗ"], 2)
+
+    assert computed == 3
+    assert assistant.embeddings.batches == [["ЄСВ", "ПДФО"], ["ВЗ"]]
+
+    # Прогріті запити більше не звертаються до моделі
+    assistant.embed_query("ПДФО")
+    assert len(assistant.embeddings.batches) == 2
+
+
+def test_warm_embeddings_respects_cache_size(assistant):
+    questions = [f"Питання {number}" for number in range(20)]
+
+    assistant.warm_embeddings(questions, batch_size=5)
+
+    assistant.embeddings.batches.clear()
+    assistant.embed_query(questions[-1])
+    assistant.embed_query(questions[0])
+    assert assistant.embeddings.batches == [[questions[0]]]
+
+
+def test_batch_runner_primes_through_assistant(assistant):
+    runner = BatchRunner(assistant, concurrency=1, batch_size=4)
+
+    runner.prime_embeddings(["А", "Б", "А"])
+
+    assert assistant.embeddings.batches == [["А", "Б"]]
@@ -0,0 +1,76 @@
+import json
+import socket
+import threading
+
+import numpy as np
+import pytest
+
+from embeddings.service import (
+    _HEADER,
+    EmbeddingServiceClient,
+    _recv_exactly,
+    _send_frame,
+)
+
+VECTOR = np.arange(4, dtype=np.float32)
+
+
+def _serve(path: str, responses: list) -> threading.Thread:
+    """Сервер, що на кожне з'єднання відповідає наступною функцією з responses"""
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen()
+
+    def run():
+        with listener:
+            for respond in responses:
+                connection, _ = listener.accept()
+                with connection:
+                    (length,) = _HEADER.unpack(_recv_exactly(connection, _HEADER.size))
+                    respond(connection, json.loads(_recv_exactly(connection, length)))
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def _full(connection, request):
+    vectors = np.tile(VECTOR, (len(request["texts"]), 1))
+    _send_frame(connection, {"shape": list(vectors.shape)}, vectors.tobytes())
+
+
+def _truncated(connection, request):
+    # Сервіс перезапустився посеред відправки векторів
+    _send_frame(connection, {"shape": [1, 4]}, VECTOR.tobytes()[:6])
+
+
+def _client(path: str) -> EmbeddingServiceClient:
+    return EmbeddingServiceClient(str(path), connect_timeout=5)
+
+
+def test_broken_payload_is_retried_on_new_connection(tmp_path):
+    path = str(tmp_path / "e.sock")
+    server = _serve(path, [_truncated, _full])
+    client = _client(path)
+
+    assert client.embed_query("ПДВ") == VECTOR.tolist()
+    server.join(timeout=5)
+    assert not server.is_alive()
+
+
+def test_repeated_failure_resets_connection(tmp_path):
+    path = str(tmp_path / "e.sock")
+    _serve(path, [_truncated, _truncated])
+    client = _client(path)
+
+    with pytest.raises(ConnectionError):
+        client.embed_query("ПДВ")
+    assert client._local.sock is None
+
+
+def test_service_error_is_raised(tmp_path):
+    path = str(tmp_path / "e.sock")
+    _serve(path, [lambda connection, _: _send_frame(connection, {"error": "OOM"})])
+
+    with pytest.raises(RuntimeError, match="OOM"):
+        _client(path).embed_query("ПДВ")
@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+import data.dataset
+from data.dataset import Dataset
+from data.extraction_cache import ExtractionCache, file_digest
+
+
+class FakePage:
+    def __init__(self, text: str):
+        self.text = text
+
+    def extract_text(self) -> str:
+        return self.text
+
+
+@pytest.fixture
+def reader_calls(monkeypatch):
+    calls = []
+
+    class FakeReader:
+        def __init__(self, file):
+            calls.append(file.name)
+            self.pages = [FakePage(f"Стаття {number}") for number in range(1, 4)]
+
+    monkeypatch.setattr(data.dataset.PyPDF2, "PdfReader", FakeReader)
+    return calls
+
+
+def test_cache_key_follows_content_not_path(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache"))
+    original = tmp_path / "code.pdf"
+    original.write_bytes(b"%PDF-1.4 code")
+    cache.put(file_digest(str(original)), str(original), ["Стаття 1"])
+
+    renamed = tmp_path / "renamed.pdf"
+    os.replace(original, renamed)
+    assert cache.get(file_digest(str(renamed))) == ["Стаття 1"]
+
+    renamed.write_bytes(b"%PDF-1.4 code, amended")
+    assert cache.get(file_digest(str(renamed))) is None
+
+
+def test_extractor_version_is_part_of_the_key(tmp_path):
+    digest = "0" * 64
+    ExtractionCache(str(tmp_path), extractor_version="a").put(digest, "x.pdf", ["1"])
+
+    assert ExtractionCache(str(tmp_path), extractor_version="a").get(digest) == ["1"]
+    assert ExtractionCache(str(tmp_path), extractor_version="b").get(digest) is None
+
+
+def test_broken_entry_is_ignored(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    cache.put("f" * 64, "x.pdf", ["1"])
+    with open(cache._entry_path("f" * 64), "w", encoding="utf-8") as file:
+        file.write("{")
+
+    assert cache.get("f" * 64) is None
+
+
+def test_dataset_extracts_each_pdf_once(tmp_path, reader_calls):
+    pdf_path = tmp_path / "code.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4 code")
+    cache_dir = str(tmp_path / "cache")
+
+    first = Dataset(str(pdf_path), cache_dir=cache_dir).extract_documents()
+    second = Dataset(str(pdf_path), cache_dir=cache_dir).extract_documents()
+
+    assert reader_calls == [str(pdf_path)]
+    assert first[0]["text"] == second[0]["text"]
+    assert "Стаття 2" in second[0]["text"]
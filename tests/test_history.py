@@ -0,0 +1,68 @@
+import logging
+
+from model.history import HistoryCompressor, estimate_tokens
+
+
+def _turns(count: int, size: int):
+    history = []
+    for number in range(count):
+        history.append({"role": "user", "content": f"Питання {number} " + "п" * size})
+        history.append(
+            {"role": "assistant", "content": f"Відповідь {number} " + "в" * size}
+        )
+    return history
+
+
+def test_render_fits_budget_and_keeps_order():
+    compressor = HistoryCompressor(llm=None, budget_tokens=200, summary_tokens=50)
+    text = compressor.render(_turns(10, 60), summary="ФОП 3 групи, доходи 2024")
+
+    assert estimate_tokens(text) <= 200 + text.count("\n")
+    assert text.startswith("Резюме попередньої розмови: ФОП 3 групи")
+    assert text.index("Питання 8") < text.index("Питання 9")
+    assert "Питання 0" not in text
+
+
+def test_last_turn_is_kept_verbatim_before_summary_and_older_turns():
+    compressor = HistoryCompressor(llm=None, budget_tokens=160, summary_tokens=100)
+    history = _turns(3, 150)
+    text = compressor.render(history, summary="р" * 600)
+
+    # Останній хід лишається дослівним, резюме стискається до залишку
+    # бюджету, а на старіші ходи місця вже немає
+    assert text.endswith(f"Асистент: {history[-1]['content']}")
+    assert f"Користувач: {history[-2]['content']}" in text
+    assert text.splitlines()[0].startswith("Резюме попередньої розмови: ррр")
+    assert text.splitlines()[0].endswith("...")
+    assert "Питання 1" not in text
+    assert estimate_tokens(text) <= 160 + text.count("\n")
+
+
+def test_oversized_last_turn_is_truncated_with_warning(caplog):
+    compressor = HistoryCompressor(llm=None, budget_tokens=50, summary_tokens=20)
+    history = _turns(2, 600)
+
+    with caplog.at_level(logging.WARNING, logger="model.history"):
+        text = compressor.render(history, summary="Резюме")
+
+    assert "exceeds history budget" in caplog.text
+    assert text.startswith("Користувач: Питання 1")
+    assert text.endswith("...")
+    assert estimate_tokens(text) <= 50
+
+
+def test_trailing_question_without_answer_counts_as_last_turn():
+    compressor = HistoryCompressor(llm=None, budget_tokens=100)
+    history = _turns(2, 10) + [{"role": "user", "content": "А для ТОВ?"}]
+
+    text = compressor.render(history)
+
+    assert text.splitlines()[-1] == "Користувач: А для ТОВ?"
+    assert "Питання 0" in text
+
+
+def test_render_without_history_or_summary():
+    compressor = HistoryCompressor(llm=None)
+
+    assert compressor.render(None) == ""
+    assert compressor.render([], summary="Резюме").endswith("Резюме")
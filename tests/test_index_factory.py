@@ -0,0 +1,128 @@
+import json
+
+import faiss
+import numpy as np
+import pytest
+
+from benchmarks.corpus import HashingEmbeddings
+from embeddings.embeddings_faiss import EmbeddingsManager, resolve_index_factory
+from embeddings.sharded_store import ShardedVectorStore
+
+# Малий словник: вектори корпусу лежать у підпросторі розмірності не більше
+# за кількість слів, тож PCA до 48 вимірів майже не втрачає інформації
+WORDS = (
+    "податок ставка дохід збір внесок група платник накладна декларація період "
+    "квартал рік пільга звіт ліміт оренда продаж послуга товар акциз мито "
+    "штраф пеня борг кредит рахунок каса виплата зарплата премія лікарняні "
+    "відпустка пенсія стаж договір акт реєстр код номер дата сума"
+).split()
+QUERIES = 40
+K = 10
+
+
+@pytest.fixture(scope="module")
+def corpus(tmp_path_factory):
+    rng = np.random.default_rng(7)
+    items = [
+        {
+            "text": " ".join(rng.choice(WORDS, size=12)),
+            "source_file": "code.pdf",
+            "chunk_index": number,
+        }
+        for number in range(400)
+    ]
+    path = tmp_path_factory.mktemp("data") / "dataset.json"
+    path.write_text(json.dumps(items, ensure_ascii=False), encoding="utf-8")
+    return str(path), [item["text"] for item in items]
+
+
+def _build(directory, dataset: str, **kwargs) -> ShardedVectorStore:
+    EmbeddingsManager(
+        persist_directory=str(directory), embeddings=HashingEmbeddings(), **kwargs
+    ).create_vectorstore(dataset)
+    return ShardedVectorStore(str(directory), HashingEmbeddings()).load()
+
+
+def _top_k(store: ShardedVectorStore, texts) -> list:
+    embeddings = HashingEmbeddings()
+    return [
+        [
+            doc.page_content
+            for doc, _ in store.similarity_search_with_score_by_vector(
+                embeddings.embed_query(text), k=K
+            )
+        ]
+        for text in texts[:QUERIES]
+    ]
+
+
+@pytest.fixture(scope="module")
+def exact(corpus, tmp_path_factory):
+    dataset, texts = corpus
+    return _top_k(_build(tmp_path_factory.mktemp("exact"), dataset), texts)
+
+
+@pytest.mark.parametrize(
+    "index_factory, storage, pca_dim, expected",
+    [
+        (None, "float32", None, None),
+        (None, "float16", None, "SQfp16"),
+        (None, "sq8", None, "SQ8"),
+        (None, "float32", 64, "PCA64,Flat"),
+        (None, "sq8", 64, "PCA64,SQ8"),
+        ("IVF16,Flat", "float32", None, "IVF16,Flat"),
+    ],
+)
+def test_resolve_index_factory(index_factory, storage, pca_dim, expected):
+    assert resolve_index_factory(index_factory, storage, pca_dim) == expected
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"storage": "int4"},
+        {"index_factory": "Flat", "storage": "sq8"},
+        {"index_factory": "Flat", "pca_dim": 64},
+    ],
+)
+def test_invalid_storage_is_rejected(kwargs):
+    with pytest.raises(ValueError):
+        resolve_index_factory(**kwargs)
+
+
+@pytest.mark.parametrize(
+    "storage, pca_dim, index_type, min_recall",
+    [
+        ("float16", None, faiss.IndexScalarQuantizer, 0.95),
+        ("sq8", None, faiss.IndexScalarQuantizer, 0.9),
+        ("float32", 48, faiss.IndexPreTransform, 0.9),
+        ("sq8", 48, faiss.IndexPreTransform, 0.85),
+    ],
+)
+def test_index_round_trip_keeps_type_and_recall(
+    corpus, exact, tmp_path, storage, pca_dim, index_type, min_recall
+):
+    dataset, texts = corpus
+    store = _build(tmp_path / "db", dataset, storage=storage, pca_dim=pca_dim)
+
+    index = faiss.downcast_index(store._shards["default"].index)
+    assert isinstance(index, index_type)
+    assert index.ntotal == len(texts)
+    if pca_dim:
+        assert faiss.downcast_VectorTransform(index.chain.at(0)).d_out == pca_dim
+
+    # Частина розбіжностей з точним пошуком - рівні відстані на межі top-k
+    approximate = _top_k(store, texts)
+    recall = np.mean([len(set(a) & set(e)) / K for a, e in zip(approximate, exact)])
+    assert recall >= min_recall
+    # Запит текстом документа знаходить сам документ
+    assert [top[0] for top in approximate] == texts[:QUERIES]
+
+
+def test_pca_needs_enough_vectors(tmp_path):
+    manager = EmbeddingsManager(
+        persist_directory=str(tmp_path), embeddings=HashingEmbeddings(), pca_dim=64
+    )
+
+    with pytest.raises(ValueError):
+        manager.build_index(np.ones((10, 384), dtype=np.float32))
@@ -0,0 +1,108 @@
+import json
+
+import pytest
+
+from benchmarks.corpus import HashingEmbeddings
+from embeddings.embeddings_faiss import EmbeddingsManager
+from embeddings.metadata_filter import MetadataTable, validate_filters
+from embeddings.sharded_store import ShardedVectorStore
+
+TEXT = "податок на додану вартість реєстрація платника податкова накладна"
+
+
+def _chunk(number: int, source_file: str, page: int, articles: list) -> dict:
+    return {
+        "text": f"{TEXT} фрагмент{number}",
+        "source_file": source_file,
+        "structure": {"page": page, "articles": articles, "points": []},
+    }
+
+
+CHUNKS = [
+    _chunk(0, "code.pdf", 10, ["Стаття 160"]),
+    _chunk(1, "code.pdf", 20, ["Стаття 165", "Стаття 170"]),
+    _chunk(2, "code.pdf", 30, []),
+    _chunk(3, "letter.pdf", 1, ["Стаття 180"]),
+]
+
+
+@pytest.fixture
+def table():
+    return MetadataTable.from_dataset(CHUNKS)
+
+
+@pytest.mark.parametrize(
+    "filters, expected",
+    [
+        ({"source_file": "letter.pdf"}, [3]),
+        ({"source_file": {"in": ["code.pdf"]}, "page": {"gte": 20}}, [1, 2]),
+        ({"article": {"between": [161, 175]}}, [1]),
+        ({"article": {"in": [160, 180]}}, [0, 3]),
+        ({"article": {"lte": 165}}, [0, 1]),
+        ({"page": {"between": [5, 25]}, "article": 170}, [1]),
+        ({"article": {"in": []}}, []),
+    ],
+)
+def test_select(table, filters, expected):
+    assert table.select(filters).tolist() == expected
+
+
+def test_points_imply_article():
+    table = MetadataTable.from_columns(
+        source_file=["code.pdf"], page=[1], articles=[[]], points=[["167.1.2"]]
+    )
+
+    assert table.select({"article": 167}).tolist() == [0]
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        {"document_date": "2024-01-01"},
+        {"article": {"in": 160}},
+        {"source_file": {"in": "code.pdf"}},
+        {"article": {"between": [160]}},
+        {"article": "160"},
+        {"page": {"gte": 1.5}},
+        {"article": {"in": [160, "170"]}},
+        {"page": True},
+        {"page": {"like": 1}},
+    ],
+)
+def test_invalid_filters_are_rejected(filters):
+    with pytest.raises(ValueError):
+        validate_filters(filters)
+
+
+def test_iterables_are_normalized_to_lists():
+    assert validate_filters({"article": {"in": (160, 170)}, "page": 3}) == {
+        "article": {"in": [160, 170]},
+        "page": {"eq": 3},
+    }
+
+
+def test_filtered_search_only_returns_matching_chunks(tmp_path):
+    dataset = tmp_path / "dataset.json"
+    dataset.write_text(json.dumps(CHUNKS, ensure_ascii=False), encoding="utf-8")
+    EmbeddingsManager(
+        persist_directory=str(tmp_path / "db"), embeddings=HashingEmbeddings()
+    ).create_vectorstore(str(dataset))
+    store = ShardedVectorStore(str(tmp_path / "db"), HashingEmbeddings()).load()
+    embedding = HashingEmbeddings().embed_query(f"{TEXT} фрагмент0")
+
+    unfiltered = store.similarity_search_with_score_by_vector(embedding, k=1)
+    filtered = store.similarity_search_with_score_by_vector(
+        embedding, k=4, filters={"article": {"gte": 165}}
+    )
+
+    assert unfiltered[0][0].page_content == CHUNKS[0]["text"]
+    assert sorted(doc.page_content for doc, _ in filtered) == [
+        CHUNKS[1]["text"],
+        CHUNKS[3]["text"],
+    ]
+    assert (
+        store.similarity_search_with_score_by_vector(
+            embedding, k=4, filters={"source_file": "missing.pdf"}
+        )
+        == []
+    )
@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = """
+from model.metrics import SCHEDULER_QUEUED, SCHEDULER_REJECTED
+SCHEDULER_REJECTED.inc(2)
+SCHEDULER_QUEUED.inc(3)
+"""
+
+SCRAPE = """
+import sys
+from model.metrics import latest_metrics
+sys.stdout.write(latest_metrics().decode())
+"""
+
+
+def _run(code: str, multiproc_dir: str) -> str:
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=multiproc_dir, PYTHONPATH=ROOT)
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        env=env,
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+
+def test_metrics_are_aggregated_across_workers(tmp_path):
+    _run(WORKER, str(tmp_path))
+    _run(
+        WORKER + "from model.metrics import mark_worker_dead\nmark_worker_dead()\n",
+        str(tmp_path),
+    )
+
+    text = _run(SCRAPE, str(tmp_path))
+
+    assert "rag_scheduler_rejected_total 4.0" in text
+    # Gauge завершеного воркера прибрано, лічильники зберігаються
+    assert "rag_scheduler_queued_requests 3.0" in text
@@ -0,0 +1,106 @@
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("transformers")
+
+from embeddings.onnx_embeddings import OnnxEmbeddings  # noqa: E402
+
+MODEL = os.getenv(
+    "ONNX_TEST_MODEL", "sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
+)
+TEXTS = [
+    "Яка ставка податку на доходи фізичних осіб?",
+    "ПДВ",
+    "Єдиний соціальний внесок нараховується на заробітну плату працівників.",
+    "Ліміт доходу для третьої групи єдиного податку",
+    "Коли подається декларація про майновий стан і доходи?",
+]
+
+
+class FakeTokenizer:
+    def __call__(self, texts, **kwargs):
+        length = max(len(text.split()) for text in texts)
+        mask = np.array(
+            [[1] * len(t.split()) + [0] * (length - len(t.split())) for t in texts]
+        )
+        return {"input_ids": mask * 7, "attention_mask": mask}
+
+
+class FakeSession:
+    def run(self, outputs, feed):
+        # Прихований стан токена - його позиція; доповнення - великі числа,
+        # які пулінг має відкинути за маскою
+        mask = feed["attention_mask"]
+        positions = np.broadcast_to(np.arange(mask.shape[1]), mask.shape)
+        hidden = np.where(mask, positions, 1000).astype(np.float32)
+        return [np.stack([hidden, -hidden], axis=-1)]
+
+
+def _fake_embeddings(batch_size: int = 2) -> OnnxEmbeddings:
+    embeddings = OnnxEmbeddings.__new__(OnnxEmbeddings)
+    embeddings.tokenizer = FakeTokenizer()
+    embeddings.session = FakeSession()
+    embeddings.input_names = ["input_ids", "attention_mask"]
+    embeddings.batch_size = batch_size
+    embeddings.max_length = 128
+    return embeddings
+
+
+def test_mean_pooling_ignores_padding():
+    vector = _fake_embeddings().embed_query("один два три чотири")
+
+    assert vector == [1.5, -1.5]
+
+
+def test_documents_keep_input_order_after_length_batching():
+    embeddings = _fake_embeddings(batch_size=2)
+
+    vectors = embeddings.embed_documents(TEXTS)
+
+    assert vectors == [embeddings.embed_query(text) for text in TEXTS]
+    assert embeddings.embed_documents([]) == []
+
+
+def _cached(model_name: str) -> bool:
+    from huggingface_hub import try_to_load_from_cache
+
+    return isinstance(try_to_load_from_cache(model_name, "config.json"), str)
+
+
+@pytest.fixture(scope="module")
+def reference():
+    sentence_transformers = pytest.importorskip("sentence_transformers")
+    pytest.importorskip("torch")
+    if not _cached(MODEL):
+        pytest.skip(f"{MODEL} is not in the local Hugging Face cache")
+
+    model = sentence_transformers.SentenceTransformer(MODEL, device="cpu")
+    return np.asarray(model.encode(TEXTS), dtype=np.float32)
+
+
+def _cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+@pytest.mark.parametrize("quantize, min_cosine", [(False, 0.999), (True, 0.97)])
+def test_onnx_matches_sentence_transformers(
+    reference, tmp_path_factory, quantize, min_cosine
+):
+    embeddings = OnnxEmbeddings(
+        MODEL, cache_dir=str(tmp_path_factory.mktemp("onnx")), quantize=quantize
+    )
+
+    vectors = np.asarray(embeddings.embed_documents(TEXTS), dtype=np.float32)
+
+    assert vectors.shape == reference.shape
+    assert _cosine(vectors, reference).min() >= min_cosine
+    # Найближчий документ до кожного тексту той самий, що й у еталонної моделі
+    assert (
+        np.argsort(-(vectors @ vectors.T), axis=1)[:, 1]
+        == np.argsort(-(reference @ reference.T), axis=1)[:, 1]
+    ).all()
@@ -0,0 +1,144 @@
+import asyncio
+import os
+import sys
+from datetime import timedelta
+
+import pytest
+
+pytest.importorskip("django")
+
+import django  # noqa: E402
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "frontend"))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "chat_project.settings")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection, connections  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from chat.models import Chat, Message  # noqa: E402
+from chat.pagination import (  # noqa: E402
+    MAX_PAGE_SIZE,
+    InvalidCursor,
+    decode_cursor,
+    encode_cursor,
+    keyset_page,
+    parse_limit,
+)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def database(tmp_path_factory):
+    # Тести не торкаються db.sqlite3 розробника
+    connections.close_all()
+    settings.DATABASES["default"]["NAME"] = str(
+        tmp_path_factory.mktemp("db") / "pagination.sqlite3"
+    )
+    call_command("migrate", verbosity=0)
+
+
+@pytest.fixture
+def chat():
+    user, _ = User.objects.get_or_create(username="pages")
+    chat = Chat.objects.create(user=user, title="test")
+    # Половина повідомлень з однаковою міткою часу: курсор розрізняє їх за id
+    moment = timezone.now()
+    for number in range(7):
+        message = Message.objects.create(chat=chat, content=f"Повідомлення {number}")
+        Message.objects.filter(id=message.id).update(
+            timestamp=moment + timedelta(seconds=number // 2)
+        )
+    return chat
+
+
+def _walk(chat, limit: int) -> list:
+    pages, cursor = [], None
+    while True:
+        rows, cursor = asyncio.run(
+            keyset_page(
+                Message.objects.filter(chat=chat), "timestamp", cursor, limit=limit
+            )
+        )
+        pages.append([row.content for row in rows])
+        if cursor is None:
+            return pages
+
+
+def test_cursor_round_trip():
+    moment = timezone.now()
+
+    assert decode_cursor(encode_cursor(moment, 42)) == (moment, 42)
+
+
+@pytest.mark.parametrize(
+    "cursor", ["", "not base64!", encode_cursor(timezone.now(), 1)[:-4]]
+)
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (None, 50),
+        ("", 50),
+        ("abc", 50),
+        ("0", 1),
+        ("20", 20),
+        ("100000", MAX_PAGE_SIZE),
+    ],
+)
+def test_parse_limit(value, expected):
+    assert parse_limit(value) == expected
+
+
+def test_pages_cover_history_without_gaps_or_duplicates(chat):
+    pages = _walk(chat, limit=3)
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [content for page in pages for content in page] == [
+        f"Повідомлення {number}" for number in range(6, -1, -1)
+    ]
+
+
+def test_messages_api_returns_chronological_pages(chat):
+    client = Client()
+    client.force_login(chat.user)
+    url = f"/chat/api/chats/{chat.id}/messages/"
+
+    first = client.get(url, {"limit": 4}, HTTP_HOST="localhost").json()
+    second = client.get(
+        url, {"limit": 4, "before": first["next_cursor"]}, HTTP_HOST="localhost"
+    ).json()
+    broken = client.get(url, {"before": "???"}, HTTP_HOST="localhost")
+
+    assert [m["content"][-1] for m in first["results"]] == ["3", "4", "5", "6"]
+    assert [m["content"][-1] for m in second["results"]] == ["0", "1", "2"]
+    assert second["next_cursor"] is None
+    assert broken.status_code == 400
+
+
+def test_migrations_match_models_and_create_keyset_indexes():
+    # Зміни моделей без міграції завершують makemigrations --check з кодом 1
+    call_command("makemigrations", "chat", "--check", "--dry-run", verbosity=0)
+
+    with connection.cursor() as cursor:
+        indexes = {
+            table: connection.introspection.get_constraints(cursor, table)
+            for table in (Chat._meta.db_table, Message._meta.db_table)
+        }
+    assert indexes[Chat._meta.db_table]["chat_user_created_idx"]["columns"] == [
+        "user_id",
+        "created_at",
+        "id",
+    ]
+    assert indexes[Message._meta.db_table]["message_chat_timestamp_idx"]["columns"] == [
+        "chat_id",
+        "timestamp",
+        "id",
+    ]
@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+from benchmarks.corpus import HashingEmbeddings
+from embeddings.embeddings_faiss import EmbeddingsManager
+from embeddings.parent_store import ParentStore
+from embeddings.sharded_store import ShardedVectorStore
+
+TOPICS = {
+    "пдв": "податок на додану вартість реєстрація платника ПДВ податкова накладна",
+    "єсв": "єдиний соціальний внесок роботодавця нарахування на заробітну плату",
+    "фоп": "спрощена система оподаткування фізичних осіб підприємців групи ліміти",
+}
+
+
+def _article(number: int, topic: str) -> dict:
+    words = [f"{word}{number}" for word in TOPICS[topic].split()]
+    return {
+        "text": " ".join(words * 3),
+        "source_file": "code.pdf",
+        "chunk_index": number,
+    }
+
+
+def _write(path, items) -> str:
+    path.write_text(json.dumps(items, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def store_dir(tmp_path):
+    items = [_article(number, topic) for number, topic in enumerate(TOPICS)]
+    manager = EmbeddingsManager(
+        persist_directory=str(tmp_path / "db"),
+        embeddings=HashingEmbeddings(),
+        child_chunk_size=6,
+        child_overlap=2,
+    )
+    manager.create_vectorstore(_write(tmp_path / "dataset.json", items))
+    return tmp_path / "db"
+
+
+def _store(directory) -> ShardedVectorStore:
+    return ShardedVectorStore(str(directory), HashingEmbeddings()).load()
+
+
+def test_children_are_indexed_and_parents_stored(store_dir):
+    parents = ParentStore.load(str(store_dir))
+    store = _store(store_dir)
+
+    assert len(parents) == 3
+    assert store.has_parents
+    assert store._shards["default"].index.ntotal > len(parents)
+
+
+def test_search_returns_unique_parents_in_best_child_order(store_dir):
+    store = _store(store_dir)
+    query = " ".join(f"{word}1" for word in TOPICS["єсв"].split()[:4])
+
+    results = store.search_parents(HashingEmbeddings().embed_query(query), k=2)
+
+    assert len(results) == 2
+    assert results[0][0].page_content == _article(1, "єсв")["text"]
+    assert results[0][0].metadata["parent_id"] == "1"
+    assert len({doc.metadata["parent_id"] for doc, _ in results}) == 2
+
+
+def test_search_respects_character_budget(store_dir):
+    store = _store(store_dir)
+    embedding = HashingEmbeddings().embed_query(TOPICS["пдв"])
+    parent_chars = len(_article(0, "пдв")["text"])
+
+    results = store.search_parents(embedding, k=3, max_chars=parent_chars + 10)
+
+    # Перший батько повертається завжди, наступні - лише в межах бюджету
+    assert len(results) == 1
+
+
+def test_added_documents_get_new_parent_ids(store_dir, tmp_path):
+    manager = EmbeddingsManager(
+        persist_directory=str(store_dir),
+        embeddings=HashingEmbeddings(),
+        child_chunk_size=6,
+        child_overlap=2,
+    )
+    manager.add_to_vectorstore(_write(tmp_path / "new.json", [_article(7, "фоп")]))
+
+    store = _store(store_dir)
+    query = " ".join(f"{word}7" for word in TOPICS["фоп"].split()[:4])
+    doc, _ = store.search_parents(HashingEmbeddings().embed_query(query), k=1)[0]
+
+    assert doc.metadata["parent_id"] == "3"
+    assert doc.page_content == _article(7, "фоп")["text"]
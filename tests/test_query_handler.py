@@ -0,0 +1,107 @@
+import pytest
+
+from model.query_handler import (
+    DEFAULT_INTENT_EXAMPLES,
+    IntentClassifier,
+    KeywordMatcher,
+    QueryAnalyzer,
+    QueryType,
+    fold_vowels,
+    stem_word,
+)
+
+
+@pytest.mark.parametrize(
+    "forms",
+    [
+        ("податок", "податку", "податки"),
+        ("підприємець", "підприємця"),
+        ("звітність", "звітності"),
+        ("ліміт", "ліміту", "ліміти"),
+        ("пільга", "пільги", "пільгою"),
+        ("декларація", "декларації", "декларацію"),
+    ],
+)
+def test_stem_word_merges_inflected_forms(forms):
+    assert len({stem_word(form) for form in forms}) == 1
+
+
+def test_fold_vowels_only_touches_last_syllable():
+    assert fold_vowels("збір") == "збор"
+    assert fold_vowels("ліміт") == "лімот"
+    # Відкритий останній склад та "і" у попередніх складах не змінюються
+    assert fold_vowels("ціна") == "ціна"
+    assert fold_vowels("інвест") == "інвест"
+    assert stem_word("ліки") != stem_word("локи")
+
+
+@pytest.fixture
+def matcher():
+    return KeywordMatcher(
+        {
+            "tax": {
+                "тов": 0.9,
+                "збір": 0.8,
+                "рента": 0.8,
+                "рядок": 0.5,
+                "податок": 0.8,
+                "єдиний податок": 0.9,
+                "пдв рахунок": 0.7,
+            }
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "text, keyword",
+    [
+        ("Як зареєструвати ТОВ?", "тов"),
+        ("Статут ТОВу", "тов"),
+        ("Військовий збір з зарплати", "збір"),
+        ("Ставка збору", "збір"),
+        ("Сплата ренти за надра", "рента"),
+        ("Що писати у рядку 5?", "рядок"),
+        ("Податки на дивіденди", "податок"),
+        ("Ставка єдиного податку", "єдиний податок"),
+        ("Поповнення пдв рахунку", "пдв рахунок"),
+    ],
+)
+def test_matcher_finds_inflected_keywords(matcher, text, keyword):
+    assert keyword in matcher.match(text).get("tax", {})
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Які товари найпопулярніші?",
+        "Рентабельність кав'ярні",
+        "Пдвшний рахунок",
+    ],
+)
+def test_short_stems_require_word_boundary(matcher, text):
+    assert matcher.match(text) == {}
+
+
+def test_irrelevant_examples_are_off_domain():
+    # Податкова лексика в нерелевантних прикладах тягне центроїд до
+    # справжніх податкових питань
+    matcher = QueryAnalyzer()._compiled[2]
+    for text in DEFAULT_INTENT_EXAMPLES[QueryType.IRRELEVANT]:
+        assert "tax" not in matcher.match(text.lower()), text
+
+
+def test_intent_classifier_picks_nearest_centroid():
+    vectors = {"привіт": [1, 0, 0], "податок": [0, 1, 0], "борщ": [0, 0, 1]}
+    classifier = IntentClassifier(
+        lambda texts: [vectors[text] for text in texts],
+        examples={
+            QueryType.GREETING: ["привіт"],
+            QueryType.TAX_QUERY: ["податок"],
+            QueryType.IRRELEVANT: ["борщ"],
+        },
+    )
+
+    result = classifier.classify([0.1, 0.9, 0.2])
+
+    assert result.query_type == QueryType.TAX_QUERY
+    assert result.confidence > 0.9
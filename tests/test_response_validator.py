@@ -0,0 +1,87 @@
+import re
+
+import pytest
+
+from model.response_validator import (
+    GenerationAborted,
+    StreamingResponseValidator,
+    StreamingValidationHandler,
+)
+
+
+def _feed(text: str, chunk_size: int = 7, **kwargs) -> StreamingResponseValidator:
+    validator = StreamingResponseValidator(**kwargs)
+    for start in range(0, len(text), chunk_size):
+        if validator.feed(text[start : start + chunk_size]):
+            break
+    return validator
+
+
+def test_ukrainian_answer_passes():
+    text = (
+        "Платники єдиного податку першої групи сплачують фіксовану суму "
+        "щомісяця. Ставка залежить від прожиткового мінімуму. " * 5
+    )
+    assert _feed(text).reason is None
+
+
+def test_english_answer_is_aborted():
+    text = "The single tax for the first group is paid monthly. " * 3
+    assert _feed(text).reason == "latin_text"
+
+
+def test_latin_terms_between_ukrainian_words_are_allowed():
+    text = "Подайте звіт через Електронний кабінет (e-cabinet, API, XML, PDF). " * 6
+    assert _feed(text).reason is None
+
+
+def test_law_url_is_allowed():
+    text = (
+        "Див. Податковий кодекс: https://zakon.rada.gov.ua/laws/show/2755-17#Text "
+        "та роз'яснення https://tax.gov.ua/baneryi/podatkovi-konsultatsiyi/. "
+    )
+    validator = _feed(text)
+
+    assert validator.reason is None
+    assert not re.search(r"[A-Za-z\s]{30,}", text)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "VAT" + " " * 40 + "ПДВ",
+        "Звіт (Tax Code, VAT, ESV, e-cabinet) подається щокварталу. " * 4,
+        "Звіт подається через Electronic cabinet of the taxpayer online. ",
+    ],
+)
+def test_latin_run_matches_validate_response(text):
+    # Пробіли подовжують фрагмент, як \s у [A-Za-z\s]{30,}
+    expected = "latin_text" if re.search(r"[A-Za-z\s]{30,}", text) else None
+    assert _feed(text, max_digit_ratio=1.0).reason == expected
+
+
+def test_leading_table_does_not_trigger_no_ukrainian():
+    table = "| 1 | 302,80 | 3633,60 |\n" * 12 + "2024: 18%, 1,5%\n" * 4
+    text = table + "Сума податку за рік становить 3633,60 грн. " * 3
+    validator = _feed(text, max_digit_ratio=0.9)
+
+    assert len(table) > validator.min_chars_for_ratio_checks
+    assert validator.reason is None
+
+
+def test_text_without_ukrainian_is_aborted():
+    validator = _feed("abc 12, " * 60, max_latin_run=1000)
+    assert validator.reason == "no_ukrainian"
+
+
+def test_repeated_words_are_aborted():
+    assert _feed("податок " * 10).reason == "consecutive_repeats"
+
+
+def test_handler_raises_on_violation():
+    handler = StreamingValidationHandler(StreamingResponseValidator(max_latin_run=5))
+
+    with pytest.raises(GenerationAborted) as error:
+        handler.on_llm_new_token("Hello world")
+
+    assert error.value.reason == "latin_text"
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+
+import pytest
+
+from backend import main
+from backend.main import Query, SummaryRequest, _scheduler_key
+from backend.scheduler import FairScheduler, QueueFullError
+
+
+async def _wait_until(condition, timeout: float = 5.0) -> None:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        if loop.time() > deadline:
+            raise TimeoutError("condition not reached")
+        await asyncio.sleep(0.01)
+
+
+def test_light_user_is_not_stuck_behind_heavy_backlog():
+    order = []
+
+    async def scenario():
+        scheduler = FairScheduler(max_concurrency=1)
+        heavy = [
+            asyncio.create_task(scheduler.submit("heavy", order.append, "heavy"))
+            for _ in range(5)
+        ]
+        await asyncio.sleep(0)
+        light = asyncio.create_task(scheduler.submit("light", order.append, "light"))
+        await asyncio.gather(*heavy, light)
+
+    asyncio.run(scenario())
+
+    # У FIFO легкий користувач був би шостим
+    assert order == ["heavy", "heavy", "light", "heavy", "heavy", "heavy"]
+
+
+def test_queue_limit_raises_queue_full():
+    release = threading.Event()
+
+    async def scenario():
+        scheduler = FairScheduler(max_concurrency=1, max_queued_per_user=2)
+        tasks = [
+            asyncio.create_task(scheduler.submit("user", release.wait))
+            for _ in range(3)
+        ]
+        await _wait_until(lambda: scheduler.running == 1)
+        assert scheduler.queued == 2
+
+        with pytest.raises(QueueFullError):
+            await scheduler.submit("user", release.wait)
+        # Ліміт рахується на користувача, інші проходять у чергу
+        other = asyncio.create_task(scheduler.submit("other", release.wait))
+        await _wait_until(lambda: scheduler.queued == 3)
+
+        release.set()
+        await asyncio.gather(*tasks, other)
+        assert scheduler.queued == 0
+        assert scheduler.running == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_requests_release_their_slots():
+    release = threading.Event()
+    calls = []
+
+    async def scenario():
+        scheduler = FairScheduler(max_concurrency=1)
+        running = asyncio.create_task(scheduler.submit("a", release.wait))
+        await _wait_until(lambda: scheduler.running == 1)
+        queued = asyncio.create_task(scheduler.submit("b", calls.append, "b"))
+        await asyncio.sleep(0)
+
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+
+        release.set()
+        await running
+        assert calls == []
+        assert scheduler.running == 0
+        assert scheduler.queued == 0
+
+        # Скасований запит не тримає слот: наступний виконується одразу
+        assert await scheduler.submit("b", lambda: "done") == "done"
+
+    asyncio.run(scenario())
+
+
+def test_anonymous_requests_share_a_lane():
+    assert _scheduler_key(Query(text="Привіт")) == "anonymous"
+    assert _scheduler_key(Query(text="Як сплатити ЄСВ?")) == "anonymous"
+    assert _scheduler_key(Query(text="Привіт", user_id=7, chat_id=3)) == "user:7"
+    assert _scheduler_key(Query(text="Привіт", chat_id=3)) == "chat:3"
+
+
+def test_summary_runs_outside_the_user_lane(monkeypatch):
+    scheduler = FairScheduler(max_concurrency=2)
+    release = threading.Event()
+
+    class Assistant:
+        def summarize_history(self, summary, turns):
+            return "Резюме"
+
+    monkeypatch.setattr(main, "scheduler", scheduler)
+    monkeypatch.setattr(main, "get_assistant", lambda: Assistant())
+
+    async def scenario():
+        # Відповідь користувачу займає його смугу
+        answer = asyncio.create_task(scheduler.submit("user:7", release.wait))
+        await _wait_until(lambda: scheduler.running == 1)
+
+        request = SummaryRequest(summary="", user_id=7, chat_id=3)
+        try:
+            response = await asyncio.wait_for(main.summarize_history(request), 5)
+        finally:
+            release.set()
+            await answer
+        assert response == {"summary": "Резюме"}
+
+    asyncio.run(scenario())
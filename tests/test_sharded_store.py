@@ -0,0 +1,80 @@
+import json
+
+import pytest
+from langchain_core.language_models.fake import FakeListLLM
+
+from benchmarks.corpus import HashingEmbeddings
+from embeddings.embeddings_faiss import EmbeddingsManager
+from embeddings.sharded_store import ShardedVectorStore
+from model.model import TaxCodeAssistant
+
+TEXT = "податкова соціальна пільга застосовується до заробітної плати"
+
+SHARDS = {
+    "tax_code": {"family": "tax_code", "year": 2024},
+    "labour_code": {"family": "labour_code", "year": 2024},
+    "letters": {"family": "letters", "year": 2023},
+}
+
+
+@pytest.fixture
+def root(tmp_path):
+    for name, metadata in SHARDS.items():
+        dataset = tmp_path / f"{name}.json"
+        items = [{"text": f"{TEXT} {name}", "source_file": f"{name}.pdf"}]
+        dataset.write_text(json.dumps(items, ensure_ascii=False), encoding="utf-8")
+        EmbeddingsManager(
+            persist_directory=str(tmp_path / "db" / name),
+            embeddings=HashingEmbeddings(),
+            shard_metadata=metadata,
+        ).create_vectorstore(str(dataset))
+    return tmp_path / "db"
+
+
+def _sources(results) -> set:
+    return {doc.metadata["shard"] for doc, _ in results}
+
+
+@pytest.mark.parametrize(
+    "shard_filter, expected",
+    [
+        (None, {"tax_code", "labour_code", "letters"}),
+        ({"family": "tax_code"}, {"tax_code"}),
+        ({"family": ["tax_code", "letters"]}, {"tax_code", "letters"}),
+        ({"year": 2024}, {"tax_code", "labour_code"}),
+        ({"family": "letters", "year": 2024}, set()),
+    ],
+)
+def test_shard_filter_selects_shards(root, shard_filter, expected):
+    store = ShardedVectorStore(str(root), HashingEmbeddings()).load()
+    embedding = HashingEmbeddings().embed_query(TEXT)
+
+    results = store.similarity_search_with_score_by_vector(
+        embedding, k=5, shard_filter=shard_filter
+    )
+
+    assert _sources(results) == expected
+
+
+def test_shard_filter_reaches_retrieval(root, monkeypatch):
+    assistant = TaxCodeAssistant(
+        persist_directory=str(root),
+        llm=FakeListLLM(responses=["Пільга застосовується до зарплати."]),
+        embeddings=HashingEmbeddings(),
+    )
+    contexts = []
+    get_context = assistant.get_context
+
+    def spy(*args, **kwargs):
+        contexts.append(get_context(*args, **kwargs))
+        return contexts[-1]
+
+    monkeypatch.setattr(assistant, "get_context", spy)
+
+    assistant.process_query(
+        "Коли застосовується податкова соціальна пільга?",
+        shard_filter={"family": "labour_code"},
+    )
+
+    assert contexts
+    assert {doc["metadata"]["shard"] for doc in contexts[0]} == {"labour_code"}
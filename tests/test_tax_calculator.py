@@ -0,0 +1,163 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from model.query_handler import QueryHandler, QueryType
+from model import tax_calculator
+from model.tax_calculator import TaxCalculator, TaxTables
+
+
+@pytest.fixture(scope="module")
+def calculator():
+    return TaxCalculator(TaxTables.load())
+
+
+def _amounts(calculation):
+    return {line.label: line.amount for line in calculation.lines}
+
+
+def test_salary_2025(calculator):
+    amounts = _amounts(calculator.salary(Decimal("20000"), on=date(2025, 6, 1)))
+
+    assert amounts["ПДФО (ст. 167 ПКУ)"] == Decimal("3600.00")
+    assert amounts["Військовий збір (п. 16-1 підр. 10 розд. XX ПКУ)"] == Decimal(
+        "1000.00"
+    )
+    assert amounts["До виплати працівнику"] == Decimal("15400.00")
+    assert amounts["ЄСВ, сплачує роботодавець понад зарплату"] == Decimal("4400.00")
+
+
+def test_salary_uses_rates_of_the_period(calculator):
+    amounts = _amounts(calculator.salary(Decimal("20000"), on=date(2024, 6, 1)))
+
+    # До грудня 2024 військовий збір 1,5%
+    assert amounts["Військовий збір (п. 16-1 підр. 10 розд. XX ПКУ)"] == Decimal(
+        "300.00"
+    )
+
+
+def test_salary_esv_base_is_capped(calculator):
+    calculation = calculator.salary(Decimal("200000"), on=date(2025, 6, 1))
+
+    # 20 мінімальних зарплат по 8000 грн
+    assert _amounts(calculation)["ЄСВ, сплачує роботодавець понад зарплату"] == (
+        Decimal("35200.00")
+    )
+    assert any("База ЄСВ обмежена" in note for note in calculation.notes)
+
+
+def test_fop_first_group_over_limit(calculator):
+    calculation = calculator.fop("1", Decimal("2000000"), on=date(2025, 6, 1))
+    amounts = _amounts(calculation)
+
+    assert amounts["Єдиний податок (ст. 293 ПКУ)"] == Decimal("3633.60")
+    assert amounts["Військовий збір"] == Decimal("9600.00")
+    assert amounts["Мінімальний ЄСВ за себе"] == Decimal("21120.00")
+    assert amounts["Разом до сплати"] == Decimal("34353.60")
+    assert "перевищує річний ліміт" in calculation.notes[0]
+
+
+def test_fop_third_group_with_vat(calculator):
+    calculation = calculator.fop("3", Decimal("1000000"), on=date(2025, 6, 1), vat=True)
+    amounts = _amounts(calculation)
+
+    assert amounts["Єдиний податок (ст. 293 ПКУ)"] == Decimal("30000.00")
+    assert amounts["Військовий збір"] == Decimal("10000.00")
+
+
+def test_provisional_table_falls_back_to_verified_rates(calculator):
+    calculation = calculator.salary(Decimal("20000"), on=date(2026, 3, 1))
+
+    assert calculation.table.version == "2025-01"
+    assert "ще не звірені" in calculation.notes[0]
+    assert "01.01.2026" in calculation.notes[0]
+
+
+def test_no_verified_rates_raises():
+    tables = TaxTables([TaxTables.load().tables[-1]])
+
+    with pytest.raises(ValueError, match="No verified tax rates"):
+        tables.for_date(date(2026, 3, 1))
+
+
+@pytest.mark.parametrize(
+    "query, kind, amount, group, months",
+    [
+        ("Скільки податків з зарплати 20 000 грн?", "salary", "20000", None, 1),
+        ("зп 25000 грн, скільки на руки?", "salary", "25000", None, 1),
+        ("Яка сума ПДФО з з/п 30 тис.?", "salary", "30000", None, 1),
+        ("ФОП 1 групи з доходом 2 млн грн", "fop", "2000000", "1", 12),
+        ("Податки ФОП 3 групи за квартал 500 000 грн", "fop", "500000", "3", 3),
+    ],
+)
+def test_extract(query, kind, amount, group, months):
+    request = TaxCalculator.extract(query)
+
+    assert request.kind == kind
+    assert request.amount == Decimal(amount)
+    assert request.group == group
+    assert request.months == months
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        # "зп" всередині слова не означає зарплату
+        "Пальне на АЗС та АЗП за 20000 грн",
+        "Що таке єдиний податок?",
+        "ФОП з доходом 2 млн грн",
+        "Зарплата 20000 або 30000 грн?",
+        # Податки не з зарплати: інші ставки і без ЄСВ
+        "Скільки ПДФО та військового збору з продажу квартири за 2 000 000 грн?",
+        "Податки з дивідендів 100 000 грн",
+        "ПДФО з оренди 20000 грн на місяць",
+        "Який податок з доходу 50000 грн?",
+        "Військовий збір зі спадщини 300 тис. грн",
+        "Зарплата 20000 грн і дивіденди, скільки податків?",
+    ],
+)
+def test_extract_rejects_incomplete_questions(query):
+    assert TaxCalculator.extract(query) is None
+
+
+def test_calculate_past_year_uses_year_end_rates(calculator):
+    request = TaxCalculator.extract("ФОП 1 групи, дохід 2 млн грн у 2025 році")
+    calculation = calculator.calculate(request)
+
+    assert calculation.table.version == "2025-01"
+    assert "Розраховано за ставками на 31.12.2025." in calculation.notes
+    assert _amounts(calculation)["Разом до сплати"] == Decimal("34353.60")
+
+
+class Today2026(date):
+    @classmethod
+    def today(cls):
+        return cls(2026, 5, 15)
+
+
+def test_current_year_question_is_calculated_in_2026(calculator, monkeypatch):
+    monkeypatch.setattr(tax_calculator, "date", Today2026)
+    handler = QueryHandler(calculator=calculator)
+
+    analysis = handler.route("Скільки податків з зарплати 20000 грн?")
+
+    assert analysis.query_type == QueryType.CALCULATION
+    calculation = analysis.details["calculation"]
+    assert calculation.table.version == "2025-01"
+    assert "15.05.2026" in calculation.notes[0]
+    assert "ще не звірені" in handler.instant_response(analysis)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "Скільки ПДФО та військового збору з продажу квартири за 2 000 000 грн?",
+        "Податки з дивідендів 100 000 грн у 2025 році",
+        "Скільки ЄСВ з оренди 20000 грн?",
+    ],
+)
+def test_other_income_goes_to_llm(calculator, query):
+    handler = QueryHandler(calculator=calculator)
+
+    assert handler.route(query).query_type == QueryType.TAX_QUERY
@@ -0,0 +1,55 @@
+import pytest
+
+from tokenizer.tokenizer import Tokenizer
+
+TEXT = " ".join(
+    f"Стаття {number}. Платник податку подає декларацію за {number} квартал "
+    + "до двадцятого числа місяця, що настає за звітним періодом" * (number % 3)
+    + f"! Сума зобов'язання {number} сплачується протягом десяти днів?"
+    for number in range(1, 13)
+)
+
+
+@pytest.fixture
+def tokenizer():
+    return Tokenizer()
+
+
+def _words(text: str) -> int:
+    return len(Tokenizer()._split_into_words(text))
+
+
+@pytest.mark.parametrize("max_chunk_size, overlap", [(25, 0), (25, 8), (60, 20)])
+def test_sentence_offsets_match_source_text(tokenizer, max_chunk_size, overlap):
+    sentences = tokenizer._split_into_sentences(TEXT)
+    chunks = tokenizer.tokenize_text(
+        TEXT, max_chunk_size=max_chunk_size, overlap=overlap
+    )
+
+    assert all(sentence in TEXT for sentence in sentences)
+    for chunk in chunks:
+        start, end = chunk["sentence_start"], chunk["sentence_end"]
+        assert chunk["text"] == " ".join(sentences[start:end])
+        assert chunk["length"] == _words(chunk["text"])
+
+    # Фрагменти покривають документ по порядку, перекриваючись не більше
+    # ніж на overlap слів
+    assert chunks[0]["sentence_start"] == 0
+    assert chunks[-1]["sentence_end"] == len(sentences)
+    for previous, current in zip(chunks, chunks[1:]):
+        assert previous["sentence_start"] < current["sentence_start"]
+        assert current["sentence_start"] <= previous["sentence_end"]
+        shared = sentences[current["sentence_start"] : previous["sentence_end"]]
+        assert sum(_words(sentence) for sentence in shared) <= overlap
+
+
+def test_long_sentence_becomes_its_own_chunk(tokenizer):
+    text = "Коротке речення. " + "дуже " * 50 + "довге речення. Кінець."
+    chunks = tokenizer.tokenize_text(text, max_chunk_size=10, overlap=0)
+
+    assert [(c["sentence_start"], c["sentence_end"]) for c in chunks] == [
+        (0, 1),
+        (1, 2),
+        (2, 3),
+    ]
+    assert chunks[1]["length"] == 52
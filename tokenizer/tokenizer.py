@@ -33,14 +33,21 @@ class Tokenizer:
         current_chunk = []
         current_length = 0
 
-        for sentence in sentences:
+        for position, sentence in enumerate(sentences):
             words = self._split_into_words(sentence)
             sentence_length = len(words)
 
             if current_length + sentence_length > max_chunk_size and current_chunk:
 
                 chunk_text = " ".join(current_chunk)
-                chunks.append({"text": chunk_text, "length": current_length})
+                chunks.append(
+                    {
+                        "text": chunk_text,
+                        "length": current_length,
+                        "sentence_start": position - len(current_chunk),
+                        "sentence_end": position,
+                    }
+                )
 
                 overlap_sentences = []
                 overlap_length = 0
@@ -59,7 +66,14 @@ class Tokenizer:
 
         if current_chunk:
             chunk_text = " ".join(current_chunk)
-            chunks.append({"text": chunk_text, "length": current_length})
+            chunks.append(
+                {
+                    "text": chunk_text,
+                    "length": current_length,
+                    "sentence_start": len(sentences) - len(current_chunk),
+                    "sentence_end": len(sentences),
+                }
+            )
 
         return chunks
 